@@ -0,0 +1,66 @@
+import csv
+import json
+import os
+from itertools import islice
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+FIELDS = ('username', 'email', 'first_name', 'last_name')
+
+
+class Command(BaseCommand):
+    help = ("Create users in bulk from a CSV file with a header row or a JSON lines file, with the columns "
+            "username, email, first_name and last_name. Users whose username or email exists are skipped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSON lines file")
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help="Format of the file, by default from its extension")
+        parser.add_argument('--password',
+                            help="Password shared by all imported users, without one they can't log in "
+                                 "with a password until they set one")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Users per bulk_create")
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if file_format not in ('csv', 'jsonl'):
+            raise CommandError("Can't tell the format from the extension, pass --format")
+        # Hashing is the slow part of creating a user, so every user shares one hash
+        password_hash = make_password(options['password'])
+        before = User.objects.count()
+        with open(options['path'], newline='', encoding='utf-8') as file, transaction.atomic():
+            rows = csv.DictReader(file) if file_format == 'csv' else self.read_jsonl(file)
+            users = (self.make_user(number, row, password_hash) for number, row in enumerate(rows, start=1))
+            read = 0
+            while batch := list(islice(users, options['batch_size'])):
+                # Rows clashing with the username or email indexes are skipped
+                User.objects.bulk_create(batch, ignore_conflicts=True)
+                read += len(batch)
+        created = User.objects.count() - before
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} users, skipped {read - created} existing or repeated ones"))
+
+    @staticmethod
+    def read_jsonl(file):
+        for number, line in enumerate(file, start=1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    raise CommandError(f"Line {number} isn't valid JSON")
+
+    def make_user(self, number, row, password_hash):
+        values = {field: (row.get(field) or '').strip() for field in FIELDS}
+        if not values['username']:
+            raise CommandError(f"Row {number} has no username")
+        values['username'] = User.normalize_username(values['username'])
+        values['email'] = User.objects.normalize_email(values['email'])
+        user = User(password=password_hash, **values)
+        try:
+            user.clean_fields(exclude=['password', 'date_joined'])
+        except ValidationError as error:
+            raise CommandError(f"Row {number} is invalid: {'; '.join(error.messages)}")
+        return user
@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """
+    Accounts can't be merged automatically, stop with the emails to sort out
+    """
+    User = apps.get_model('auth', 'User')
+    duplicates = list(
+        User.objects.exclude(email='').annotate(address=Lower('email')).order_by()
+        .values('address').annotate(total=Count('id')).filter(total__gt=1).values_list('address', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Several users share these emails, change or remove them before migrating: " + ', '.join(duplicates))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        # Case-insensitive. Users without an email don't count, e.g. social logins
+        # of providers that share none.
+        migrations.RunSQL(
+            "CREATE UNIQUE INDEX accounts_user_unique_email ON auth_user (LOWER(email)) WHERE email <> ''",
+            "DROP INDEX accounts_user_unique_email",
+        ),
+    ]
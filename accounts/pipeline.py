@@ -0,0 +1,21 @@
+"""
+Steps of the social login pipeline, see SOCIAL_AUTH_PIPELINE
+"""
+from django.contrib.auth.models import User
+from social_core.exceptions import AuthException
+
+
+class EmailTaken(AuthException):
+    def __str__(self):
+        return "This email already has an account, log in and connect it"
+
+
+def refuse_taken_email(backend, details, user=None, *args, **kwargs):
+    """
+    Stop a social login that would create a user with the email of another
+    account. Emails aren't verified, neither at registration nor by every
+    provider, so neither side proves it owns the other account.
+    """
+    email = details.get('email')
+    if user is None and email and User.objects.filter(email__iexact=email).exists():
+        raise EmailTaken(backend)
@@ -0,0 +1,68 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+
+class ImportUsersCommandTest(TestCase):
+
+    def setUp(self):
+        User.objects.create_user(username='example', email='example@example.com')
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def import_users(self, path, *args):
+        out = StringIO()
+        call_command('import_users', path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_csv(self):
+        path = self.write('users.csv', 'username,email,first_name,last_name\n'
+                                       'alice,alice@EXAMPLE.com,Alice,Smith\n'
+                                       'bob,,Bob,\n')
+        out = self.import_users(path, '--password=shared1234')
+        self.assertIn('Created 2 users, skipped 0', out)
+        alice = User.objects.get(username='alice')
+        self.assertEqual((alice.email, alice.first_name, alice.last_name), ('alice@example.com', 'Alice', 'Smith'))
+        self.assertTrue(alice.check_password('shared1234'))
+        # One hash for everybody
+        self.assertEqual(alice.password, User.objects.get(username='bob').password)
+
+    def test_jsonl_skips_existing_and_repeated_users(self):
+        path = self.write('users.jsonl', '\n'.join(json.dumps(row) for row in [
+            {'username': 'alice', 'email': 'alice@example.com'},
+            {'username': 'example', 'email': 'new@example.com'},
+            {'username': 'carol', 'email': 'Example@example.com'},
+            {'username': 'alice', 'email': 'alice2@example.com'},
+        ]) + '\n')
+        out = self.import_users(path, '--batch-size=2')
+        self.assertIn('Created 1 users, skipped 3', out)
+        self.assertEqual(set(User.objects.values_list('username', flat=True)), {'example', 'alice'})
+        self.assertFalse(User.objects.get(username='alice').has_usable_password())
+
+    def test_invalid_row_imports_nothing(self):
+        path = self.write('users.csv', 'username,email\nalice,alice@example.com\nbob,not-an-email\n')
+        with self.assertRaisesMessage(CommandError, 'Row 2 is invalid'):
+            self.import_users(path, '--batch-size=1')
+        self.assertFalse(User.objects.filter(username='alice').exists())
+
+    def test_missing_username(self):
+        path = self.write('users.jsonl', '{"email": "alice@example.com"}\n')
+        with self.assertRaisesMessage(CommandError, 'Row 1 has no username'):
+            self.import_users(path)
+
+    def test_unknown_format(self):
+        path = self.write('users.txt', 'username\nalice\n')
+        with self.assertRaisesMessage(CommandError, 'pass --format'):
+            self.import_users(path)
+        self.assertIn('Created 1 users', self.import_users(path, '--format=csv'))
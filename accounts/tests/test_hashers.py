@@ -0,0 +1,39 @@
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, PBKDF2SHA1PasswordHasher, identify_hasher
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from accounts.hashers import ScryptPasswordHasher
+
+
+class TestRehashOnLogin(TestCase):
+    def make_user(self, password_hash):
+        return User.objects.create(username='example', email='example@example.com', password=password_hash)
+
+    def login(self):
+        response = self.client.post(reverse('accounts:login'), data={'username': 'example', 'password': 'example1234'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_other_algorithm_is_rehashed(self):
+        user = self.make_user(PBKDF2SHA1PasswordHasher().encode('example1234', 'saltsaltsalt'))
+        self.login()
+        user.refresh_from_db()
+        self.assertEqual(identify_hasher(user.password).algorithm, 'pbkdf2_sha256')
+        self.assertTrue(user.check_password('example1234'))
+
+    def test_other_cost_is_rehashed(self):
+        user = self.make_user(PBKDF2PasswordHasher().encode('example1234', 'saltsaltsalt', iterations=1000))
+        self.login()
+        user.refresh_from_db()
+        self.assertEqual(identify_hasher(user.password).decode(user.password)['iterations'],
+                         PBKDF2PasswordHasher.iterations)
+
+    @override_settings(PASSWORD_HASHERS=['accounts.hashers.ScryptPasswordHasher',
+                                         'accounts.hashers.PBKDF2PasswordHasher'])
+    def test_preferred_hasher_takes_over(self):
+        user = self.make_user(PBKDF2PasswordHasher().encode('example1234', 'saltsaltsalt', iterations=1000))
+        self.login()
+        user.refresh_from_db()
+        decoded = identify_hasher(user.password).decode(user.password)
+        self.assertEqual(decoded['algorithm'], 'scrypt')
+        self.assertEqual(decoded['work_factor'], ScryptPasswordHasher.work_factor)
+        self.assertTrue(user.check_password('example1234'))
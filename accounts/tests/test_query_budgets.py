@@ -0,0 +1,39 @@
+from accounts import urls
+from polls.tests.test_query_budgets import QueryBudgetTestCase
+
+QUERY_BUDGETS = {
+    'accounts:login': 9,
+    'accounts:logout': 4,
+    'accounts:register': 11,
+}
+
+
+class AccountsQueryBudgetTest(QueryBudgetTestCase):
+    budgets = QUERY_BUDGETS
+
+    def anonymous(self, request):
+        self.client.logout()
+        return request
+
+    def test_every_view_has_a_budget(self):
+        names = {f'{urls.app_name}:{pattern.name}' for pattern in urls.urlpatterns}
+        self.assertEqual(names, set(self.budgets))
+
+    def test_login(self):
+        self.assertQueryBudget('accounts:login', lambda scale: self.anonymous(self.get('accounts:login')))
+        self.assertQueryBudget('accounts:login', lambda scale: self.anonymous(self.post('accounts:login', data={
+            'username': 'voter1', 'password': 'voter1234'})))
+
+    def test_logout(self):
+        def logout(scale):
+            self.client.force_login(self.owner)
+            return self.get('accounts:logout')
+        self.assertQueryBudget('accounts:logout', logout)
+
+    def test_register(self):
+        self.assertQueryBudget('accounts:register', lambda scale: self.anonymous(self.get('accounts:register')))
+        self.assertQueryBudget('accounts:register', lambda scale: self.anonymous(self.post('accounts:register', data={
+            'username': 'voter1', 'email': 'new@example.com', 'password1': 'example1234', 'password2': 'example1234'})))
+        self.assertQueryBudget('accounts:register', lambda scale: self.anonymous(self.post('accounts:register', data={
+            'username': f'new{scale.polls}', 'email': f'new{scale.polls}@example.com',
+            'password1': 'example1234', 'password2': 'example1234'})))
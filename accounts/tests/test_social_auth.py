@@ -0,0 +1,53 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from social_django.utils import load_backend, load_strategy
+from accounts.pipeline import EmailTaken
+
+
+class TestSocialLoginEmail(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+        self.request.session = SessionStore()
+        self.strategy = load_strategy(self.request)
+        self.backend = load_backend(self.strategy, 'github', redirect_uri=None)
+
+    def github_login(self, uid, email):
+        response = {'id': uid, 'login': 'octocat', 'email': email, 'name': 'Octo Cat', 'access_token': 'token'}
+        return self.backend.authenticate(self.request, response=response, backend=self.backend, strategy=self.strategy)
+
+    def test_existing_email_is_refused(self):
+        user = User.objects.create_user(username='example', email='Example@example.com', password='example1234')
+        with self.assertRaises(EmailTaken):
+            self.github_login(1, 'example@example.com')
+        self.assertEqual(User.objects.count(), 1)
+        self.assertFalse(user.social_auth.exists())
+
+    def test_connected_account_logs_in(self):
+        user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        user.social_auth.create(provider='github', uid='1')
+        self.assertEqual(self.github_login(1, 'example@example.com'), user)
+
+    @override_settings(DEBUG=False)
+    def test_refused_login_shows_message(self):
+        User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        github = {'id': 1, 'login': 'octocat', 'email': 'example@example.com', 'access_token': 'token'}
+
+        def auth_complete(backend, *args, **kwargs):
+            # What GitHub would have answered, without the OAuth round trip
+            return backend.strategy.authenticate(backend, *args, response=github, **kwargs)
+
+        with mock.patch('social_core.backends.github.GithubOAuth2.auth_complete', auth_complete):
+            response = self.client.get(reverse('social:complete', args=['github']), follow=True)
+        self.assertRedirects(response, reverse('accounts:login'))
+        self.assertContains(response, 'This email already has an account, log in and connect it')
+
+    def test_new_email_creates_a_user(self):
+        user = self.github_login(1, 'octocat@example.com')
+        self.assertEqual((user.username, user.email), ('octocat', 'octocat@example.com'))
+
+    def test_users_without_email(self):
+        first, second = self.github_login(1, ''), self.github_login(2, '')
+        self.assertNotEqual(first, second)
@@ -0,0 +1,56 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+@override_settings(LOGIN_THROTTLE_USERNAME_LIMIT=3, LOGIN_THROTTLE_IP_LIMIT=5)
+class TestLoginThrottle(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(username='example', email='example@example.com', password='example1234')
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, username='example', password='wrong1234', ip='127.0.0.1'):
+        return self.client.post(reverse('accounts:login'), data={'username': username, 'password': password},
+                                REMOTE_ADDR=ip)
+
+    def test_username_blocked_after_limit(self):
+        for _ in range(3):
+            self.assertEqual(self.login(ip='10.0.0.1').status_code, 200)
+        with mock.patch('accounts.views.authenticate') as authenticate:
+            response = self.login(password='example1234', ip='10.0.0.2')
+        authenticate.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertFormError(form=response.context['form'], field='username',
+                             errors=['Too many failed logins, try again later'])
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    def test_username_is_case_insensitive(self):
+        for username in ('example', 'Example', 'EXAMPLE'):
+            self.login(username=username)
+        self.assertEqual(self.login().status_code, 429)
+
+    def test_ip_blocked_after_limit(self):
+        for number in range(5):
+            self.login(username=f'someone{number}', ip='10.0.0.1')
+        self.assertEqual(self.login(password='example1234', ip='10.0.0.1').status_code, 429)
+        self.assertEqual(self.login(password='example1234', ip='10.0.0.2').status_code, 302)
+
+    def test_success_forgets_username_failures(self):
+        for _ in range(2):
+            self.login()
+        self.assertEqual(self.login(password='example1234').status_code, 302)
+        self.client.logout()
+        for _ in range(2):
+            self.login()
+        self.assertEqual(self.login(password='example1234').status_code, 302)
+
+    @override_settings(LOGIN_THROTTLE_USERNAME_LIMIT=0, LOGIN_THROTTLE_IP_LIMIT=0)
+    def test_zero_limit_turns_throttling_off(self):
+        for _ in range(10):
+            self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.login(password='example1234').status_code, 302)
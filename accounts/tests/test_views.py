@@ -1,5 +1,6 @@
 from django.test import TestCase, Client
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
 from django.urls import reverse
 from accounts.forms import LoginForm, RegisterForm
 
@@ -95,3 +96,28 @@ class TestUserRegisterView(TestCase):
         self.assertFormError(form=response2.context['form'], field='username', errors=['Username or Email already exists!'])
         self.assertEqual(User.objects.count(), 1)
 
+
+    def test_user_register_POST_taken_email(self):
+        register_form_data = {
+            'username': 'root',
+            'email': 'Example@Example.com',
+            'password1': 'root1234',
+            'password2': 'root1234',
+        }
+        response = self.client.post(reverse('accounts:register'), data=register_form_data)
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(form=response.context['form'], field='username', errors=['Username or Email already exists!'])
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+        self.assertEqual(User.objects.count(), 1)
+
+
+class TestUniqueEmailIndex(TestCase):
+    def test_email_is_unique_ignoring_case(self):
+        User.objects.create_user(username='example', email='example@example.com')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username='other', email='EXAMPLE@example.com')
+
+    def test_users_without_email(self):
+        User.objects.create_user(username='example')
+        User.objects.create_user(username='other')
+        self.assertEqual(User.objects.filter(email='').count(), 2)
@@ -0,0 +1,60 @@
+"""
+Login throttling.
+
+Failed logins are counted per username and per client IP in the
+LOGIN_THROTTLE_CACHE cache, for LOGIN_THROTTLE_WINDOW seconds from the first
+failure. Once a count reaches its limit, further logins are rejected before
+the password is hashed, so guessing costs the server next to nothing.
+
+With the default local memory cache every worker process counts on its own;
+point LOGIN_THROTTLE_CACHE at a shared cache to count across processes.
+"""
+import hashlib
+from django.conf import settings
+from django.core.cache import caches
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+class LoginThrottle:
+    """
+    The failure counters of one login attempt
+    """
+
+    def __init__(self, request, username):
+        self.cache = caches[settings.LOGIN_THROTTLE_CACHE]
+        self.username_key = self.key('username', username.lower())
+        # A limit of 0 turns that counter off
+        self.limits = {
+            key: limit for key, limit in [
+                (self.username_key, settings.LOGIN_THROTTLE_USERNAME_LIMIT),
+                (self.key('ip', client_ip(request)), settings.LOGIN_THROTTLE_IP_LIMIT),
+            ] if limit
+        }
+
+    @staticmethod
+    def key(kind, value):
+        # Usernames may hold characters cache keys can't
+        return f'accounts:login-failures:{kind}:{hashlib.md5(value.encode()).hexdigest()}'
+
+    def is_blocked(self):
+        counts = self.cache.get_many(list(self.limits))
+        return any(counts.get(key, 0) >= limit for key, limit in self.limits.items())
+
+    def failed(self):
+        for key in self.limits:
+            # add() starts the window, incr() keeps its expiry
+            self.cache.add(key, 0, settings.LOGIN_THROTTLE_WINDOW)
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                # Expired in between
+                self.cache.set(key, 1, settings.LOGIN_THROTTLE_WINDOW)
+
+    def succeeded(self):
+        """
+        Forget the failures of the username, not those of the IP
+        """
+        self.cache.delete(self.username_key)
@@ -2,8 +2,9 @@ from django.contrib.auth import authenticate, login, logout
 from django.shortcuts import render, redirect
 from django.contrib.auth.models import User
 from .forms import LoginForm, RegisterForm
+from .throttling import LoginThrottle
 from django.views.generic import View
-from django.db.models import Q
+from django.db import IntegrityError, transaction
 
 
 class Login(View):
@@ -17,12 +18,19 @@ class Login(View):
         login_form = LoginForm(request.POST)
         if login_form.is_valid():
             data = login_form.cleaned_data
+            throttle = LoginThrottle(request, data['username'])
+            if throttle.is_blocked():
+                # Refused before the password is hashed
+                login_form.add_error('username', 'Too many failed logins, try again later')
+                return render(request, 'accounts/login.html', context={'form': login_form}, status=429)
             user = authenticate(username=data['username'], password=data['password'])
             if user is not None:
+                throttle.succeeded()
                 login(request, user)
                 redirect_url = request.GET.get('next', 'polls:list')
                 return redirect(redirect_url)
             else:
+                throttle.failed()
                 login_form.add_error('username', 'Invalid User Data')
         return render(request, 'accounts/login.html', context={'form': login_form})
 
@@ -38,11 +46,14 @@ class Register(View):
         register_form = RegisterForm(request.POST)
         if register_form.is_valid():
             data = register_form.cleaned_data
-            if User.objects.filter(Q(username=data['username']) | Q(email=data['email'])).exists():
+            # The unique indexes on username and email decide, also between concurrent sign-ups
+            try:
+                with transaction.atomic():
+                    user = User.objects.create_user(username=data['username'], password=data['password1'], email=data['email'])
+            except IntegrityError:
                 register_form.add_error('username', 'Username or Email already exists!')
             else:
-                user = User.objects.create_user(username=data['username'], password=data['password1'], email=data['email'])
-                login(request, user)
+                login(request, user, backend='django.contrib.auth.backends.ModelBackend')
                 return redirect('polls:list')
         return render(request, 'accounts/register.html', {'form': register_form})
 
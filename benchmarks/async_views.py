@@ -0,0 +1,170 @@
+"""
+Sync WSGI vs async ASGI throughput of the poll detail and vote views.
+
+Both servers are driven in process, without sockets, on the same seeded
+dataset: the WSGI handler from a pool of --threads threads, like one gthread
+worker, and the ASGI handler from one event loop with --concurrency requests
+in flight, like one uvicorn worker. --db-latency adds a sleep before every
+query to stand in for the network round trip to a database server; SQLite
+itself answers in microseconds and serializes writers, so without it the
+comparison mostly measures Python overhead.
+
+    python benchmarks/async_views.py --users 2000 --polls 20 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import (add_db_latency, fresh_copy, login_cookies, print_table, run_worker,
+                               seeded_database, setup_django, summarize)
+
+
+def plan_requests(scenario, count):
+    """
+    (user_id, path, body) per request. Every vote is a new (user, poll) pair.
+    """
+    from django.contrib.auth.models import User
+    from django.urls import reverse
+    from polls.models import Choice
+
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    first_choices = {}
+    for poll_id, choice_id in Choice.objects.order_by('poll', 'id').values_list('poll', 'id'):
+        first_choices.setdefault(poll_id, choice_id)
+    poll_ids = sorted(first_choices)
+    if scenario == 'vote' and count > len(user_ids) * len(poll_ids):
+        raise SystemExit("Not enough users and polls for that many distinct votes")
+    plan = []
+    for number in range(count):
+        user_id = user_ids[number % len(user_ids)]
+        poll_id = poll_ids[number // len(user_ids) % len(poll_ids)]
+        if scenario == 'vote':
+            plan.append((user_id, reverse('polls:vote', args=[poll_id]), {'choice': first_choices[poll_id]}))
+        else:
+            plan.append((user_id, reverse('polls:detail', args=[poll_id]), None))
+    return plan
+
+
+def run_wsgi(plan, cookies, csrf_token, threads):
+    from django.test import RequestFactory
+    from pollme.wsgi import application
+
+    factory = RequestFactory(SERVER_NAME='localhost')
+
+    def call(item):
+        user_id, path, body = item
+        if body is None:
+            environ = factory.get(path, HTTP_COOKIE=cookies[user_id]).environ
+        else:
+            environ = factory.post(path, {**body, 'csrfmiddlewaretoken': csrf_token},
+                                   HTTP_COOKIE=cookies[user_id]).environ
+        statuses = []
+        started = time.perf_counter()
+        response = application(environ, lambda status, headers: statuses.append(int(status.split()[0])))
+        b''.join(response)
+        response.close()
+        return time.perf_counter() - started, statuses[0]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(call, plan))
+    return results, time.perf_counter() - started
+
+
+def run_asgi(plan, cookies, csrf_token, concurrency):
+    from pollme.asgi import application
+
+    async def call(item, semaphore):
+        user_id, path, body = item
+        payload = urlencode({**body, 'csrfmiddlewaretoken': csrf_token}).encode() if body is not None else b''
+        headers = [(b'host', b'localhost'), (b'cookie', cookies[user_id].encode())]
+        if body is not None:
+            headers += [(b'content-type', b'application/x-www-form-urlencoded'),
+                        (b'content-length', str(len(payload)).encode())]
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'POST' if body is not None else 'GET', 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': headers, 'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+        }
+        received = asyncio.Event()
+        statuses = []
+
+        async def receive():
+            if not received.is_set():
+                received.set()
+                return {'type': 'http.request', 'body': payload, 'more_body': False}
+            # The client never disconnects early
+            await asyncio.Future()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        async with semaphore:
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            return time.perf_counter() - started, statuses[0]
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call(item, semaphore) for item in plan))
+        return results, time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+def worker(args):
+    setup_django()
+    plan = plan_requests(args.scenario, args.requests)
+    cookies, csrf_token = login_cookies({user_id for user_id, _, _ in plan})
+    add_db_latency(args.db_latency / 1000)
+    if args.mode == 'wsgi':
+        results, elapsed = run_wsgi(plan, cookies, csrf_token, args.threads)
+    else:
+        results, elapsed = run_asgi(plan, cookies, csrf_token, args.concurrency)
+    latencies, statuses = zip(*results)
+    import json
+    print(json.dumps(summarize(latencies, elapsed, list(statuses))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--polls', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=8, help="WSGI worker threads")
+    parser.add_argument('--concurrency', type=int, default=64, help="ASGI requests in flight")
+    parser.add_argument('--db-latency', type=float, default=2.0, help="Emulated milliseconds per query")
+    parser.add_argument('--scenarios', default='detail,vote')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--mode', choices=['wsgi', 'asgi'], help=argparse.SUPPRESS)
+    parser.add_argument('--scenario', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    rows = []
+    with seeded_database(users=args.users, polls=args.polls, participation=0) as db_path:
+        for scenario in args.scenarios.split(','):
+            for mode in ('wsgi', 'asgi'):
+                result = run_worker(
+                    __file__, fresh_copy(db_path, f'{scenario}-{mode}'),
+                    f'--mode={mode}', f'--scenario={scenario}', f'--requests={args.requests}',
+                    f'--threads={args.threads}', f'--concurrency={args.concurrency}',
+                    f'--db-latency={args.db_latency}',
+                    env={'POLLS_ASYNC_VIEWS': 'true' if mode == 'asgi' else 'false'},
+                )
+                rows.append({'scenario': scenario, 'mode': mode, **result})
+    print_table(rows, ['scenario', 'mode', 'requests', 'seconds', 'rps', 'p50_ms', 'p95_ms', 'statuses'])
+
+
+if __name__ == '__main__':
+    main()
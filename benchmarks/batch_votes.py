@@ -0,0 +1,88 @@
+"""
+Time to store the same votes one request per vote vs through the batch vote API.
+
+    python benchmarks/batch_votes.py --users 5000 --polls 10 --votes 50000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import fresh_copy, print_table, run_worker, seeded_database, setup_django
+
+TOKEN = 'benchmark-token'
+
+
+def plan_votes(count):
+    from django.contrib.auth.models import User
+    from polls.models import Choice
+
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    first_choices = {}
+    for poll_id, choice_id in Choice.objects.order_by('poll', 'id').values_list('poll', 'id'):
+        first_choices.setdefault(poll_id, choice_id)
+    poll_ids = sorted(first_choices)
+    if count > len(user_ids) * len(poll_ids):
+        raise SystemExit("Not enough users and polls for that many distinct votes")
+    return [
+        {'user': user_ids[number % len(user_ids)], 'poll': poll_id, 'choice': first_choices[poll_id]}
+        for number in range(count)
+        for poll_id in [poll_ids[number // len(user_ids) % len(poll_ids)]]
+    ]
+
+
+def worker(args):
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.urls import reverse
+    from polls.models import Vote
+
+    settings.POLLS_SERVICE_TOKENS = [TOKEN]
+    votes = plan_votes(args.votes)
+    client = Client(SERVER_NAME='localhost')
+    started = time.perf_counter()
+    if args.mode == 'single':
+        users = {user.pk: user for user in User.objects.filter(pk__in={vote['user'] for vote in votes})}
+        for vote in votes:
+            client.force_login(users[vote['user']])
+            client.post(reverse('polls:vote', args=[vote['poll']]), {'choice': vote['choice']})
+    else:
+        url = reverse('polls:api_votes')
+        for start in range(0, len(votes), args.batch_size):
+            client.post(url, json.dumps({'votes': votes[start:start + args.batch_size]}),
+                        content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {TOKEN}')
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        'votes': len(votes), 'stored': Vote.objects.count(),
+        'seconds': round(elapsed, 3), 'votes_per_s': round(len(votes) / elapsed, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--polls', type=int, default=5)
+    parser.add_argument('--votes', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=5000, help="Votes per batch request")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--mode', choices=['single', 'batch'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    rows = []
+    with seeded_database(users=args.users, polls=args.polls, participation=0) as db_path:
+        for mode in ('single', 'batch'):
+            result = run_worker(__file__, fresh_copy(db_path, mode), f'--mode={mode}',
+                                f'--votes={args.votes}', f'--batch-size={args.batch_size}')
+            rows.append({'mode': mode, **result})
+    print_table(rows, ['mode', 'votes', 'stored', 'seconds', 'votes_per_s'])
+
+
+if __name__ == '__main__':
+    main()
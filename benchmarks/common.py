@@ -0,0 +1,147 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Every benchmark seeds a throwaway SQLite file with ``manage.py seed`` and runs
+each configuration in its own subprocess, since settings such as
+POLLS_ASYNC_VIEWS are read when the URLconf is imported.
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def manage(db_path, *args, env=None):
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, 'manage.py'), *args],
+        cwd=ROOT, check=True, stdout=subprocess.DEVNULL,
+        env={**os.environ, 'SQLITE_PATH': db_path, **(env or {})},
+    )
+
+
+@contextmanager
+def seeded_database(**seed_options):
+    """
+    Yield the path of a migrated and seeded database, removed afterwards
+    """
+    directory = tempfile.mkdtemp(prefix='pollme-bench-')
+    db_path = os.path.join(directory, 'seed.sqlite3')
+    try:
+        manage(db_path, 'migrate')
+        options = [f'--{name.replace("_", "-")}={value}' for name, value in seed_options.items()]
+        manage(db_path, 'seed', '--seed=1', *options)
+        yield db_path
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def fresh_copy(db_path, name):
+    """
+    A copy of the seeded database, so every run starts from the same data
+    """
+    copy = os.path.join(os.path.dirname(db_path), f'{name}.sqlite3')
+    shutil.copyfile(db_path, copy)
+    return copy
+
+
+def run_worker(script, db_path, *args, env=None):
+    """
+    Run ``script --worker`` in a fresh interpreter and return the JSON it prints
+    """
+    completed = subprocess.run(
+        [sys.executable, script, '--worker', *args],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+        env={**os.environ, 'SQLITE_PATH': db_path, **(env or {})},
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def setup_django():
+    """
+    Configure Django inside a worker, with DEBUG off so queries aren't recorded
+    """
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pollme.settings')
+    import django
+    from django.conf import settings
+    django.setup()
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['localhost']
+
+
+def add_db_latency(seconds):
+    """
+    Sleep before every query to emulate the round trip to a database server
+    """
+    if not seconds:
+        return
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        # The wrapper object outlives its connections, add the delay once
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+    if connection.connection is not None:
+        install(None, connection)
+
+
+def login_cookies(user_ids):
+    """
+    Create a logged in session for every user and return their cookie headers
+    """
+    from django.conf import settings
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+    from django.contrib.auth.models import User
+    from django.contrib.sessions.backends.db import SessionStore
+    from django.contrib.sessions.models import Session
+    from django.utils import timezone
+    from django.utils.crypto import get_random_string
+
+    store = SessionStore()
+    expire_date = timezone.now() + timezone.timedelta(days=1)
+    csrf_token = get_random_string(32)
+    cookies, sessions = {}, []
+    for user in User.objects.filter(id__in=user_ids):
+        session_key = get_random_string(32)
+        sessions.append(Session(session_key=session_key, expire_date=expire_date, session_data=store.encode({
+            SESSION_KEY: str(user.pk),
+            BACKEND_SESSION_KEY: 'django.contrib.auth.backends.ModelBackend',
+            HASH_SESSION_KEY: user.get_session_auth_hash(),
+        })))
+        cookies[user.pk] = f'{settings.SESSION_COOKIE_NAME}={session_key}; {settings.CSRF_COOKIE_NAME}={csrf_token}'
+    Session.objects.bulk_create(sessions)
+    return cookies, csrf_token
+
+
+def summarize(latencies, elapsed, statuses):
+    latencies = sorted(latencies)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(latencies),
+        'seconds': round(elapsed, 3),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(quantiles[49] * 1000, 1),
+        'p95_ms': round(quantiles[94] * 1000, 1),
+        'statuses': {str(status): statuses.count(status) for status in sorted(set(statuses))},
+    }
+
+
+def print_table(rows, columns):
+    widths = [max(len(str(column)), *(len(str(row.get(column, ''))) for row in rows)) for column in columns]
+    print('  '.join(str(column).ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(str(row.get(column, '')).ljust(width) for column, width in zip(columns, widths)))
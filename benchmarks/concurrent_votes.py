@@ -0,0 +1,169 @@
+"""
+Voting throughput with several writer processes voting at once, for each
+database configuration of pollme.settings_production.
+
+Every writer is a process driving the WSGI handler one request at a time,
+like a sync worker, and votes for its own share of (user, poll) pairs. All
+writers start together; throughput counts the votes stored by all of them.
+
+    python benchmarks/concurrent_votes.py --writers 8 --votes 4000
+
+PostgreSQL runs too with --postgres, on the database named by the POSTGRES_*
+variables, which is migrated and seeded first.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import ROOT, fresh_copy, login_cookies, print_table, seeded_database, setup_django, summarize
+
+CONFIGS = {
+    # The development settings: rollback journal, a new connection per request
+    'sqlite-default': {'DJANGO_SETTINGS_MODULE': 'pollme.settings'},
+    'sqlite-wal': {'DB_ENGINE': 'sqlite'},
+    'sqlite-wal-full': {'DB_ENGINE': 'sqlite', 'SQLITE_SYNCHRONOUS': 'FULL'},
+    'postgresql': {'DB_ENGINE': 'postgresql'},
+}
+
+
+def plan_votes(count):
+    from django.contrib.auth.models import User
+    from polls.models import Choice
+
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    first_choices = {}
+    for poll_id, choice_id in Choice.objects.order_by('poll', 'id').values_list('poll', 'id'):
+        first_choices.setdefault(poll_id, choice_id)
+    poll_ids = sorted(first_choices)
+    if count > len(user_ids) * len(poll_ids):
+        raise SystemExit("Not enough users and polls for that many distinct votes")
+    return [
+        (user_ids[number % len(user_ids)], poll_id, first_choices[poll_id])
+        for number in range(count)
+        for poll_id in [poll_ids[number // len(user_ids) % len(poll_ids)]]
+    ]
+
+
+def wait_for(path):
+    while not os.path.exists(path):
+        time.sleep(0.01)
+
+
+def worker(args):
+    setup_django()
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.urls import reverse
+    from pollme.wsgi import application
+
+    votes = plan_votes(args.votes)[args.writer::args.writers]
+    cookies, csrf_token = login_cookies({user_id for user_id, _, _ in votes})
+    connection.close()
+    factory = RequestFactory(SERVER_NAME='localhost')
+    requests = [
+        factory.post(reverse('polls:vote', args=[poll_id]), {'choice': choice_id, 'csrfmiddlewaretoken': csrf_token},
+                     HTTP_COOKIE=cookies[user_id]).environ
+        for user_id, poll_id, choice_id in votes
+    ]
+
+    open(os.path.join(args.barrier, f'ready-{args.writer}'), 'w').close()
+    wait_for(os.path.join(args.barrier, 'go'))
+    latencies, statuses = [], []
+    started = time.perf_counter()
+    for environ in requests:
+        response_statuses = []
+        request_started = time.perf_counter()
+        response = application(environ, lambda status, headers: response_statuses.append(int(status.split()[0])))
+        b''.join(response)
+        response.close()
+        latencies.append(time.perf_counter() - request_started)
+        statuses.append(response_statuses[0])
+    print(json.dumps({**summarize(latencies, time.perf_counter() - started, statuses), 'finished_at': time.time()}))
+
+
+def run_writers(config, env, args):
+    """
+    Start every writer, release them at once and return their combined numbers
+    """
+    barrier = tempfile.mkdtemp(prefix='pollme-bench-barrier-')
+    env = {
+        **os.environ, 'DJANGO_SETTINGS_MODULE': 'pollme.settings_production',
+        'DJANGO_SECRET_KEY': 'benchmark', **env,
+    }
+    processes = [
+        subprocess.Popen(
+            [sys.executable, __file__, '--worker', f'--writer={writer}', f'--writers={args.writers}',
+             f'--votes={args.votes}', f'--barrier={barrier}'],
+            cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True,
+        )
+        for writer in range(args.writers)
+    ]
+    for writer in range(args.writers):
+        wait_for(os.path.join(barrier, f'ready-{writer}'))
+    go = time.time()
+    open(os.path.join(barrier, 'go'), 'w').close()
+    results = []
+    for process in processes:
+        stdout, _ = process.communicate()
+        if process.returncode:
+            raise SystemExit(f"A writer of {config} failed")
+        results.append(json.loads(stdout.strip().splitlines()[-1]))
+    elapsed = max(result['finished_at'] for result in results) - go
+    statuses = {}
+    for result in results:
+        for status, count in result['statuses'].items():
+            statuses[status] = statuses.get(status, 0) + count
+    stored = statuses.get('200', 0)
+    return {
+        'config': config,
+        'votes': sum(result['requests'] for result in results),
+        'seconds': round(elapsed, 3),
+        'votes_per_s': round(stored / elapsed, 1),
+        'worst_p95_ms': max(result['p95_ms'] for result in results),
+        'statuses': statuses,
+    }
+
+
+def seed_postgres(args):
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'pollme.settings_production',
+           'DJANGO_SECRET_KEY': 'benchmark', 'DB_ENGINE': 'postgresql'}
+    manage = [sys.executable, os.path.join(ROOT, 'manage.py')]
+    subprocess.run([*manage, 'migrate'], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    subprocess.run([*manage, 'seed', '--seed=1', '--overwrite', f'--users={args.users}', f'--polls={args.polls}',
+                    '--participation=0'], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--polls', type=int, default=10)
+    parser.add_argument('--votes', type=int, default=2000, help="Votes over all writers")
+    parser.add_argument('--writers', type=int, default=4, help="Concurrent writer processes")
+    parser.add_argument('--postgres', action='store_true', help="Also run against PostgreSQL")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--writer', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--barrier', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    rows = []
+    with seeded_database(users=args.users, polls=args.polls, participation=0) as db_path:
+        for config, env in CONFIGS.items():
+            if config == 'postgresql':
+                continue
+            rows.append(run_writers(config, {**env, 'SQLITE_PATH': fresh_copy(db_path, config)}, args))
+    if args.postgres:
+        seed_postgres(args)
+        rows.append(run_writers('postgresql', CONFIGS['postgresql'], args))
+    print_table(rows, ['config', 'votes', 'seconds', 'votes_per_s', 'worst_p95_ms', 'statuses'])
+
+
+if __name__ == '__main__':
+    main()
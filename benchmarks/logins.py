@@ -0,0 +1,89 @@
+"""
+Login requests per second on one core, for each password hasher.
+
+The seeded users have PBKDF2 hashes, as after a deployment that switches
+PASSWORD_HASHER: every user logs in twice, the first login also rehashes the
+password with the configured hasher. Then every user tries a wrong password,
+and finally one username is guessed at until it is throttled, after which
+logins are refused before hashing.
+
+    python benchmarks/logins.py --users 50
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import fresh_copy, print_table, run_worker, seeded_database, setup_django
+
+PASSWORD = 'password'
+
+CONFIGS = {
+    'pbkdf2': {'PASSWORD_HASHER': 'pbkdf2'},
+    'pbkdf2-fast': {'PASSWORD_HASHER': 'pbkdf2', 'PASSWORD_PBKDF2_ITERATIONS': '100000'},
+    'scrypt': {'PASSWORD_HASHER': 'scrypt'},
+    'argon2': {'PASSWORD_HASHER': 'argon2'},
+}
+
+
+def worker(args):
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.urls import reverse
+
+    url = reverse('accounts:login')
+    usernames = list(User.objects.order_by('id').values_list('username', flat=True)[:args.users])
+
+    def run(attempts):
+        """
+        attempts is a list of (username, password, ip), each from a new client
+        """
+        statuses = {}
+        started = time.perf_counter()
+        for username, password, ip in attempts:
+            response = Client(SERVER_NAME='localhost', REMOTE_ADDR=ip).post(
+                url, {'username': username, 'password': password})
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+        elapsed = time.perf_counter() - started
+        return {'requests': len(attempts), 'rps': round(len(attempts) / elapsed, 1),
+                'ms': round(elapsed / len(attempts) * 1000, 2), 'statuses': statuses}
+
+    # A client IP per user, so the IP limit stays out of the way
+    ips = [f'10.0.{number // 250}.{number % 250 + 1}' for number in range(len(usernames))]
+    results = {
+        'first login': run([(username, PASSWORD, ip) for username, ip in zip(usernames, ips)]),
+        'login': run([(username, PASSWORD, ip) for username, ip in zip(usernames, ips)]),
+        'wrong password': run([(username, 'wrong', ip) for username, ip in zip(usernames, ips)]),
+        'guessing': run([(usernames[0], f'guess{number}', '10.1.0.1') for number in range(len(usernames))]),
+    }
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    rows = []
+    with seeded_database(users=args.users, polls=1, participation=0, password=PASSWORD) as db_path:
+        for config, env in CONFIGS.items():
+            if config == 'argon2':
+                import importlib.util
+                if importlib.util.find_spec('argon2') is None:
+                    print("Skipping argon2, argon2-cffi isn't installed")
+                    continue
+            result = run_worker(__file__, fresh_copy(db_path, config), f'--users={args.users}', env=env)
+            for scenario, numbers in result.items():
+                rows.append({'hasher': config, 'scenario': scenario, **numbers})
+    print_table(rows, ['hasher', 'scenario', 'requests', 'rps', 'ms', 'statuses'])
+
+
+if __name__ == '__main__':
+    main()
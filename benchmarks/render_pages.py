@@ -0,0 +1,86 @@
+"""
+Render time of the poll list and poll result templates, with and without
+the cached template loader and the {% cache %} fragments.
+
+Only the template rendering is timed: the polls and results are read once
+up front, then every page is rendered --renders times.
+
+    python benchmarks/render_pages.py --polls 200 --renders 500
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import print_table, run_worker, seeded_database, setup_django
+
+UNCACHED_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def timed(render, count):
+    timings = []
+    for _ in range(count):
+        started = time.perf_counter()
+        render()
+        timings.append(time.perf_counter() - started)
+    quantiles = statistics.quantiles(timings, n=100)
+    return {'mean_ms': round(statistics.fmean(timings) * 1000, 3), 'p95_ms': round(quantiles[94] * 1000, 3)}
+
+
+def worker(args):
+    setup_django()
+    from django.conf import settings
+    if args.variant == 'uncached':
+        # Before any template or cache is used, so the engines pick it up
+        settings.TEMPLATES[0]['OPTIONS']['loaders'] = UNCACHED_LOADERS
+        settings.CACHES['template_fragments'] = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    from django.contrib.auth.models import User
+    from django.template.loader import render_to_string
+    from django.test import RequestFactory
+    from polls.models import Poll
+
+    user = User.objects.order_by('id').first()
+    request = RequestFactory(SERVER_NAME='localhost').get('/')
+    request.user = user
+    polls = list(Poll.objects.for_listing(user).order_by('id')[:args.page_size])
+    poll = Poll.objects.order_by('id').first()
+    list_context = {'polls': polls, 'params': '', 'search_term': ''}
+    result_context = {'poll': poll, 'results': poll.get_results()}
+    print(json.dumps({
+        'list': timed(lambda: render_to_string('polls/polls_list.html', list_context, request), args.renders),
+        'result': timed(lambda: render_to_string('polls/poll_result.html', result_context, request), args.renders),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--polls', type=int, default=100)
+    parser.add_argument('--page-size', type=int, default=20, help="Polls on the list page")
+    parser.add_argument('--renders', type=int, default=500, help="Renders per page")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--variant', choices=['uncached', 'cached'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    rows = []
+    with seeded_database(users=args.users, polls=args.polls) as db_path:
+        for variant in ('uncached', 'cached'):
+            result = run_worker(__file__, db_path, f'--variant={variant}',
+                                f'--page-size={args.page_size}', f'--renders={args.renders}')
+            for page, timings in result.items():
+                rows.append({'page': page, 'variant': variant, **timings})
+    rows.sort(key=lambda row: row['page'])
+    print_table(rows, ['page', 'variant', 'mean_ms', 'p95_ms'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Database queries and writes per vote for each session and message storage.
+
+Every user votes once, then votes again and follows the redirect to the
+"already voted" message on the poll list. Numbers are per user and
+scenario; session queries are the ones on the django_session table.
+
+    python benchmarks/session_storage.py --users 500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import fresh_copy, print_table, run_worker, seeded_database, setup_django
+
+CONFIGS = [
+    ('db', 'django.contrib.messages.storage.fallback.FallbackStorage'),
+    ('db', 'pollme.messages.AlertCookieStorage'),
+    ('cached_db', 'pollme.messages.AlertCookieStorage'),
+    ('cache', 'pollme.messages.AlertCookieStorage'),
+    ('signed_cookies', 'pollme.messages.AlertCookieStorage'),
+]
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = self.writes = self.session_queries = self.session_writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        statement = sql.lstrip().split(None, 1)[0].upper()
+        if statement not in ('SAVEPOINT', 'RELEASE', 'ROLLBACK'):
+            self.queries += 1
+            is_write = statement in WRITES
+            self.writes += is_write
+            if 'django_session' in sql:
+                self.session_queries += 1
+                self.session_writes += is_write
+        return execute(sql, params, many, context)
+
+
+def worker(args):
+    setup_django()
+    from django.conf import settings
+    settings.SESSION_ENGINE = settings.SESSION_ENGINES[args.session]
+    settings.MESSAGE_STORAGE = args.messages
+    # Room for every session, evicted sessions would log users out
+    settings.CACHES['default'].setdefault('OPTIONS', {})['MAX_ENTRIES'] = 100000
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+    from polls.models import Poll
+
+    poll = Poll.objects.order_by('id').first()
+    choice = poll.choice_set.order_by('id').first()
+    url = reverse('polls:vote', args=[poll.pk])
+    clients = []
+    for user in User.objects.order_by('id')[:args.users]:
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(user)
+        clients.append(client)
+
+    results = {}
+    for scenario in ('vote', 'revote'):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            for client in clients:
+                client.post(url, {'choice': choice.pk}, follow=scenario == 'revote')
+        elapsed = time.perf_counter() - started
+        requests = len(clients)
+        results[scenario] = {
+            'queries': round(counter.queries / requests, 2),
+            'writes': round(counter.writes / requests, 2),
+            'session_queries': round(counter.session_queries / requests, 2),
+            'session_writes': round(counter.session_writes / requests, 2),
+            'rps': round(requests / elapsed, 1),
+        }
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--session', help=argparse.SUPPRESS)
+    parser.add_argument('--messages', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    rows = []
+    with seeded_database(users=args.users, polls=1, participation=0) as db_path:
+        for session, messages in CONFIGS:
+            result = run_worker(__file__, fresh_copy(db_path, session), f'--users={args.users}',
+                                f'--session={session}', f'--messages={messages}')
+            for scenario, numbers in result.items():
+                rows.append({'scenario': scenario, 'session': session,
+                             'messages': messages.rsplit('.', 1)[1], **numbers})
+    rows.sort(key=lambda row: row['scenario'] != 'vote')
+    print_table(rows, ['scenario', 'session', 'messages', 'queries', 'writes', 'session_queries',
+                       'session_writes', 'rps'])
+
+
+if __name__ == '__main__':
+    main()
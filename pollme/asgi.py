@@ -0,0 +1,19 @@
+"""
+ASGI config for pollme project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server such as uvicorn or daphne, and set
+POLLS_ASYNC_VIEWS=true to route poll detail, vote and results to the
+async views.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pollme.settings')
+
+application = get_asgi_application()
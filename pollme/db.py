@@ -0,0 +1,29 @@
+"""
+Connection setup for the SQLite databases of pollme.settings_production
+"""
+import re
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+PRAGMA_NAME_RE = re.compile(r'[a-z_]+')
+PRAGMA_VALUE_RE = re.compile(r'-?[A-Za-z0-9_]+')
+
+
+def pragma_sql(name, value):
+    """
+    PRAGMA takes no query parameters, so names and values are checked instead
+    """
+    if not PRAGMA_NAME_RE.fullmatch(name) or not PRAGMA_VALUE_RE.fullmatch(str(value)):
+        raise ImproperlyConfigured(f"Invalid SQLite pragma {name!r} = {value!r}")
+    return f'PRAGMA {name} = {value}'
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Apply SQLITE_PRAGMAS to new connections of every SQLite database alias
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(pragma_sql(name, value))
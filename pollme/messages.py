@@ -0,0 +1,37 @@
+import re
+from django.contrib.messages.storage.base import Message
+from django.contrib.messages.storage.cookie import CookieStorage
+
+ALERT_TAGS = 'alert alert-{} alert-dismissible fade show'
+ALERT_TAGS_RE = re.compile(r'alert alert-([a-z]+) alert-dismissible fade show')
+# Marks shortened tags, can't start a CSS class list
+SHORT_PREFIX = '~'
+
+
+class AlertCookieStorage(CookieStorage):
+    """
+    Messages in a signed cookie, never touching the session. The dismissible
+    alert classes the views tag their messages with are stored as just their
+    color, which keeps the cookie small.
+    """
+
+    def _store(self, messages, response, *args, **kwargs):
+        return super()._store([self._shorten(message) for message in messages], response, *args, **kwargs)
+
+    def _get(self, *args, **kwargs):
+        messages, all_retrieved = super()._get(*args, **kwargs)
+        if messages:
+            messages = [self._expand(message) for message in messages]
+        return messages, all_retrieved
+
+    def _shorten(self, message):
+        match = ALERT_TAGS_RE.fullmatch(message.extra_tags or '')
+        if match is None:
+            return message
+        return Message(message.level, message.message, extra_tags=SHORT_PREFIX + match[1])
+
+    def _expand(self, message):
+        extra_tags = getattr(message, 'extra_tags', None)
+        if not extra_tags or not extra_tags.startswith(SHORT_PREFIX):
+            return message
+        return Message(message.level, message.message, extra_tags=ALERT_TAGS.format(extra_tags[1:]))
@@ -0,0 +1,262 @@
+"""
+Per-view request timings, enabled with PERF_METRICS.
+
+``PerfMiddleware`` records the wall time, database queries, database time and
+template render time of a sample of requests (PERF_SAMPLE_RATE), keyed by the
+resolved URL name such as ``polls:vote``. The numbers go into fixed-bucket
+histograms kept in memory, one set per process, and are read through the
+staff-only views in pollme/views.py as JSON or in the Prometheus text format.
+
+Queries run from sync_to_async threads and nested templates count towards the
+request they belong to, as the current sample lives in a context variable.
+"""
+import bisect
+import contextvars
+import functools
+import random
+import threading
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.base import Template
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+UNRESOLVED = '<unresolved>'
+
+_current_sample = contextvars.ContextVar('perf_sample', default=None)
+
+
+class Histogram:
+    """
+    Counts of observations per bucket, with an upper bound per bucket and a
+    last bucket for anything larger
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Estimate the q quantile by interpolating inside its bucket, like
+        Prometheus' histogram_quantile
+        """
+        if not self.count:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if index == len(self.bounds):
+                    return self.max
+                lower = self.bounds[index - 1] if index else 0
+                upper = min(self.bounds[index], self.max)
+                return lower + (upper - lower) * max(rank - seen, 0) / count
+            seen += count
+        return self.max
+
+    def summary(self, scale=1):
+        return {
+            'mean': round(self.sum / self.count * scale, 3) if self.count else 0,
+            'p50': round(self.quantile(0.5) * scale, 3),
+            'p95': round(self.quantile(0.95) * scale, 3),
+            'p99': round(self.quantile(0.99) * scale, 3),
+            'max': round(self.max * scale, 3),
+        }
+
+
+class ViewStats:
+    def __init__(self):
+        self.wall = Histogram(SECONDS_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db = Histogram(SECONDS_BUCKETS)
+        self.template = Histogram(SECONDS_BUCKETS)
+
+    def histograms(self):
+        return {
+            'request_seconds': self.wall,
+            'db_queries': self.queries,
+            'db_seconds': self.db,
+            'template_seconds': self.template,
+        }
+
+
+class PerfStats:
+    """
+    ViewStats per URL name, safe to update from several threads
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view_name, sample, wall_time):
+        with self.lock:
+            stats = self.views.get(view_name)
+            if stats is None:
+                stats = self.views[view_name] = ViewStats()
+            stats.wall.observe(wall_time)
+            stats.queries.observe(sample.queries)
+            stats.db.observe(sample.db_time)
+            stats.template.observe(sample.template_time)
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                view_name: {
+                    'requests': stats.wall.count,
+                    'wall_ms': stats.wall.summary(1000),
+                    'queries': stats.queries.summary(),
+                    'db_ms': stats.db.summary(1000),
+                    'template_ms': stats.template.summary(1000),
+                }
+                for view_name, stats in sorted(self.views.items())
+            }
+
+    def as_prometheus(self):
+        lines = []
+        with self.lock:
+            views = sorted(self.views.items())
+            for metric, help_text in METRICS:
+                name = f'pollme_{metric}'
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for view_name, stats in views:
+                    histogram = stats.histograms()[metric]
+                    label = view_name.replace('\\', '\\\\').replace('"', '\\"')
+                    cumulative = 0
+                    for bound, count in zip((*histogram.bounds, '+Inf'), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{view="{label}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{view="{label}"}} {histogram.sum}')
+                    lines.append(f'{name}_count{{view="{label}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = [
+    ('request_seconds', "Wall time of sampled requests"),
+    ('db_queries', "Database queries per sampled request"),
+    ('db_seconds', "Database time per sampled request"),
+    ('template_seconds', "Template render time per sampled request"),
+]
+
+stats = PerfStats()
+
+
+class Sample:
+    __slots__ = ('queries', 'db_time', 'template_time', 'rendering')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0
+        self.template_time = 0
+        self.rendering = False
+
+
+def time_query(execute, sql, params, many, context):
+    sample = _current_sample.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.db_time += time.perf_counter() - started
+        sample.queries += 1
+
+
+def _install_query_timer(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def _install_template_timer():
+    original = Template.render
+    if getattr(original, 'perf_timed', False):
+        return
+
+    @functools.wraps(original)
+    def render(self, context):
+        sample = _current_sample.get()
+        if sample is None or sample.rendering:
+            # Included templates are part of the outer render
+            return original(self, context)
+        sample.rendering = True
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            sample.template_time += time.perf_counter() - started
+            sample.rendering = False
+
+    render.perf_timed = True
+    Template.render = render
+
+
+def install():
+    connection_created.connect(_install_query_timer, dispatch_uid='pollme.perf')
+    for connection in connections.all(initialized_only=True):
+        _install_query_timer(None, connection)
+    _install_template_timer()
+
+
+class PerfMiddleware:
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERF_METRICS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PERF_SAMPLE_RATE', 1.0)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        install()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        sample = Sample()
+        token = _current_sample.set(sample)
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            _current_sample.reset(token)
+            self.record(request, sample, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+        sample = Sample()
+        token = _current_sample.set(sample)
+        started = time.perf_counter()
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_sample.reset(token)
+            self.record(request, sample, time.perf_counter() - started)
+
+    def record(self, request, sample, wall_time):
+        match = getattr(request, 'resolver_match', None)
+        stats.record(match.view_name if match else UNRESOLVED, sample, wall_time)
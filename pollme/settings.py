@@ -1,4 +1,6 @@
+import importlib.util
 import os
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -36,8 +38,14 @@ AUTHENTICATION_BACKENDS = (
 )
 
 MIDDLEWARE = [
+    # Outermost, so it times the other middleware too. Off unless PERF_METRICS is set.
+    'pollme.perf.PerfMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # ETags from the response body, result pages render the same bytes until votes change
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    # Only with a read replica, see below
+    'polls.routing.PinPrimaryMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -52,8 +60,15 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Compiled templates are kept per process; runserver resets them
+            # when a template changes
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -67,14 +82,115 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'pollme.wsgi.application'
+ASGI_APPLICATION = 'pollme.asgi.application'
+
+# Serve poll detail and voting with the async views of polls/async_views.py.
+# Pays off under an ASGI server (pollme.asgi).
+POLLS_ASYNC_VIEWS = os.environ.get('POLLS_ASYNC_VIEWS', 'false').lower() == 'true'
+
+# Seconds between checks for new votes of the live results stream, shared by
+# every watcher of a poll
+POLLS_STREAM_TICK = float(os.environ.get('POLLS_STREAM_TICK', 0.25))
+
+# Per-view timings of a share of requests (PERF_SAMPLE_RATE, 0 to 1), read by
+# staff at /perf/ and /perf/metrics/ (Prometheus)
+PERF_METRICS = os.environ.get('PERF_METRICS', 'false').lower() == 'true'
+PERF_SAMPLE_RATE = float(os.environ.get('PERF_SAMPLE_RATE', 0.1))
 
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.environ.get('SQLITE_PATH', os.path.join(BASE_DIR, 'db.sqlite3')),
+    }
+}
+
+# Poll lists, poll pages and API reads use the 'replica' database when there
+# is one (polls/routing.py). Users who just wrote read the default database
+# for POLLS_REPLICA_STICKY_SECONDS. SQLITE_REPLICA_PATH names a copy of the
+# SQLite file to try it locally.
+DATABASE_ROUTERS = ['polls.routing.ReplicaRouter']
+POLLS_REPLICA_DATABASE = 'replica'
+POLLS_REPLICA_STICKY_SECONDS = int(os.environ.get('POLLS_REPLICA_STICKY_SECONDS', 5))
+if os.environ.get('SQLITE_REPLICA_PATH'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['SQLITE_REPLICA_PATH'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+
+# Local memory by default. Set CACHE_DIR to share the cache between worker
+# processes through the file system.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pollme',
+    }
+}
+if os.environ.get('CACHE_DIR'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['CACHE_DIR'],
     }
+
+# Poll list pagination: 'page' uses page numbers, 'cursor' uses keyset
+# pagination, which stays fast deep into large tables
+POLLS_PAGINATION = os.environ.get('POLLS_PAGINATION', 'page')
+
+# Dotted path of the poll search backend. Unset picks the full-text backend
+# of the database: FTS5 on SQLite, tsvector + GIN on PostgreSQL.
+POLLS_SEARCH_BACKEND = os.environ.get('POLLS_SEARCH_BACKEND')
+
+# Poll results cache: ended polls are kept until invalidated, active polls
+# for POLLS_RESULTS_CACHE_TTL seconds
+POLLS_RESULTS_CACHE = 'default'
+POLLS_RESULTS_CACHE_TTL = int(os.environ.get('POLLS_RESULTS_CACHE_TTL', 5))
+
+# Sessions: 'db' stores them in the database, 'cache' in CACHES only (lost with
+# the cache), 'cached_db' reads the cache and writes both, 'signed_cookies'
+# keeps them in the browser and needs no storage at all
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('SESSION_STORE', 'db')]
+
+# Flash messages live in a cookie, so showing one needs no session
+MESSAGE_STORAGE = 'pollme.messages.AlertCookieStorage'
+
+# Password hashing: PASSWORD_HASHER picks the algorithm of new hashes, with
+# the cost below. Hashes of the other algorithms still verify and are
+# replaced on the next login. argon2 needs the argon2-cffi package.
+PASSWORD_HASHER_CLASSES = {
+    'pbkdf2': 'accounts.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'accounts.hashers.ScryptPasswordHasher',
+    'argon2': 'accounts.hashers.Argon2PasswordHasher',
 }
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+if PASSWORD_HASHER == 'argon2' and importlib.util.find_spec('argon2') is None:
+    raise ImproperlyConfigured("PASSWORD_HASHER=argon2 needs the argon2-cffi package")
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_CLASSES[PASSWORD_HASHER],
+    *(path for name, path in PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 720000))
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.environ.get('PASSWORD_SCRYPT_WORK_FACTOR', 2 ** 14))
+# One lane and 19 MiB: cheap on a single core, as strong as OWASP asks for
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 19456))
+PASSWORD_ARGON2_PARALLELISM = int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', 1))
+
+# Login throttling, see accounts/throttling.py: after LIMIT failed logins of a
+# username or from an IP within WINDOW seconds, logins are refused unhashed
+LOGIN_THROTTLE_CACHE = 'default'
+LOGIN_THROTTLE_WINDOW = int(os.environ.get('LOGIN_THROTTLE_WINDOW', 300))
+LOGIN_THROTTLE_USERNAME_LIMIT = int(os.environ.get('LOGIN_THROTTLE_USERNAME_LIMIT', 5))
+LOGIN_THROTTLE_IP_LIMIT = int(os.environ.get('LOGIN_THROTTLE_IP_LIMIT', 50))
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -104,6 +220,20 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static')
 ]
 
+# Vote ingestion: 'sync' stores every vote in the request, 'queued' acknowledges
+# votes and stores them in batches from a background thread (see polls/ingestion.py)
+POLLS_VOTE_INGESTION = os.environ.get('POLLS_VOTE_INGESTION', 'sync')
+POLLS_VOTE_BATCH_SIZE = int(os.environ.get('POLLS_VOTE_BATCH_SIZE', 500))
+POLLS_VOTE_FLUSH_INTERVAL = float(os.environ.get('POLLS_VOTE_FLUSH_INTERVAL', 0.5))
+# Every process journals its acknowledged votes to its own file in this directory
+POLLS_VOTE_JOURNAL_DIR = os.environ.get('POLLS_VOTE_JOURNAL_DIR', os.path.join(BASE_DIR, 'vote_journal'))
+POLLS_VOTE_JOURNAL_FSYNC = os.environ.get('POLLS_VOTE_JOURNAL_FSYNC', 'true').lower() == 'true'
+
+# Batch vote API: most votes per request, and the bearer tokens of services
+# allowed to vote for any user (comma separated)
+POLLS_BATCH_VOTE_LIMIT = int(os.environ.get('POLLS_BATCH_VOTE_LIMIT', 5000))
+POLLS_SERVICE_TOKENS = [token for token in os.environ.get('POLLS_SERVICE_TOKENS', '').split(',') if token]
+
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/polls/list/'
 LOGOUT_URL = '/accounts/logout/'
@@ -123,3 +253,22 @@ SOCIAL_AUTH_INSTAGRAM_OAUTH2_SECRET = os.environ.get('INSTAGRAM_OAUTH2_SECRET',
 
 SOCIAL_AUTH_GITHUB_KEY = os.environ.get('GITHUB_KEY', 'your_client_id')
 SOCIAL_AUTH_GITHUB_SECRET = os.environ.get('GITHUB_SECRET', 'your_client_secret')
+
+# Where a failed social login shows its message
+SOCIAL_AUTH_LOGIN_ERROR_URL = LOGIN_URL
+
+# The default pipeline, plus refuse_taken_email: emails are unique, a social
+# login with the email of an existing account is refused with a message
+# instead of failing to create a second one
+SOCIAL_AUTH_PIPELINE = (
+    'social_core.pipeline.social_auth.social_details',
+    'social_core.pipeline.social_auth.social_uid',
+    'social_core.pipeline.social_auth.auth_allowed',
+    'social_core.pipeline.social_auth.social_user',
+    'social_core.pipeline.user.get_username',
+    'accounts.pipeline.refuse_taken_email',
+    'social_core.pipeline.user.create_user',
+    'social_core.pipeline.social_auth.associate_user',
+    'social_core.pipeline.social_auth.load_extra_data',
+    'social_core.pipeline.user.user_details',
+)
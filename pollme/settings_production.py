@@ -0,0 +1,89 @@
+"""
+Production settings, configured from the environment:
+
+    DJANGO_SETTINGS_MODULE=pollme.settings_production DJANGO_SECRET_KEY=... DB_ENGINE=postgresql
+
+DB_ENGINE picks PostgreSQL for anything beyond one machine, or SQLite in WAL
+mode as the single node fallback. Database connections stay open between
+requests for DB_CONN_MAX_AGE seconds.
+"""
+import os
+import django
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.signals import connection_created
+from .db import configure_sqlite, pragma_sql
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+DEBUG = False
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+ALLOWED_HOSTS = [host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host]
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'pollme'),
+            'USER': os.environ.get('POSTGRES_USER', 'pollme'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            # A connection that died while idle is replaced instead of failing the request
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('DB_POOL', 'false').lower() == 'true':
+        # psycopg's connection pool, shared by the threads of a worker process
+        if django.VERSION < (5, 1):
+            raise ImproperlyConfigured("DB_POOL needs Django 5.1 or later, use DB_CONN_MAX_AGE instead")
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+    if os.environ.get('POSTGRES_REPLICA_HOST'):
+        # Read replica for the views of polls/routing.py
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': os.environ['POSTGRES_REPLICA_HOST'],
+            'PORT': os.environ.get('POSTGRES_REPLICA_PORT', DATABASES['default']['PORT']),
+            'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+            'TEST': {'MIRROR': 'default'},
+        }
+elif DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', os.path.join(BASE_DIR, 'db.sqlite3')),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        }
+    }
+    if os.environ.get('SQLITE_REPLICA_PATH'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'NAME': os.environ['SQLITE_REPLICA_PATH'],
+            'TEST': {'MIRROR': 'default'},
+        }
+    # Run on every new connection of both databases by pollme.db.configure_sqlite.
+    # WAL lets readers work while a vote is written, writers wait up to
+    # busy_timeout milliseconds for each other, and synchronous=NORMAL only
+    # syncs the WAL at checkpoints: a power loss can drop the last votes, never
+    # corrupt the file.
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+    }
+    # Bad values fail here rather than on the first connection
+    for name, value in SQLITE_PRAGMAS.items():
+        pragma_sql(name, value)
+    connection_created.connect(configure_sqlite, dispatch_uid='pollme.db.configure_sqlite')
+else:
+    raise ImproperlyConfigured(f"Unknown DB_ENGINE {DB_ENGINE!r}, use 'postgresql' or 'sqlite'")
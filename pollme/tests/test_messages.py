@@ -0,0 +1,48 @@
+from django.contrib import messages
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.contrib.messages.storage.base import Message
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from pollme.messages import AlertCookieStorage
+from polls.models import Poll, Choice
+
+
+class AlertCookieStorageTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='example', password='example1234')
+        self.poll = Poll.objects.create(text='Test Poll', owner=self.user)
+        self.choice = Choice.objects.create(poll=self.poll, choice_text='Choice 1')
+        self.client.force_login(self.user)
+
+    def test_alert_tags_are_shortened_in_the_cookie(self):
+        self.poll.add_vote(self.user, self.choice)
+        response = self.client.post(reverse('polls:vote', args=[self.poll.pk]), {'choice': self.choice.pk})
+        [stored] = AlertCookieStorage(response.wsgi_request)._decode(response.cookies['messages'].value)
+        self.assertEqual(stored.extra_tags, '~warning')
+
+        response = self.client.get(response.url)
+        [message] = list(response.context['messages'])
+        self.assertEqual(message.message, "You already voted this poll!")
+        self.assertEqual(message.level, messages.ERROR)
+        self.assertEqual(message.tags, 'alert alert-warning alert-dismissible fade show error')
+
+    def test_other_tags_are_kept(self):
+        request = self.client.get(reverse('polls:list')).wsgi_request
+        storage = get_messages(request)
+        message = storage._shorten(Message(messages.INFO, "Hi", extra_tags='custom'))
+        self.assertEqual(message.extra_tags, 'custom')
+        self.assertEqual(storage._expand(message).extra_tags, 'custom')
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_vote_without_session_storage(self):
+        # Logs in again with the signed cookie engine
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('polls:vote', args=[self.poll.pk]), {'choice': self.choice.pk})
+            self.client.post(reverse('polls:vote', args=[self.poll.pk]), {'choice': self.choice.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if 'django_session' in query['sql']])
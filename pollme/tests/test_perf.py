@@ -0,0 +1,83 @@
+from django.contrib.auth.models import User
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from polls.models import Poll
+from pollme import perf
+
+
+class HistogramTest(TestCase):
+
+    def test_quantiles(self):
+        histogram = perf.Histogram((1, 2, 4, 8))
+        for value in [0.5] * 50 + [3] * 45 + [6] * 5:
+            histogram.observe(value)
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.quantile(0.5), 1)
+        self.assertEqual(histogram.quantile(0.95), 4)
+        self.assertAlmostEqual(histogram.quantile(0.99), 5.6)
+
+    def test_quantile_above_last_bound_is_the_max(self):
+        histogram = perf.Histogram((1, 2))
+        histogram.observe(30)
+        self.assertEqual(histogram.quantile(0.5), 30)
+
+    def test_empty(self):
+        self.assertEqual(perf.Histogram((1,)).summary()['p99'], 0)
+
+
+@override_settings(PERF_METRICS=True, PERF_SAMPLE_RATE=1.0)
+class PerfMiddlewareTest(TestCase):
+
+    def setUp(self):
+        perf.stats.reset()
+        self.user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        self.staff = User.objects.create_user(username='staff', password='staff1234', is_staff=True)
+        Poll.objects.create(text='Test Poll', owner=self.user)
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        perf.stats.reset()
+
+    def test_records_per_url_name(self):
+        self.client.get(reverse('polls:list'))
+        self.client.get(reverse('polls:list'))
+        self.client.get('/missing/')
+        views = perf.stats.as_dict()
+        self.assertEqual(set(views), {'polls:list', perf.UNRESOLVED})
+        stats = views['polls:list']
+        self.assertEqual(stats['requests'], 2)
+        self.assertGreater(stats['queries']['p50'], 0)
+        self.assertGreater(stats['db_ms']['max'], 0)
+        self.assertGreater(stats['template_ms']['max'], 0)
+        self.assertGreaterEqual(stats['wall_ms']['max'], stats['template_ms']['max'])
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_recorded(self):
+        self.client.get(reverse('polls:list'))
+        self.assertEqual(perf.stats.as_dict(), {})
+
+    @override_settings(PERF_METRICS=False)
+    def test_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            perf.PerfMiddleware(lambda request: None)
+
+    def test_stats_are_staff_only(self):
+        self.assertEqual(self.client.get(reverse('perf_stats')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('perf_metrics')).status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('perf_stats')).status_code, 302)
+
+    def test_stats_views(self):
+        self.client.get(reverse('polls:list'))
+        self.client.force_login(self.staff)
+        data = self.client.get(reverse('perf_stats')).json()
+        self.assertTrue(data['enabled'])
+        self.assertEqual(data['views']['polls:list']['requests'], 1)
+
+        response = self.client.get(reverse('perf_metrics'))
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        text = response.content.decode()
+        self.assertIn('# TYPE pollme_request_seconds histogram', text)
+        self.assertIn('pollme_request_seconds_bucket{view="polls:list",le="+Inf"} 1', text)
+        self.assertIn('pollme_db_queries_count{view="polls:list"} 1', text)
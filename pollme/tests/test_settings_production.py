@@ -0,0 +1,76 @@
+import importlib
+import os
+import sys
+from unittest import mock
+import django
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from pollme.db import configure_sqlite, pragma_sql
+
+
+def load_production_settings(**environ):
+    with mock.patch.dict(os.environ, {'DJANGO_SECRET_KEY': 'secret', **environ}):
+        sys.modules.pop('pollme.settings_production', None)
+        try:
+            return importlib.import_module('pollme.settings_production')
+        finally:
+            sys.modules.pop('pollme.settings_production', None)
+
+
+class ProductionSettingsTest(SimpleTestCase):
+
+    def test_sqlite(self):
+        settings = load_production_settings(DB_ENGINE='sqlite', SQLITE_SYNCHRONOUS='FULL')
+        self.assertFalse(settings.DEBUG)
+        self.assertEqual(settings.DATABASES['default']['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(settings.DATABASES['default']['CONN_MAX_AGE'], 60)
+        self.assertEqual(settings.SQLITE_PRAGMAS, {'journal_mode': 'WAL', 'synchronous': 'FULL', 'busy_timeout': 5000})
+
+    def test_sqlite_rejects_bad_pragmas(self):
+        with self.assertRaises(ImproperlyConfigured):
+            load_production_settings(DB_ENGINE='sqlite', SQLITE_JOURNAL_MODE='WAL; DROP TABLE polls_poll')
+
+    def test_postgresql(self):
+        settings = load_production_settings(DB_ENGINE='postgresql', POSTGRES_HOST='db', DB_CONN_MAX_AGE='300')
+        database = settings.DATABASES['default']
+        self.assertEqual(database['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(database['HOST'], 'db')
+        self.assertEqual(database['CONN_MAX_AGE'], 300)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+
+    def test_postgresql_pool(self):
+        if django.VERSION < (5, 1):
+            with self.assertRaises(ImproperlyConfigured):
+                load_production_settings(DB_ENGINE='postgresql', DB_POOL='true')
+            return
+        database = load_production_settings(DB_ENGINE='postgresql', DB_POOL='true', DB_POOL_MAX_SIZE='4').DATABASES['default']
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertEqual(database['OPTIONS']['pool']['max_size'], 4)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ImproperlyConfigured):
+            load_production_settings(DB_ENGINE='oracle')
+
+
+class ConfigureSQLiteTest(TestCase):
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied(self):
+        previous = self.pragma('busy_timeout')
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234}):
+            configure_sqlite(None, connection)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': previous}):
+            configure_sqlite(None, connection)
+
+    def test_pragma_sql(self):
+        self.assertEqual(pragma_sql('busy_timeout', 5000), 'PRAGMA busy_timeout = 5000')
+        for name, value in [('journal_mode', 'WAL; DROP TABLE polls_poll'), ('cache_size = 1; --', 1),
+                            ('synchronous', "'NORMAL'")]:
+            with self.assertRaises(ImproperlyConfigured):
+                pragma_sql(name, value)
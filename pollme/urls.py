@@ -5,6 +5,8 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('admin/', admin.site.urls),
+    path('perf/', views.PerfStatsView.as_view(), name='perf_stats'),
+    path('perf/metrics/', views.PerfMetricsView.as_view(), name='perf_metrics'),
     path('accounts/', include('accounts.urls', namespace="accounts")),
     path('polls/', include('polls.urls', namespace="polls")),
     path('social-auth/', include('social_django.urls', namespace="social")),
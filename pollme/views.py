@@ -1,5 +1,39 @@
+from django.conf import settings
+from django.contrib.auth.mixins import UserPassesTestMixin
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.views.generic import View
+from . import perf
 
 
 def home(request):
     return render(request, 'home.html')
+
+
+class StaffOnlyMixin(UserPassesTestMixin):
+    login_url = 'accounts:login'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+
+class PerfStatsView(StaffOnlyMixin, View):
+    """
+    Per-view timings of this process, see pollme/perf.py
+    """
+
+    def get(self, request):
+        return JsonResponse({
+            'enabled': settings.PERF_METRICS,
+            'sample_rate': settings.PERF_SAMPLE_RATE,
+            'views': perf.stats.as_dict(),
+        })
+
+
+class PerfMetricsView(StaffOnlyMixin, View):
+    """
+    The same timings in the Prometheus text format
+    """
+
+    def get(self, request):
+        return HttpResponse(perf.stats.as_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
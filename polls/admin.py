@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.utils.html import format_html_join
+from django.utils.safestring import mark_safe
 from .models import Poll, Choice, Vote
 
 
@@ -9,16 +11,26 @@ class ChoiceInline(admin.TabularInline):  # or admin.StackedInline for a differe
 
 @admin.register(Poll)
 class PollAdmin(admin.ModelAdmin):
-    list_display = ["text", "owner", "pub_date", "active", "created_at"]
+    list_display = ["text", "owner", "pub_date", "active", "vote_count", "created_at"]
     search_fields = ["text", "owner__username"]
     list_filter = ["active", 'created_at', 'pub_date']
     date_hierarchy = "pub_date"
+    readonly_fields = ["results"]
     inlines = [ChoiceInline]
 
+    @admin.display(description="Results")
+    def results(self, obj):
+        if obj.pk is None:
+            return "-"
+        results = obj.get_results()
+        lines = [f"{choice.text}: {choice.num_votes} ({choice.percentage:.1f}%)" for choice in results]
+        lines.append(f"Total: {results.total}")
+        return format_html_join(mark_safe("<br>"), "{}", ((line,) for line in lines))
+
 
 @admin.register(Choice)
 class ChoiceAdmin(admin.ModelAdmin):
-    list_display = ["choice_text", "poll", 'created_at', 'updated_at']
+    list_display = ["choice_text", "poll", "vote_count", 'created_at', 'updated_at']
     search_fields = ["choice_text", "poll__text"]
     autocomplete_fields = ["poll"]
 
@@ -0,0 +1,370 @@
+"""
+JSON API for polls and their results.
+
+Read responses carry an ETag and a Last-Modified header built from
+``Poll.updated_at``, which votes and choice changes bump as well, so
+clients and caches can revalidate with a single indexed lookup on the poll
+table and get ``304 Not Modified`` without any page being rendered.
+
+Votes can be sent in batches to ``BatchVoteAPI``, and ``PollTimeSeriesAPI``
+serves votes over time from the rollups.
+"""
+import datetime
+import json
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.db.models import Count, Max
+from django.http import Http404, JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.decorators import method_decorator
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.generic import View
+from .models import Poll, Choice, Vote, VoteRollup, RollupWatermark
+from .pagination import KeysetPage
+from .rollups import WATERMARK, truncate
+from .routing import ReplicaReadMixin
+from .views import filter_polls, paginate_polls
+
+
+def poll_data(poll):
+    return {
+        'id': poll.pk,
+        'text': poll.text,
+        'pub_date': poll.pub_date,
+        'active': poll.active,
+        'vote_count': poll.vote_count,
+        'url': reverse('polls:api_detail', args=[poll.pk]),
+        'results_url': reverse('polls:api_results', args=[poll.pk]),
+    }
+
+
+def version_tag(prefix, updated_at):
+    return f'{prefix}-{updated_at.timestamp():.6f}' if updated_at else f'{prefix}-0'
+
+
+class ConditionalJSONView(ReplicaReadMixin, View):
+    """
+    Answers 304 when the client's ETag or date is current. Subclasses give
+    the validators with get_validators() and build the body in get_data(),
+    which only runs when the client needs it.
+    """
+    login_required = False
+
+    def get(self, request, **kwargs):
+        if self.login_required and not request.user.is_authenticated:
+            return JsonResponse({'error': "Authentication required"}, status=401)
+        etag, last_modified = self.get_validators(request, **kwargs)
+        etag = quote_etag(etag)
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = JsonResponse(self.get_data(request, **kwargs))
+        response.headers.setdefault('ETag', etag)
+        if last_modified:
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+        # Caches may keep a copy but have to revalidate it on every use, shared
+        # caches only of what anyone may see
+        scope = {'private': True} if self.login_required else {'public': True}
+        patch_cache_control(response, max_age=0, must_revalidate=True, **scope)
+        return response
+
+    def get_validators(self, request, **kwargs):
+        raise NotImplementedError
+
+    def get_data(self, request, **kwargs):
+        raise NotImplementedError
+
+
+class PollMixin:
+    def get_validators(self, request, poll_id):
+        try:
+            self.poll = Poll.objects.select_related('snapshot').get(pk=poll_id)
+        except Poll.DoesNotExist:
+            raise Http404("No poll found")
+        return version_tag(f'{self.etag_prefix}-{self.poll.pk}', self.poll.updated_at), self.poll.updated_at
+
+
+class PollListAPI(ConditionalJSONView):
+    """
+    Takes the search, sort and page parameters of the poll list page, and
+    like it needs a logged in user
+    """
+    login_required = True
+
+    def get_validators(self, request):
+        self.polls, self.sort_field, _ = filter_polls(request, Poll.objects.select_related('owner'))
+        # Counting catches deleted polls, the newest date catches everything else
+        state = self.polls.order_by().aggregate(count=Count('id'), last_modified=Max('updated_at'))
+        return version_tag(f'polls-{state["count"]}', state['last_modified']), state['last_modified']
+
+    def get_data(self, request):
+        page = paginate_polls(request, self.polls, self.sort_field)
+        if isinstance(page, KeysetPage):
+            next_page = page.next_cursor and {'cursor': page.next_cursor}
+            previous_page = page.previous_cursor and {'cursor': page.previous_cursor}
+        else:
+            next_page = page.has_next() and {'page': page.next_page_number()}
+            previous_page = page.has_previous() and {'page': page.previous_page_number()}
+        return {
+            'results': [{**poll_data(poll), 'owner': poll.owner.username} for poll in page],
+            'next': self.page_url(request, next_page),
+            'previous': self.page_url(request, previous_page),
+        }
+
+    @staticmethod
+    def page_url(request, params):
+        if not params:
+            return None
+        query = request.GET.copy()
+        query.pop('page', None)
+        query.pop('cursor', None)
+        query.update(params)
+        return f'{request.path}?{query.urlencode()}'
+
+
+class PollDetailAPI(PollMixin, ConditionalJSONView):
+    etag_prefix = 'poll'
+
+    def get_data(self, request, poll_id):
+        data = poll_data(self.poll)
+        data['choices'] = [
+            {'id': choice_id, 'text': text}
+            for choice_id, text in self.poll.choice_set.order_by('id').values_list('id', 'choice_text')
+        ]
+        return data
+
+
+class PollResultsAPI(PollMixin, ConditionalJSONView):
+    etag_prefix = 'results'
+
+    def get_data(self, request, poll_id):
+        results = self.poll.get_results()
+        return {
+            'poll_id': results.poll_id,
+            'active': self.poll.active,
+            'total': results.total,
+            'choices': [
+                {'id': choice.id, 'text': choice.text, 'num_votes': choice.num_votes,
+                 'percentage': choice.percentage}
+                for choice in results
+            ],
+        }
+
+
+class PollTimeSeriesAPI(ConditionalJSONView):
+    """
+    Votes per choice over time, read from the rollups. Takes ``granularity``
+    (minute, hour or day) and ISO 8601 ``since`` and ``until`` parameters.
+    """
+    default_spans = {
+        VoteRollup.MINUTE: datetime.timedelta(hours=2),
+        VoteRollup.HOUR: datetime.timedelta(days=7),
+        VoteRollup.DAY: datetime.timedelta(days=365),
+    }
+    bucket_sizes = {
+        VoteRollup.MINUTE: datetime.timedelta(minutes=1),
+        VoteRollup.HOUR: datetime.timedelta(hours=1),
+        VoteRollup.DAY: datetime.timedelta(days=1),
+    }
+    max_buckets = 5000
+
+    def get(self, request, poll_id):
+        try:
+            self.granularity, self.since, self.until = self.parse_range(request)
+        except ValueError as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        return super().get(request, poll_id=poll_id)
+
+    def parse_range(self, request):
+        granularity = request.GET.get('granularity', VoteRollup.HOUR)
+        if granularity not in self.default_spans:
+            raise ValueError(f"granularity must be one of {', '.join(self.default_spans)}")
+        bucket_size = self.bucket_sizes[granularity]
+        until = self.parse_moment(request, 'until')
+        # Start of the bucket a window without until ends in. The window moves
+        # with it, whole buckets at a time.
+        self.current_bucket = None
+        if until is None:
+            self.current_bucket = truncate(timezone.now(), granularity)
+            until = self.current_bucket + bucket_size
+        since = self.parse_moment(request, 'since') or until - self.default_spans[granularity]
+        if since >= until:
+            raise ValueError("since must be before until")
+        if (until - since) / bucket_size > self.max_buckets:
+            raise ValueError(f"At most {self.max_buckets} {granularity} buckets per request")
+        return granularity, since, until
+
+    @staticmethod
+    def parse_moment(request, name):
+        value = request.GET.get(name)
+        if not value:
+            return None
+        moment = parse_datetime(value)
+        if moment is None:
+            raise ValueError(f"{name} must be an ISO 8601 date and time")
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment, datetime.timezone.utc)
+        return moment
+
+    def get_validators(self, request, poll_id):
+        try:
+            self.poll = Poll.objects.get(pk=poll_id)
+        except Poll.DoesNotExist:
+            raise Http404("No poll found")
+        # Rollups only change when rollup_votes moves the watermark
+        watermark = RollupWatermark.objects.filter(name=WATERMARK).first()
+        last_vote_id = watermark.last_vote_id if watermark else 0
+        # A sliding window changes when a new bucket starts, even without new rollups
+        last_modified = max(filter(None, [self.poll.updated_at, watermark and watermark.updated_at,
+                                          self.current_bucket]))
+        window = f'{self.since.timestamp():.0f}-{self.until.timestamp():.0f}'
+        return version_tag(f'timeseries-{self.poll.pk}-{last_vote_id}-{window}', self.poll.updated_at), last_modified
+
+    def get_data(self, request, poll_id):
+        buckets = {}
+        rollups = (VoteRollup.objects
+                   .filter(poll=self.poll, granularity=self.granularity,
+                           bucket__gte=self.since, bucket__lt=self.until)
+                   .order_by('bucket').values_list('bucket', 'choice_id', 'votes'))
+        for bucket, choice_id, votes in rollups:
+            entry = buckets.setdefault(bucket, {'bucket': bucket, 'total': 0, 'counts': {}})
+            entry['total'] += votes
+            entry['counts'][str(choice_id)] = votes
+        return {
+            'poll_id': self.poll.pk,
+            'granularity': self.granularity,
+            'since': self.since,
+            'until': self.until,
+            'choices': [
+                {'id': choice_id, 'text': text}
+                for choice_id, text in self.poll.choice_set.order_by('id').values_list('id', 'choice_text')
+            ],
+            # Buckets without votes are left out
+            'buckets': list(buckets.values()),
+        }
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BatchVoteAPI(View):
+    """
+    Store many votes in one request.
+
+    Logged in users POST ``{"votes": [{"poll": 1, "choice": 3}, ...]}`` with
+    their session and CSRF token. Services listed in POLLS_SERVICE_TOKENS send
+    ``Authorization: Bearer <token>`` and give a ``user`` in every vote.
+    The response has one status per vote, in order: created, already_voted,
+    duplicate (repeats an earlier vote of the request), closed, not_found or
+    invalid.
+    """
+
+    def post(self, request):
+        service = self.is_service(request)
+        if not service:
+            if not request.user.is_authenticated:
+                return JsonResponse({'error': "Authentication required"}, status=401)
+            # Exempt from the middleware so services don't need a token, but
+            # session users still do
+            rejected = CsrfViewMiddleware(lambda request: None).process_view(request, None, (), {})
+            if rejected:
+                return JsonResponse({'error': "CSRF verification failed"}, status=403)
+
+        try:
+            votes = json.loads(request.body)['votes']
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({'error': 'Expected {"votes": [...]}'}, status=400)
+        if not isinstance(votes, list):
+            return JsonResponse({'error': 'Expected {"votes": [...]}'}, status=400)
+        limit = getattr(settings, 'POLLS_BATCH_VOTE_LIMIT', 5000)
+        if len(votes) > limit:
+            return JsonResponse({'error': f"At most {limit} votes per request"}, status=400)
+
+        statuses, wanted = self.validate(votes, None if service else request.user.pk)
+        inserted = self.store(wanted)
+        for index, (user_id, poll_id, _) in wanted.items():
+            statuses[index] = 'created' if (user_id, poll_id) in inserted else 'already_voted'
+        counts = {}
+        for status in statuses:
+            counts[status] = counts.get(status, 0) + 1
+        return JsonResponse({'results': statuses, 'counts': counts})
+
+    @staticmethod
+    def is_service(request):
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            return False
+        return any(constant_time_compare(token, known) for known in getattr(settings, 'POLLS_SERVICE_TOKENS', []))
+
+    @staticmethod
+    def validate(votes, user_id):
+        """
+        Check every vote with one query for the choices and one for the users.
+        Returns the statuses of the rejected votes and {index: (user_id, poll_id, choice_id)}
+        of the rest.
+        """
+        statuses = [None] * len(votes)
+        parsed = {}
+        for index, vote in enumerate(votes):
+            try:
+                item = (vote['user'] if user_id is None else user_id, vote['poll'], vote['choice'])
+            except (KeyError, TypeError):
+                statuses[index] = 'invalid'
+                continue
+            if not all(isinstance(value, int) and not isinstance(value, bool) for value in item):
+                statuses[index] = 'invalid'
+            elif user_id is not None and vote.get('user', user_id) != user_id:
+                statuses[index] = 'invalid'
+            else:
+                parsed[index] = item
+
+        choices = {
+            choice_id: (poll_id, active)
+            for choice_id, poll_id, active in Choice.objects.filter(
+                pk__in={choice_id for _, _, choice_id in parsed.values()}
+            ).values_list('id', 'poll_id', 'poll__active')
+        }
+        if user_id is None:
+            users = set(User.objects.filter(
+                pk__in={user for user, _, _ in parsed.values()}, is_active=True
+            ).values_list('id', flat=True))
+        else:
+            users = {user_id}
+
+        wanted, seen = {}, set()
+        for index, (user, poll_id, choice_id) in parsed.items():
+            if user not in users or choices.get(choice_id, (None,))[0] != poll_id:
+                statuses[index] = 'not_found'
+            elif not choices[choice_id][1]:
+                statuses[index] = 'closed'
+            elif (user, poll_id) in seen:
+                statuses[index] = 'duplicate'
+            else:
+                seen.add((user, poll_id))
+                wanted[index] = (user, poll_id, choice_id)
+        return statuses, wanted
+
+    @staticmethod
+    def store(wanted):
+        """
+        Insert the votes and return the (user_id, poll_id) pairs stored
+        """
+        # bulk_record runs in its own transaction
+        try:
+            return {(vote.user_id, vote.poll_id) for vote in Vote.objects.bulk_record(wanted.values())}
+        except IntegrityError:
+            # A concurrent request stored one of the pairs, or a choice was
+            # deleted meanwhile. Retry vote by vote.
+            pass
+        inserted = set()
+        for item in wanted.values():
+            try:
+                inserted.update((vote.user_id, vote.poll_id) for vote in Vote.objects.bulk_record([item]))
+            except IntegrityError:
+                pass
+        return inserted
@@ -0,0 +1,132 @@
+"""
+Async versions of the poll detail, vote and result views, for deployments
+served through pollme.asgi with POLLS_ASYNC_VIEWS enabled.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.messages import get_messages
+from django.contrib.auth.views import redirect_to_login
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import render, redirect, aget_object_or_404, resolve_url
+from django.views.generic import View
+from .models import Poll, Choice
+from .routing import ReplicaReadMixin
+from .streaming import format_event, stream_results
+from .views import ended_page_key
+from . import ingestion
+
+
+async def render_result(request, poll):
+    context = {'poll': poll, 'results': await poll.aget_results()}
+    return render(request, 'polls/poll_result.html', context)
+
+
+async def render_ended_poll(request, poll):
+    if get_messages(request):
+        return await render_result(request, poll)
+    cache = caches[settings.POLLS_RESULTS_CACHE]
+    key = ended_page_key(request, poll)
+    content = await cache.aget(key)
+    if content is None:
+        content = (await render_result(request, poll)).content
+        await cache.aset(key, content, None)
+    return HttpResponse(content)
+
+
+class AsyncView(View):
+    """
+    Loads request.user up front, since templates can't run lazy ORM queries
+    from async code
+    """
+    login_required = False
+    login_url = 'accounts:login'
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        if self.login_required and not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), resolve_url(self.login_url))
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class PollDetail(ReplicaReadMixin, AsyncView):
+    async def get(self, request, poll_id):
+        poll = await aget_object_or_404(Poll, pk=poll_id)
+        if not poll.active:
+            return await render_ended_poll(request, poll)
+        choices = [choice async for choice in poll.choice_set.order_by('id')]
+        context = {
+            'poll': poll,
+            'choices': choices,
+            'loop_time': range(0, len(choices)),
+        }
+        return render(request, 'polls/poll_detail.html', context)
+
+
+class PollVote(AsyncView):
+    login_required = True
+
+    async def post(self, request, poll_id):
+        poll = await aget_object_or_404(Poll, pk=poll_id)
+        choice_id = request.POST.get('choice')
+        if choice_id:
+            try:
+                choice = await poll.choice_set.aget(id=choice_id)
+                if ingestion.is_enabled():
+                    return await self.queue_vote(request, poll, choice)
+                # Transactions are sync only, so the insert and the counter
+                # updates run together in a worker thread
+                await sync_to_async(poll.add_vote)(request.user, choice)
+                return await render_result(request, poll)
+            except Choice.DoesNotExist:
+                messages.error(
+                    request, "Chioce does not exist", extra_tags='alert alert-warning alert-dismissible fade show')
+                return redirect("polls:detail", poll_id)
+            except IntegrityError:
+                return self.already_voted(request)
+        else:
+            messages.error(
+                request, "No choice selected!", extra_tags='alert alert-warning alert-dismissible fade show')
+            return redirect("polls:detail", poll_id)
+
+    async def queue_vote(self, request, poll, choice):
+        vote_queue = ingestion.get_vote_queue()
+        already_voted = await request.user.vote_set.filter(poll=poll).aexists()
+        if already_voted or vote_queue.is_pending(request.user.id, poll.id):
+            return self.already_voted(request)
+        # The journal write may fsync, keep it off the event loop
+        await sync_to_async(vote_queue.submit)(request.user.id, poll.id, choice.id)
+        return await render_result(request, poll)
+
+    def already_voted(self, request):
+        messages.error(
+            request, "You already voted this poll!", extra_tags='alert alert-warning alert-dismissible fade show')
+        return redirect("polls:list")
+
+
+class ResultsStream(AsyncView):
+    """
+    Server-Sent Events with the live results of a poll: a snapshot first,
+    then the changed counts
+    """
+    # Milliseconds before EventSource reconnects when the stream can't stay open
+    fallback_retry = 2000
+
+    async def get(self, request, poll_id):
+        poll = await aget_object_or_404(Poll, pk=poll_id)
+        if not isinstance(request, ASGIRequest):
+            # A sync server would need a thread per open stream, send the
+            # current results and let the client reconnect instead
+            results = await poll.aget_results()
+            body = f'retry: {self.fallback_retry}\n\n' + format_event('snapshot', results.as_dict())
+            if not poll.active:
+                body += format_event('ended', {})
+            return HttpResponse(body, content_type='text/event-stream', headers={'Cache-Control': 'no-cache'})
+        return StreamingHttpResponse(stream_results(poll.pk), content_type='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            # Stop nginx from buffering the stream
+            'X-Accel-Buffering': 'no',
+        })
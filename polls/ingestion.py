@@ -0,0 +1,239 @@
+"""
+Write-behind vote ingestion.
+
+When ``POLLS_VOTE_INGESTION = 'queued'`` the vote view validates a vote,
+appends it to a local journal, puts it on an in-process queue and answers
+right away. A background thread drains the queue with
+``Vote.objects.bulk_record`` every ``POLLS_VOTE_FLUSH_INTERVAL`` seconds or
+as soon as ``POLLS_VOTE_BATCH_SIZE`` votes are waiting.
+
+Every queue journals to its own segment file in ``POLLS_VOTE_JOURNAL_DIR``,
+locked for as long as the process lives, and only ever truncates or deletes
+that segment. When a queue starts it takes over the segments nobody holds a
+lock on, left by crashed or stopped processes, so acknowledged votes survive
+a crash. Replaying is safe because ``bulk_record`` skips (user, poll) pairs
+that are already stored.
+"""
+import atexit
+import fcntl
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from .models import Vote
+
+logger = logging.getLogger(__name__)
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def is_enabled():
+    return getattr(settings, 'POLLS_VOTE_INGESTION', 'sync') == 'queued'
+
+
+def get_vote_queue():
+    """
+    Return the process wide queue, starting its flusher on first use
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = VoteQueue(
+                batch_size=getattr(settings, 'POLLS_VOTE_BATCH_SIZE', 500),
+                flush_interval=getattr(settings, 'POLLS_VOTE_FLUSH_INTERVAL', 0.5),
+                journal_dir=getattr(settings, 'POLLS_VOTE_JOURNAL_DIR', None),
+                fsync=getattr(settings, 'POLLS_VOTE_JOURNAL_FSYNC', True),
+            )
+            _queue.start()
+            atexit.register(_queue.stop)
+        return _queue
+
+
+class VoteQueue:
+    def __init__(self, batch_size=500, flush_interval=0.5, journal_dir=None, fsync=True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.journal_dir = journal_dir
+        self.fsync = fsync
+        self._pending = deque()
+        self._pending_keys = set()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._journal = None
+        # Path of our own segment, once a vote was journaled
+        self.journal_path = None
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        self.replay()
+        self._thread = threading.Thread(target=self._run, name='vote-flusher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush_all()
+        if self._journal is not None:
+            # Everything is stored, the segment goes with its lock
+            os.remove(self.journal_path)
+            self._journal.close()
+            self._journal = self.journal_path = None
+
+    def replay(self):
+        """
+        Take over the segments of processes that stopped with votes acknowledged
+        but maybe not stored
+        """
+        if not self.journal_dir or not os.path.isdir(self.journal_dir):
+            return 0
+        replayed = 0
+        for name in sorted(os.listdir(self.journal_dir)):
+            path = os.path.join(self.journal_dir, name)
+            if not name.endswith('.log') or path == self.journal_path:
+                continue
+            try:
+                segment = open(path)
+            except FileNotFoundError:
+                # Taken over by another process meanwhile
+                continue
+            with segment:
+                try:
+                    fcntl.flock(segment, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Its process is alive
+                    continue
+                votes = []
+                for line in segment:
+                    try:
+                        user_id, poll_id, choice_id = json.loads(line)
+                    except ValueError:
+                        # A torn last line from a crash mid-write
+                        continue
+                    votes.append((user_id, poll_id, choice_id))
+                with self._condition:
+                    # Into our own segment first, deleting the old one can't lose them
+                    self._write_journal(votes)
+                    for vote in votes:
+                        self._enqueue(*vote)
+                os.remove(path)
+            replayed += len(votes)
+        if replayed:
+            logger.info("Replayed %s journaled votes", replayed)
+        return replayed
+
+    def submit(self, user_id, poll_id, choice_id):
+        """
+        Journal the vote and queue it. Once this returns the vote is acknowledged.
+        """
+        with self._condition:
+            self._write_journal([(user_id, poll_id, choice_id)])
+            self._enqueue(user_id, poll_id, choice_id)
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def is_pending(self, user_id, poll_id):
+        with self._condition:
+            return (user_id, poll_id) in self._pending_keys
+
+    def __len__(self):
+        with self._condition:
+            return len(self._pending)
+
+    def flush(self):
+        """
+        Store up to batch_size queued votes. Returns the number of votes inserted.
+        """
+        with self._flush_lock:
+            with self._condition:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            if not batch:
+                return 0
+            try:
+                inserted = self._store(batch)
+            except Exception:
+                # Keep the votes queued (and journaled) for the next attempt
+                with self._condition:
+                    self._pending.extendleft(reversed(batch))
+                raise
+            with self._condition:
+                self._pending_keys.difference_update((user_id, poll_id) for user_id, poll_id, _ in batch)
+                if not self._pending:
+                    self._truncate_journal()
+            return inserted
+
+    def flush_all(self):
+        inserted = 0
+        while len(self):
+            inserted += self.flush()
+        return inserted
+
+    def _enqueue(self, user_id, poll_id, choice_id):
+        self._pending.append((user_id, poll_id, choice_id))
+        self._pending_keys.add((user_id, poll_id))
+
+    def _store(self, batch):
+        try:
+            return len(Vote.objects.bulk_record(batch))
+        except IntegrityError:
+            # Another worker stored one of these pairs, or a choice was deleted
+            # meanwhile. Fall back to one transaction per vote.
+            logger.warning("Bulk vote insert failed, storing %s votes one by one", len(batch))
+        inserted = 0
+        for user_id, poll_id, choice_id in batch:
+            try:
+                with transaction.atomic():
+                    inserted += len(Vote.objects.bulk_record([(user_id, poll_id, choice_id)]))
+            except IntegrityError:
+                logger.warning("Dropped vote of user %s on poll %s", user_id, poll_id)
+        return inserted
+
+    def _run(self):
+        try:
+            while True:
+                with self._condition:
+                    if not self._stopping and len(self._pending) < self.batch_size:
+                        self._condition.wait(self.flush_interval)
+                    if self._stopping:
+                        return
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("Vote flush failed")
+                finally:
+                    close_old_connections()
+        finally:
+            connection.close()
+
+    def _open_journal(self):
+        os.makedirs(self.journal_dir, exist_ok=True)
+        name = f'votes-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        path = os.path.join(self.journal_dir, name + '.tmp')
+        self._journal = open(path, 'a')
+        fcntl.flock(self._journal, fcntl.LOCK_EX)
+        # Only visible to replay() once locked, the lock moves with the file
+        self.journal_path = os.path.join(self.journal_dir, name + '.log')
+        os.rename(path, self.journal_path)
+
+    def _write_journal(self, votes):
+        if not self.journal_dir or not votes:
+            return
+        if self._journal is None:
+            self._open_journal()
+        self._journal.write(''.join(json.dumps(vote) + '\n' for vote in votes))
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _truncate_journal(self):
+        if self._journal is not None:
+            self._journal.truncate(0)
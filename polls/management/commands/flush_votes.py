@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from polls.ingestion import VoteQueue
+
+
+class Command(BaseCommand):
+    help = "Store the votes left in the vote journals of stopped or crashed queued-ingestion processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--journal-dir', default=getattr(settings, 'POLLS_VOTE_JOURNAL_DIR', None),
+                            help="Directory of the vote journals to replay")
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'POLLS_VOTE_BATCH_SIZE', 500))
+
+    def handle(self, *args, **options):
+        vote_queue = VoteQueue(batch_size=options['batch_size'], journal_dir=options['journal_dir'])
+        replayed = vote_queue.replay()
+        inserted = vote_queue.flush_all()
+        # Removes the journal the replayed votes were moved to
+        vote_queue.stop()
+        self.stdout.write(self.style.SUCCESS(
+            f"Replayed {replayed} journaled votes, stored {inserted} new votes"))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from polls.models import Poll, Choice, Vote
+
+
+class Command(BaseCommand):
+    help = "Recompute drifted vote_count counters on polls and choices from the Vote table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of rows written per UPDATE batch")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            fixed_choices = self.reconcile(Choice, 'choice', batch_size, ['poll'])
+            fixed_polls = self.reconcile(Poll, 'poll', batch_size)
+            # New counts change what the polls show, mark them as modified
+            poll_ids = sorted({choice.poll_id for choice in fixed_choices} | {poll.pk for poll in fixed_polls})
+            now = timezone.now()
+            for start in range(0, len(poll_ids), batch_size):
+                Poll.objects.filter(pk__in=poll_ids[start:start + batch_size]).update(updated_at=now)
+        self.stdout.write(self.style.SUCCESS(
+            f"Fixed {len(fixed_choices)} choice and {len(fixed_polls)} poll counters"))
+
+    @staticmethod
+    def reconcile(model, field, batch_size, extra_fields=()):
+        """
+        Update only the rows whose stored counter differs from the real count.
+        Returns the fixed rows.
+        """
+        counted = (Vote.objects.filter(**{field: OuterRef('pk')})
+                   .order_by().values(field).annotate(total=Count('id')).values('total'))
+        drifted = (model.objects.annotate(actual=Coalesce(Subquery(counted), 0))
+                   .exclude(vote_count=F('actual')).only('pk', 'vote_count', *extra_fields))
+        objs = []
+        for obj in drifted.iterator(chunk_size=batch_size):
+            obj.vote_count = obj.actual
+            objs.append(obj)
+        model.objects.bulk_update(objs, ['vote_count'], batch_size=batch_size)
+        return objs
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from polls.rollups import RollupConflict, prune_minutes, rollup_votes
+
+
+class Command(BaseCommand):
+    help = "Count votes stored since the last run into the minute, hour and day rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help="Number of votes counted per transaction")
+        parser.add_argument('--lag', type=int, default=60,
+                            help="Only count votes older than this many seconds")
+        parser.add_argument('--keep-minutes', type=int, default=7,
+                            help="Days of minute buckets to keep, 0 keeps them all")
+
+    def handle(self, *args, **options):
+        try:
+            counted = rollup_votes(options['batch_size'], options['lag'])
+        except RollupConflict as error:
+            raise CommandError(f"{error}, is another rollup_votes running?")
+        pruned = prune_minutes(options['keep_minutes']) if options['keep_minutes'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Counted {counted} votes into the rollups, pruned {pruned} minute buckets"))
@@ -0,0 +1,179 @@
+import random
+import time
+from itertools import accumulate, islice
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from polls.models import Poll, Choice, Vote
+from polls.results import invalidate_results
+from polls.search import get_search_backend
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = "Fill the database with fake users, polls, choices and votes in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help="Number of users to create")
+        parser.add_argument('--polls', type=int, default=10, help="Number of polls to create")
+        parser.add_argument('--choices-min', type=int, default=2, help="Fewest choices per poll")
+        parser.add_argument('--choices-max', type=int, default=5, help="Most choices per poll")
+        parser.add_argument('--participation', type=float, default=1.0,
+                            help="Share of all users voting on each poll, from 0 to 1")
+        parser.add_argument('--distribution', choices=['uniform', 'zipf'], default='uniform',
+                            help="How votes spread over the choices of a poll")
+        parser.add_argument('--zipf-exponent', type=float, default=1.2,
+                            help="Exponent of the zipf distribution, higher means a clearer winner")
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help="Rows per bulk_create and per transaction")
+        parser.add_argument('--password', default='password', help="Password shared by all seeded users")
+        parser.add_argument('--overwrite', action='store_true',
+                            help="Delete existing users, polls and votes first")
+        parser.add_argument('--seed', type=int, help="Random seed for reproducible datasets")
+
+    def handle(self, *args, **options):
+        if not 0 <= options['participation'] <= 1:
+            raise CommandError("--participation must be between 0 and 1")
+        if not 1 <= options['choices_min'] <= options['choices_max']:
+            raise CommandError("--choices-min must be at least 1 and not above --choices-max")
+        self.chunk_size = options['chunk_size']
+        self.random = random.Random(options['seed'])
+        self.fake = Faker()
+        if options['seed'] is not None:
+            self.fake.seed_instance(options['seed'])
+        start_time = time.monotonic()
+
+        if options['overwrite']:
+            self.stdout.write("Deleting existing users, polls and votes")
+            Vote.objects.all().delete()
+            Poll.objects.all().delete()
+            User.objects.filter(is_superuser=False).delete()
+
+        self.seed_users(options['users'], options['password'])
+        self.seed_polls(options['polls'], options['choices_min'], options['choices_max'])
+        self.seed_votes(options['participation'], options['distribution'], options['zipf_exponent'])
+
+        self.stdout.write("Rebuilding counters and search index")
+        call_command('reconcile_vote_counts', stdout=self.stdout)
+        get_search_backend().index_all()
+        for poll_id in Poll.objects.values_list('id', flat=True).iterator():
+            invalidate_results(poll_id)
+
+        elapsed_time = time.monotonic() - start_time
+        minutes = int(elapsed_time // 60)
+        seconds = int(elapsed_time % 60)
+        self.stdout.write(self.style.SUCCESS(f"Seeding took: {minutes} minutes {seconds} seconds"))
+
+    def bulk_insert(self, model, rows, total, label):
+        """
+        Insert generated rows chunk by chunk, one transaction per chunk, printing the throughput
+        """
+        count = 0
+        started = time.monotonic()
+        for chunk in chunked(rows, self.chunk_size):
+            with transaction.atomic():
+                model.objects.bulk_create(chunk)
+            count += len(chunk)
+            self.progress(label, count, total, started)
+        self.stdout.write('')
+        return count
+
+    def progress(self, label, count, total, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        percent_complete = count / total * 100 if total else 100
+        self.stdout.write(
+            f"Adding {total} new {label}: {percent_complete:.2f}% ({count / elapsed:,.0f} rows/s)",
+            ending='\r',
+        )
+        self.stdout.flush()
+
+    def seed_users(self, num_users, password):
+        # Hashing is the slow part of create_user, so every user shares one hash
+        password_hash = make_password(password)
+        first_names = [self.fake.first_name() for _ in range(200)]
+        last_names = [self.fake.last_name() for _ in range(200)]
+        start = (User.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        now = timezone.now()
+
+        def rows():
+            for number in range(start, start + num_users):
+                first_name = self.random.choice(first_names)
+                last_name = self.random.choice(last_names)
+                yield User(
+                    first_name=first_name,
+                    last_name=last_name,
+                    username=f"{first_name}{last_name}{number}",
+                    email=f"{first_name}.{last_name}.{number}@fakermail.com".lower(),
+                    password=password_hash,
+                    date_joined=now,
+                )
+
+        self.bulk_insert(User, rows(), num_users, 'Users')
+
+    def seed_polls(self, num_polls, choices_min, choices_max):
+        users = list(User.objects.values_list('id', flat=True))
+        if not users and num_polls:
+            raise CommandError("Polls need at least one user as owner")
+        paragraphs = [self.fake.paragraph() for _ in range(500)]
+        sentences = [self.fake.sentence() for _ in range(500)]
+        now = timezone.now()
+        count = 0
+        started = time.monotonic()
+        for chunk_size in (len(chunk) for chunk in chunked(range(num_polls), self.chunk_size)):
+            with transaction.atomic():
+                polls = Poll.objects.bulk_create([
+                    Poll(owner_id=self.random.choice(users), text=self.random.choice(paragraphs), pub_date=now)
+                    for _ in range(chunk_size)
+                ])
+                if polls and polls[0].pk is None:
+                    # Backends that can't return ids from a bulk insert
+                    ids = Poll.objects.order_by('-id').values_list('id', flat=True)[:chunk_size]
+                    for poll, pk in zip(polls, reversed(ids)):
+                        poll.pk = pk
+                Choice.objects.bulk_create([
+                    Choice(poll_id=poll.pk, choice_text=self.random.choice(sentences))
+                    for poll in polls
+                    for _ in range(self.random.randint(choices_min, choices_max))
+                ], batch_size=self.chunk_size)
+            count += chunk_size
+            self.progress('Polls', count, num_polls, started)
+        self.stdout.write('')
+
+    def seed_votes(self, participation, distribution, zipf_exponent):
+        """
+        Replace all votes. Each poll gets votes from a random sample of users.
+        """
+        Vote.objects.all().delete()
+        users = list(User.objects.values_list('id', flat=True))
+        choices = {}
+        for poll_id, choice_id in Choice.objects.order_by('poll', 'id').values_list('poll', 'id').iterator():
+            choices.setdefault(poll_id, []).append(choice_id)
+        voters_per_poll = int(len(users) * participation)
+        total = voters_per_poll * len(choices)
+
+        def rows():
+            for poll_id, poll_choices in choices.items():
+                poll_choices = poll_choices[:]
+                # Let a different choice win each poll
+                self.random.shuffle(poll_choices)
+                if distribution == 'zipf':
+                    weights = [1 / rank ** zipf_exponent for rank in range(1, len(poll_choices) + 1)]
+                else:
+                    weights = [1] * len(poll_choices)
+                picked = self.random.choices(poll_choices, cum_weights=list(accumulate(weights)),
+                                             k=voters_per_poll)
+                voters = self.random.sample(users, voters_per_poll)
+                for user_id, choice_id in zip(voters, picked):
+                    yield Vote(user_id=user_id, poll_id=poll_id, choice_id=choice_id)
+
+        self.bulk_insert(Vote, rows(), total, 'votes')
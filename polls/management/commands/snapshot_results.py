@@ -0,0 +1,43 @@
+from collections import defaultdict
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from polls.models import Poll, Choice, PollResultSnapshot
+from polls.results import PollResults
+
+
+class Command(BaseCommand):
+    help = "Freeze the results of ended polls that have no results snapshot yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Number of polls recounted per query")
+        parser.add_argument('--refresh', action='store_true',
+                            help="Recount ended polls that already have a snapshot too")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        polls = Poll.objects.filter(active=False)
+        if not options['refresh']:
+            polls = polls.filter(snapshot__isnull=True)
+        poll_ids = list(polls.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(poll_ids), batch_size):
+            self.snapshot(poll_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f"Saved {len(poll_ids)} result snapshots"))
+
+    @staticmethod
+    def snapshot(poll_ids):
+        """
+        Recount the votes of a batch of polls in one query and store their snapshots
+        """
+        rows = defaultdict(list)
+        counted = (Choice.objects.filter(poll_id__in=poll_ids).order_by('poll', 'id')
+                   .annotate(num_votes=Count('vote')).values_list('poll', 'id', 'choice_text', 'num_votes'))
+        for poll_id, choice_id, text, num_votes in counted:
+            rows[poll_id].append((choice_id, text, num_votes))
+        with transaction.atomic():
+            PollResultSnapshot.objects.filter(poll_id__in=poll_ids).delete()
+            PollResultSnapshot.objects.bulk_create([
+                PollResultSnapshot.from_results(PollResults.from_rows(poll_id, rows[poll_id]))
+                for poll_id in poll_ids
+            ])
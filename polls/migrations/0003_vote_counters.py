@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-10-18 01:14
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_vote_counts(apps, schema_editor):
+    Poll = apps.get_model('polls', 'Poll')
+    Choice = apps.get_model('polls', 'Choice')
+    Vote = apps.get_model('polls', 'Vote')
+    for model, field in ((Choice, 'choice'), (Poll, 'poll')):
+        counted = (Vote.objects.filter(**{field: OuterRef('pk')})
+                   .order_by().values(field).annotate(total=Count('id')).values('total'))
+        model.objects.update(vote_count=Coalesce(Subquery(counted), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0002_auto_20231018_1318'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='choice',
+            name='vote_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='poll',
+            name='vote_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_vote_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.6 on 2026-10-18 01:17
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_votes(apps, schema_editor):
+    """
+    Keep the earliest vote of every (user, poll) pair and recount the counters
+    """
+    Poll = apps.get_model('polls', 'Poll')
+    Choice = apps.get_model('polls', 'Choice')
+    Vote = apps.get_model('polls', 'Vote')
+    duplicates = (Vote.objects.order_by().values('user', 'poll')
+                  .annotate(first_id=Min('id'), total=Count('id')).filter(total__gt=1))
+    touched_polls = set()
+    for row in duplicates.iterator():
+        Vote.objects.filter(user=row['user'], poll=row['poll']).exclude(id=row['first_id']).delete()
+        touched_polls.add(row['poll'])
+    if not touched_polls:
+        return
+    for model, field, lookup in ((Choice, 'choice', 'poll__in'), (Poll, 'poll', 'pk__in')):
+        counted = (Vote.objects.filter(**{field: OuterRef('pk')})
+                   .order_by().values(field).annotate(total=Count('id')).values('total'))
+        model.objects.filter(**{lookup: touched_polls}).update(vote_count=Coalesce(Subquery(counted), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0003_vote_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_votes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('user', 'poll'), name='polls_vote_unique_user_poll'),
+        ),
+    ]
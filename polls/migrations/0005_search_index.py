@@ -0,0 +1,50 @@
+from django.db import migrations
+
+# The index tables of polls/search.py as they were created. Kept here rather
+# than imported, so later changes to the search backends can't change this
+# migration.
+CREATE_INDEX_SQL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE polls_poll_fts USING fts5(text, choices, tokenize='unicode61')",
+        "INSERT INTO polls_poll_fts (rowid, text, choices) "
+        "SELECT p.id, p.text, (SELECT group_concat(c.choice_text, ' ') FROM polls_choice c "
+        "WHERE c.poll_id = p.id) FROM polls_poll p",
+    ],
+    'postgresql': [
+        "CREATE TABLE polls_poll_search ("
+        "poll_id integer PRIMARY KEY REFERENCES polls_poll (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "document tsvector NOT NULL)",
+        "CREATE INDEX polls_poll_search_document_idx ON polls_poll_search USING gin (document)",
+        "INSERT INTO polls_poll_search (poll_id, document) "
+        "SELECT p.id, setweight(to_tsvector('english', p.text), 'A') || "
+        "setweight(to_tsvector('english', coalesce(string_agg(c.choice_text, ' '), '')), 'B') "
+        "FROM polls_poll p LEFT JOIN polls_choice c ON c.poll_id = p.id GROUP BY p.id",
+    ],
+}
+
+DROP_INDEX_SQL = {
+    'sqlite': ["DROP TABLE IF EXISTS polls_poll_fts"],
+    'postgresql': ["DROP TABLE IF EXISTS polls_poll_search"],
+}
+
+
+def create_search_index(apps, schema_editor):
+    # Other databases search without an index
+    for sql in CREATE_INDEX_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    for sql in DROP_INDEX_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0004_vote_unique_user_poll'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.6 on 2026-10-18 01:31
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Length
+from django.db.models.lookups import LessThanOrEqual
+
+
+def check_text_length(apps, schema_editor):
+    """
+    polls_poll_text_idx can't hold texts over about 2.7kB on Postgres, stop
+    with the polls to shorten to 500 characters
+    """
+    Poll = apps.get_model('polls', 'Poll')
+    too_long = list(Poll.objects.annotate(length=Length('text')).filter(length__gt=500)
+                    .order_by('id').values_list('id', flat=True)[:20])
+    if too_long:
+        raise RuntimeError(
+            "These polls have over 500 characters of text, shorten them before migrating: "
+            + ', '.join(map(str, too_long)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0005_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(check_text_length, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='poll',
+            constraint=models.CheckConstraint(check=LessThanOrEqual(Length('text'), 500), name='polls_poll_text_length'),
+        ),
+        migrations.AddIndex(
+            model_name='poll',
+            index=models.Index(fields=['pub_date', 'id'], name='polls_poll_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poll',
+            index=models.Index(fields=['text', 'id'], name='polls_poll_text_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poll',
+            index=models.Index(fields=['vote_count', 'id'], name='polls_poll_vote_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poll',
+            index=models.Index(condition=models.Q(('active', True)), fields=['pub_date', 'id'], name='polls_poll_active_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poll',
+            index=models.Index(fields=['owner', 'id'], name='polls_poll_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poll',
+            index=models.Index(fields=['active', 'created_at'], name='polls_poll_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['poll', 'choice'], name='polls_vote_poll_choice_idx'),
+        ),
+    ]
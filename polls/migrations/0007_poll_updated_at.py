@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0006_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='poll',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
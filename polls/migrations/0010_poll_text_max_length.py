@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-18 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0009_vote_rollups'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='poll',
+            name='polls_poll_active_pub_idx',
+        ),
+        # The database enforces the length with polls_poll_text_length from
+        # 0006, max_length only adds form validation. SQLite would rebuild the
+        # table for nothing.
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='poll',
+                name='text',
+                field=models.TextField(max_length=500),
+            ),
+        ]),
+    ]
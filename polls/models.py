@@ -1,15 +1,64 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
+from django.db.models.functions import Length
+from django.db.models.lookups import LessThanOrEqual
+from collections import Counter, defaultdict
 from django.utils import timezone
-import secrets
+from .results import PollResults, aget_cached_results, get_cached_results, invalidate_results
 
 
-class Poll(models.Model):
+class PollQuerySet(models.QuerySet):
+    def for_listing(self, user):
+        """
+        Polls with their owner and an is_owner flag for user, in a single query
+        """
+        return self.select_related('owner').annotate(
+            is_owner=ExpressionWrapper(Q(owner_id=user.pk), output_field=BooleanField())
+        )
+
+
+class VoteCounterMixin:
+    """
+    vote_count only changes through F() updates, e.g. in Poll.add_vote. Saving
+    an existing row leaves it out, the instance may hold a stale count.
+    """
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'vote_count']
+        super().save(*args, **kwargs)
+
+
+class Poll(VoteCounterMixin, models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
-    text = models.TextField()
+    # Bounded by polls_poll_text_length for polls_poll_text_idx: Postgres caps
+    # btree entries at about 2.7kB, 500 characters stay below it even at 4 bytes each
+    text = models.TextField(max_length=500)
     pub_date = models.DateTimeField(default=timezone.now)
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also bumped by votes and choice changes, it versions everything shown about the poll
+    updated_at = models.DateTimeField(auto_now=True)
+    vote_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PollQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(check=LessThanOrEqual(Length('text'), 500), name='polls_poll_text_length'),
+        ]
+        indexes = [
+            # PollsList sort orders, each with the id tie-break used for paging
+            models.Index(fields=['pub_date', 'id'], name='polls_poll_pub_date_idx'),
+            models.Index(fields=['text', 'id'], name='polls_poll_text_idx'),
+            models.Index(fields=['vote_count', 'id'], name='polls_poll_vote_count_idx'),
+            # UserPoll
+            models.Index(fields=['owner', 'id'], name='polls_poll_owner_idx'),
+            # Admin filters
+            models.Index(fields=['active', 'created_at'], name='polls_poll_active_created_idx'),
+        ]
 
     def user_can_vote(self, user):
         """ 
@@ -21,47 +70,138 @@ class Poll(models.Model):
             return False
         return True
 
+    def add_vote(self, user, choice):
+        """
+        Save user's vote and bump the stored counters in the same transaction.
+        Raises IntegrityError if the user already voted this poll.
+        """
+        with transaction.atomic():
+            vote = Vote.objects.create(user=user, poll=self, choice=choice)
+            Choice.objects.filter(pk=choice.pk).update(vote_count=F('vote_count') + 1)
+            Poll.objects.filter(pk=self.pk).update(vote_count=F('vote_count') + 1, updated_at=timezone.now())
+        return vote
+
     @property
     def get_vote_count(self):
-        return self.vote_set.count()
-
-    def get_result_dict(self):
-        res = []
-        for choice in self.choice_set.all():
-            d = {}
-            alert_class = ['primary', 'secondary', 'success',
-                           'danger', 'dark', 'warning', 'info']
-
-            d['alert_class'] = secrets.choice(alert_class)
-            d['text'] = choice.choice_text
-            d['num_votes'] = choice.get_vote_count
-            if not self.get_vote_count:
-                d['percentage'] = 0
-            else:
-                d['percentage'] = (choice.get_vote_count /
-                                   self.get_vote_count)*100
-
-            res.append(d)
-        return res
+        return self.vote_count
+
+    def close(self):
+        """
+        End the poll and freeze its results from a recount of the votes
+        """
+        with transaction.atomic():
+            self.active = False
+            self.save(update_fields=['active', 'updated_at'])
+            self.snapshot = PollResultSnapshot.from_results(PollResults.recount(self))
+            self.snapshot.save()
+
+    def get_results(self):
+        """
+        Snapshot of an ended poll, cached live results otherwise.
+        Select the snapshot with the poll to save a query.
+        """
+        if not self.active:
+            try:
+                return self.snapshot.get_results()
+            except PollResultSnapshot.DoesNotExist:
+                pass
+        return get_cached_results(self)
+
+    async def aget_results(self):
+        if not self.active:
+            snapshot = await PollResultSnapshot.objects.filter(poll_id=self.pk).afirst()
+            if snapshot is not None:
+                return snapshot.get_results()
+        return await aget_cached_results(self)
 
     def __str__(self):
         return self.text
 
 
-class Choice(models.Model):
+class Choice(VoteCounterMixin, models.Model):
     poll = models.ForeignKey(Poll, on_delete=models.CASCADE)
     choice_text = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    vote_count = models.PositiveIntegerField(default=0, editable=False)
 
     @property
     def get_vote_count(self):
-        return self.vote_set.count()
+        return self.vote_count
 
     def __str__(self):
         return f"{self.poll.text[:25]} - {self.choice_text[:25]}"
 
 
+class PollResultSnapshot(models.Model):
+    """
+    Results of an ended poll, frozen when it was closed
+    """
+    poll = models.OneToOneField(Poll, on_delete=models.CASCADE, primary_key=True, related_name='snapshot')
+    total = models.PositiveIntegerField()
+    # [{"id", "text", "num_votes", "percentage"}] in choice order
+    choices = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def from_results(cls, results):
+        return cls(poll_id=results.poll_id, total=results.total, choices=[
+            {'id': choice.id, 'text': choice.text, 'num_votes': choice.num_votes, 'percentage': choice.percentage}
+            for choice in results
+        ])
+
+    def get_results(self):
+        return PollResults.from_rows(
+            self.poll_id, [(choice['id'], choice['text'], choice['num_votes']) for choice in self.choices])
+
+    def __str__(self):
+        return f"{self.poll_id} - {self.total} votes"
+
+
+def _bump_vote_counts(model, counts, **fields):
+    """
+    Apply {pk: amount} increments with one UPDATE per distinct amount,
+    setting fields on the same rows
+    """
+    by_amount = defaultdict(list)
+    for pk, amount in counts.items():
+        by_amount[amount].append(pk)
+    for amount, pks in by_amount.items():
+        model.objects.filter(pk__in=pks).update(vote_count=F('vote_count') + amount, **fields)
+
+
+class VoteQuerySet(models.QuerySet):
+    def bulk_record(self, items, batch_size=None):
+        """
+        Insert many (user_id, poll_id, choice_id) votes with one bulk_create and
+        bump the counters in aggregate. Pairs of (user, poll) that already voted
+        are skipped. Returns the list of inserted votes.
+        """
+        wanted = {}
+        for user_id, poll_id, choice_id in items:
+            wanted.setdefault((user_id, poll_id), choice_id)
+        if not wanted:
+            return []
+        with transaction.atomic():
+            existing = set(
+                self.filter(user_id__in={user_id for user_id, _ in wanted},
+                            poll_id__in={poll_id for _, poll_id in wanted})
+                .values_list('user_id', 'poll_id')
+            )
+            votes = [
+                self.model(user_id=user_id, poll_id=poll_id, choice_id=choice_id)
+                for (user_id, poll_id), choice_id in wanted.items()
+                if (user_id, poll_id) not in existing
+            ]
+            self.bulk_create(votes, batch_size=batch_size)
+            _bump_vote_counts(Choice, Counter(vote.choice_id for vote in votes))
+            _bump_vote_counts(Poll, Counter(vote.poll_id for vote in votes), updated_at=timezone.now())
+            # bulk_create sends no post_save signals
+            for poll_id in {vote.poll_id for vote in votes}:
+                invalidate_results(poll_id)
+        return votes
+
+
 class Vote(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     poll = models.ForeignKey(Poll, on_delete=models.CASCADE)
@@ -69,5 +209,57 @@ class Vote(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = VoteQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'poll'], name='polls_vote_unique_user_poll'),
+        ]
+        indexes = [
+            models.Index(fields=['poll', 'choice'], name='polls_vote_poll_choice_idx'),
+        ]
+
     def __str__(self):
         return f'{self.poll.text[:15]} - {self.choice.choice_text[:15]} - {self.user.username}'
+
+
+class VoteRollup(models.Model):
+    """
+    Votes cast for a choice within one minute, hour or day (UTC), filled in by
+    the rollup_votes command
+    """
+    MINUTE = 'minute'
+    HOUR = 'hour'
+    DAY = 'day'
+    GRANULARITY_CHOICES = [(MINUTE, 'Minute'), (HOUR, 'Hour'), (DAY, 'Day')]
+
+    # Both lead an index below
+    poll = models.ForeignKey(Poll, on_delete=models.CASCADE, db_index=False)
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE, db_index=False)
+    granularity = models.CharField(max_length=6, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()
+    votes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['choice', 'granularity', 'bucket'], name='polls_rollup_unique_bucket'),
+        ]
+        indexes = [
+            # Time series of a poll
+            models.Index(fields=['poll', 'granularity', 'bucket'], name='polls_rollup_poll_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.choice_id} - {self.granularity} {self.bucket:%Y-%m-%d %H:%M} - {self.votes}"
+
+
+class RollupWatermark(models.Model):
+    """
+    Id of the last vote counted into the rollups
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    last_vote_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} - {self.last_vote_id}"
@@ -0,0 +1,179 @@
+import hashlib
+import time
+from dataclasses import dataclass, field, asdict
+from functools import cached_property
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+ALERT_CLASSES = ['primary', 'secondary', 'success', 'danger', 'dark', 'warning', 'info']
+
+
+@dataclass(frozen=True)
+class ChoiceResult:
+    id: int
+    text: str
+    num_votes: int
+    percentage: float
+    alert_class: str
+
+
+@dataclass(frozen=True)
+class PollResults:
+    """
+    Per-choice vote counts, total and percentages of a poll.
+    Shared by the result template, the admin and JSON consumers.
+    """
+    poll_id: int
+    total: int
+    choices: tuple[ChoiceResult, ...] = field(default_factory=tuple)
+
+    @classmethod
+    def from_rows(cls, poll_id, rows):
+        """
+        Build results from (choice_id, choice_text, num_votes) rows
+        """
+        rows = list(rows)
+        total = sum(num_votes for _, _, num_votes in rows)
+        choices = tuple(
+            ChoiceResult(
+                id=choice_id,
+                text=text,
+                num_votes=num_votes,
+                percentage=(num_votes / total) * 100 if total else 0,
+                # By position, so the same results always render the same bytes
+                alert_class=ALERT_CLASSES[index % len(ALERT_CLASSES)],
+            )
+            for index, (choice_id, text, num_votes) in enumerate(rows)
+        )
+        return cls(poll_id=poll_id, total=total, choices=choices)
+
+    @classmethod
+    def for_poll(cls, poll):
+        """
+        Read the stored choice counters in a single query
+        """
+        rows = poll.choice_set.order_by('id').values_list('id', 'choice_text', 'vote_count')
+        return cls.from_rows(poll.pk, rows)
+
+    @classmethod
+    def recount(cls, poll):
+        """
+        Count the votes table in one query, ignoring the stored counters
+        """
+        from .models import Vote
+        counted = (Vote.objects.filter(poll=poll.pk, choice=OuterRef('pk'))
+                   .order_by().values('choice').annotate(total=Count('id')).values('total'))
+        rows = (poll.choice_set.order_by('id')
+                .annotate(num_votes=Coalesce(Subquery(counted), 0))
+                .values_list('id', 'choice_text', 'num_votes'))
+        return cls.from_rows(poll.pk, rows)
+
+    @classmethod
+    async def afor_poll(cls, poll):
+        """
+        Async version of for_poll()
+        """
+        rows = [row async for row in poll.choice_set.order_by('id').values_list('id', 'choice_text', 'vote_count')]
+        return cls.from_rows(poll.pk, rows)
+
+    def __iter__(self):
+        return iter(self.choices)
+
+    def __len__(self):
+        return len(self.choices)
+
+    def as_dict(self):
+        return asdict(self)
+
+    @cached_property
+    def fingerprint(self):
+        """
+        Digest of the results, equal across processes for equal results.
+        Keys the cached result fragments.
+        """
+        return hashlib.md5(repr((self.poll_id, self.total, self.choices)).encode(), usedforsecurity=False).hexdigest()
+
+
+def _results_cache():
+    return caches[getattr(settings, 'POLLS_RESULTS_CACHE', 'default')]
+
+
+def _version_key(poll_id):
+    return f'polls:results-version:{poll_id}'
+
+
+def get_results_version(poll_id):
+    """
+    Current results version of a poll. Missing versions start from the clock,
+    so an evicted counter never brings back an older cache entry.
+    """
+    cache = _results_cache()
+    key = _version_key(poll_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def get_cached_results(poll):
+    """
+    PollResults of the poll from the results cache. Ended polls are cached until
+    invalidated, active polls for POLLS_RESULTS_CACHE_TTL seconds.
+    """
+    cache = _results_cache()
+    key = f'polls:results:{poll.pk}:{get_results_version(poll.pk)}'
+    results = cache.get(key)
+    if results is None:
+        results = PollResults.for_poll(poll)
+        timeout = getattr(settings, 'POLLS_RESULTS_CACHE_TTL', 5) if poll.active else None
+        cache.set(key, results, timeout)
+    return results
+
+
+async def aget_results_version(poll_id):
+    """
+    Async version of get_results_version()
+    """
+    cache = _results_cache()
+    key = _version_key(poll_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+async def aget_cached_results(poll):
+    """
+    Async version of get_cached_results()
+    """
+    cache = _results_cache()
+    key = f'polls:results:{poll.pk}:{await aget_results_version(poll.pk)}'
+    results = await cache.aget(key)
+    if results is None:
+        results = await PollResults.afor_poll(poll)
+        timeout = getattr(settings, 'POLLS_RESULTS_CACHE_TTL', 5) if poll.active else None
+        await cache.aset(key, results, timeout)
+    return results
+
+
+def invalidate_results(poll_id):
+    """
+    Bump the poll's results version now and again once the current transaction
+    commits, so a reader can't cache counts the transaction hasn't committed yet.
+    """
+    _bump_results_version(poll_id)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump_results_version(poll_id))
+
+
+def _bump_results_version(poll_id):
+    cache = _results_cache()
+    try:
+        cache.incr(_version_key(poll_id))
+    except ValueError:
+        cache.set(_version_key(poll_id), time.time_ns(), None)
@@ -0,0 +1,130 @@
+"""
+Read replica routing.
+
+Views opt in with ReplicaReadMixin: while they run, reads of polls models go
+to the POLLS_REPLICA_DATABASE alias. Everything else, and every write, uses
+the default database. PinPrimaryMiddleware pins the session of a user who
+wrote to the default database for POLLS_REPLICA_STICKY_SECONDS, so they see
+their own votes and edits while the replica catches up.
+
+Without a replica in DATABASES everything reads the default database.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PINNED_SESSION_KEY = '_polls_primary_until'
+
+# Writes of these apps don't pin, the session is saved on every request
+UNPINNED_APPS = {'sessions'}
+
+_replica_reads = ContextVar('polls_replica_reads', default=False)
+_writes = ContextVar('polls_writes', default=None)
+
+
+def replica_alias():
+    alias = getattr(settings, 'POLLS_REPLICA_DATABASE', None)
+    return alias if alias in connections.settings else None
+
+
+@contextmanager
+def replica_reads():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def is_pinned(request):
+    session = getattr(request, 'session', None)
+    return session is not None and session.get(PINNED_SESSION_KEY, 0) > time.time()
+
+
+def pin_to_primary(request):
+    request.session[PINNED_SESSION_KEY] = time.time() + getattr(settings, 'POLLS_REPLICA_STICKY_SECONDS', 5)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and model._meta.app_label == 'polls':
+            return replica_alias() or DEFAULT_DB_ALIAS
+        # Also for related objects of instances read from the replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        writes = _writes.get()
+        if writes is not None and model._meta.app_label not in UNPINNED_APPS:
+            writes.add(model._meta.label)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows
+        return True
+
+
+class ReplicaReadMixin:
+    """
+    Read polls from the replica, unless the user wrote recently
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self._adispatch(request, *args, **kwargs)
+        # Without a replica, skip loading the session
+        if replica_alias() is None or is_pinned(request):
+            return super().dispatch(request, *args, **kwargs)
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+    async def _adispatch(self, request, *args, **kwargs):
+        dispatch = super().dispatch
+        if replica_alias() is None or await sync_to_async(is_pinned)(request):
+            return await dispatch(request, *args, **kwargs)
+        with replica_reads():
+            return await dispatch(request, *args, **kwargs)
+
+
+class PinPrimaryMiddleware:
+    """
+    Pin the session to the default database after a request that wrote.
+    Has to come after SessionMiddleware.
+    """
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        if replica_alias() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        writes = set()
+        token = _writes.set(writes)
+        try:
+            response = self.get_response(request)
+        finally:
+            _writes.reset(token)
+        if writes:
+            pin_to_primary(request)
+        return response
+
+    async def __acall__(self, request):
+        writes = set()
+        token = _writes.set(writes)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _writes.reset(token)
+        if writes:
+            # Loads the session from the database if the view didn't
+            await sync_to_async(pin_to_primary)(request)
+        return response
@@ -0,0 +1,143 @@
+import re
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+SQLITE_INDEX_TABLE = 'polls_poll_fts'
+POSTGRES_INDEX_TABLE = 'polls_poll_search'
+
+
+def search_terms(text):
+    return re.findall(r'\w+', text or '')
+
+
+class SimpleSearchBackend:
+    """
+    Case-insensitive substring match on the poll text. Needs no index and
+    is used on databases without full-text support.
+    """
+
+    def search(self, queryset, text):
+        """
+        Filter polls matching text and annotate them with search_rank,
+        where lower ranks are better matches
+        """
+        return queryset.filter(text__icontains=text).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    def index_poll(self, poll_id):
+        pass
+
+    def remove_poll(self, poll_id):
+        pass
+
+    def index_all(self, using=DEFAULT_DB_ALIAS):
+        """
+        Rebuild the whole index, e.g. after rows were added with bulk_create
+        """
+        pass
+
+
+class SQLiteSearchBackend(SimpleSearchBackend):
+    """
+    FTS5 index over poll text and choice text, ranked with bm25
+    """
+    match_sql = f"SELECT rowid FROM {SQLITE_INDEX_TABLE} WHERE {SQLITE_INDEX_TABLE} MATCH %s"
+    rank_sql = (f"SELECT bm25({SQLITE_INDEX_TABLE}, 2.0, 1.0) FROM {SQLITE_INDEX_TABLE} "
+                f"WHERE {SQLITE_INDEX_TABLE} MATCH %s AND rowid = polls_poll.id")
+
+    def search(self, queryset, text):
+        terms = search_terms(text)
+        if not terms:
+            return super().search(queryset, '')
+        # Every term must match, as a prefix
+        query = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(id__in=RawSQL(self.match_sql, [query])).annotate(
+            search_rank=RawSQL(self.rank_sql, [query], output_field=FloatField())
+        )
+
+    def index_poll(self, poll_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SQLITE_INDEX_TABLE} WHERE rowid = %s", [poll_id])
+            cursor.execute(
+                f"INSERT INTO {SQLITE_INDEX_TABLE} (rowid, text, choices) "
+                "SELECT p.id, p.text, (SELECT group_concat(c.choice_text, ' ') FROM polls_choice c "
+                "WHERE c.poll_id = p.id) FROM polls_poll p WHERE p.id = %s",
+                [poll_id],
+            )
+
+    def remove_poll(self, poll_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SQLITE_INDEX_TABLE} WHERE rowid = %s", [poll_id])
+
+    def index_all(self, using=DEFAULT_DB_ALIAS):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SQLITE_INDEX_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {SQLITE_INDEX_TABLE} (rowid, text, choices) "
+                "SELECT p.id, p.text, (SELECT group_concat(c.choice_text, ' ') FROM polls_choice c "
+                "WHERE c.poll_id = p.id) FROM polls_poll p"
+            )
+
+
+class PostgresSearchBackend(SimpleSearchBackend):
+    """
+    tsvector documents in a GIN indexed side table, ranked with ts_rank.
+    Poll text weighs more than choice text.
+    """
+    config = 'english'
+
+    def search(self, queryset, text):
+        terms = search_terms(text)
+        if not terms:
+            return super().search(queryset, '')
+        query = ' & '.join(f'{term}:*' for term in terms)
+        match_sql = (f"SELECT poll_id FROM {POSTGRES_INDEX_TABLE} "
+                     f"WHERE document @@ to_tsquery('{self.config}', %s)")
+        rank_sql = (f"SELECT -ts_rank(document, to_tsquery('{self.config}', %s)) FROM {POSTGRES_INDEX_TABLE} "
+                    "WHERE poll_id = polls_poll.id")
+        return queryset.filter(id__in=RawSQL(match_sql, [query])).annotate(
+            search_rank=RawSQL(rank_sql, [query], output_field=FloatField())
+        )
+
+    def _upsert_sql(self, where):
+        document = (
+            f"setweight(to_tsvector('{self.config}', p.text), 'A') || "
+            f"setweight(to_tsvector('{self.config}', coalesce(string_agg(c.choice_text, ' '), '')), 'B')"
+        )
+        return (
+            f"INSERT INTO {POSTGRES_INDEX_TABLE} (poll_id, document) "
+            f"SELECT p.id, {document} FROM polls_poll p LEFT JOIN polls_choice c ON c.poll_id = p.id "
+            f"{where} GROUP BY p.id "
+            "ON CONFLICT (poll_id) DO UPDATE SET document = EXCLUDED.document"
+        )
+
+    def index_poll(self, poll_id):
+        with connection.cursor() as cursor:
+            cursor.execute(self._upsert_sql("WHERE p.id = %s"), [poll_id])
+
+    def remove_poll(self, poll_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {POSTGRES_INDEX_TABLE} WHERE poll_id = %s", [poll_id])
+
+    def index_all(self, using=DEFAULT_DB_ALIAS):
+        with connections[using].cursor() as cursor:
+            cursor.execute(self._upsert_sql(""))
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(vendor=None):
+    """
+    The backend named by POLLS_SEARCH_BACKEND, or the full-text backend of the
+    database in use
+    """
+    path = getattr(settings, 'POLLS_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return VENDOR_BACKENDS.get(vendor or connection.vendor, SimpleSearchBackend)()
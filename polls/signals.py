@@ -0,0 +1,71 @@
+from collections import Counter
+from django.contrib.auth.models import User
+from django.db.models import F, Subquery
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Poll, Choice, Vote, _bump_vote_counts
+from .results import invalidate_results
+from .search import get_search_backend
+
+
+# No post_delete receiver for Vote: it would stop Django from fast-deleting
+# the votes of a deleted choice or poll. Those deletes invalidate through
+# their Choice receiver below.
+@receiver(post_save, sender=Vote)
+def vote_changed(sender, instance, **kwargs):
+    invalidate_results(instance.poll_id)
+
+
+@receiver(pre_delete, sender=Choice)
+def choice_deleting(sender, instance, origin=None, **kwargs):
+    """
+    Take the votes of the choice off the poll counter before they are cascaded
+    away, also when a queryset of choices is deleted
+    """
+    if isinstance(origin, Poll) or getattr(origin, 'model', None) is Poll:
+        return
+    choice_votes = Choice.objects.filter(pk=instance.pk).values('vote_count')
+    Poll.objects.filter(pk=instance.poll_id).update(vote_count=F('vote_count') - Subquery(choice_votes))
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    """
+    Take the votes of the user off the counters before they are cascaded away.
+    Polls of the user go with them and are left alone.
+    """
+    votes = list(Vote.objects.filter(user=instance).exclude(poll__owner=instance).values_list('poll_id', 'choice_id'))
+    if not votes:
+        return
+    choice_counts = Counter(choice_id for _, choice_id in votes)
+    _bump_vote_counts(Choice, {choice_id: -count for choice_id, count in choice_counts.items()})
+    poll_counts = Counter(poll_id for poll_id, _ in votes)
+    _bump_vote_counts(Poll, {poll_id: -count for poll_id, count in poll_counts.items()}, updated_at=timezone.now())
+    for poll_id in poll_counts:
+        invalidate_results(poll_id)
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def choice_changed(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Poll) or getattr(origin, 'model', None) is Poll:
+        # Deleted along with its poll, poll_deleted cleans up once for all choices
+        return
+    Poll.objects.filter(pk=instance.poll_id).update(updated_at=timezone.now())
+    invalidate_results(instance.poll_id)
+    get_search_backend().index_poll(instance.poll_id)
+
+
+@receiver(post_save, sender=Poll)
+def poll_changed(sender, instance, created, update_fields=None, **kwargs):
+    if not created:
+        invalidate_results(instance.pk)
+    if update_fields is None or 'text' in update_fields:
+        get_search_backend().index_poll(instance.pk)
+
+
+@receiver(post_delete, sender=Poll)
+def poll_deleted(sender, instance, **kwargs):
+    get_search_backend().remove_poll(instance.pk)
+
@@ -0,0 +1,174 @@
+"""
+Live poll results over Server-Sent Events.
+
+One ``ResultsBroadcaster`` per poll and process watches the poll's results
+version every ``POLLS_STREAM_TICK`` seconds and reads the counts only when it
+changed, so every watcher of a poll shares one aggregation. Watchers receive
+the counts that changed since their last event; a watcher that falls behind
+gets its pending changes merged instead of queued.
+
+Votes stored by other processes are seen as long as the results cache is
+shared between them, see ``CACHE_DIR``.
+"""
+import asyncio
+import json
+import logging
+from django.conf import settings
+from .models import Poll
+from .results import aget_results_version
+
+logger = logging.getLogger(__name__)
+
+_broadcasters = {}
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+class Watcher:
+    """
+    Pending events of one client. Count changes are merged until the client
+    reads them.
+    """
+
+    def __init__(self):
+        self.snapshot = None
+        self.counts = {}
+        self.total = None
+        self.ended = False
+        self.closed = False
+        self.ready = asyncio.Event()
+
+    def push_snapshot(self, results):
+        self.snapshot = results.as_dict()
+        self.counts.clear()
+        self.total = None
+        self.ready.set()
+
+    def push_counts(self, counts, total):
+        self.counts.update(counts)
+        self.total = total
+        self.ready.set()
+
+    def close(self, ended=False):
+        self.ended = ended
+        self.closed = True
+        self.ready.set()
+
+    def drain(self):
+        """
+        Return the pending events as SSE text
+        """
+        self.ready.clear()
+        events = []
+        if self.snapshot is not None:
+            events.append(format_event('snapshot', self.snapshot))
+            self.snapshot = None
+        if self.counts:
+            events.append(format_event('counts', {
+                'total': self.total,
+                'counts': {str(choice_id): count for choice_id, count in self.counts.items()},
+            }))
+            self.counts = {}
+        if self.ended:
+            events.append(format_event('ended', {}))
+        return ''.join(events)
+
+
+class ResultsBroadcaster:
+    def __init__(self, poll_id, tick):
+        self.poll_id = poll_id
+        self.tick = tick
+        self.watchers = set()
+        self.version = None
+        self.results = None
+        self.task = None
+
+    def subscribe(self):
+        watcher = Watcher()
+        if self.results is not None:
+            watcher.push_snapshot(self.results)
+        self.watchers.add(watcher)
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+        return watcher
+
+    def unsubscribe(self, watcher):
+        self.watchers.discard(watcher)
+
+    async def run(self):
+        try:
+            while self.watchers:
+                version = await aget_results_version(self.poll_id)
+                if version != self.version:
+                    try:
+                        poll = await Poll.objects.aget(pk=self.poll_id)
+                    except Poll.DoesNotExist:
+                        self.close_all(ended=True)
+                        return
+                    self.version = version
+                    self.publish(await poll.aget_results())
+                    if not poll.active:
+                        self.close_all(ended=True)
+                        return
+                await asyncio.sleep(self.tick)
+        except Exception:
+            # Clients reconnect and get a fresh broadcaster
+            logger.exception("Results stream of poll %s failed", self.poll_id)
+        finally:
+            if _broadcasters.get(self.poll_id) is self:
+                del _broadcasters[self.poll_id]
+            self.close_all()
+
+    def publish(self, results):
+        previous, self.results = self.results, results
+        if previous is None or [choice.id for choice in previous] != [choice.id for choice in results]:
+            # First read, or choices were added or removed
+            for watcher in self.watchers:
+                watcher.push_snapshot(results)
+            return
+        old_counts = {choice.id: choice.num_votes for choice in previous}
+        counts = {choice.id: choice.num_votes for choice in results if choice.num_votes != old_counts[choice.id]}
+        if counts:
+            for watcher in self.watchers:
+                watcher.push_counts(counts, results.total)
+
+    def close_all(self, ended=False):
+        for watcher in self.watchers:
+            watcher.close(ended)
+        self.watchers.clear()
+
+
+def get_broadcaster(poll_id):
+    """
+    The broadcaster of a poll, created on first use. Has to run on the event loop.
+    """
+    broadcaster = _broadcasters.get(poll_id)
+    if broadcaster is None:
+        broadcaster = _broadcasters[poll_id] = ResultsBroadcaster(
+            poll_id, getattr(settings, 'POLLS_STREAM_TICK', 0.25))
+    return broadcaster
+
+
+async def stream_results(poll_id, keepalive=15):
+    """
+    SSE body for one client, ending when the poll ends or is deleted
+    """
+    broadcaster = get_broadcaster(poll_id)
+    watcher = broadcaster.subscribe()
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(watcher.ready.wait(), keepalive)
+            except asyncio.TimeoutError:  # Not the builtin TimeoutError before Python 3.11
+                # Lets proxies and the server notice dropped clients
+                yield ': keepalive\n\n'
+                continue
+            events = watcher.drain()
+            if events:
+                yield events
+            if watcher.closed:
+                return
+    finally:
+        broadcaster.unsubscribe(watcher)
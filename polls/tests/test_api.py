@@ -0,0 +1,253 @@
+import json
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from polls.models import Poll, Choice, Vote, VoteQuerySet
+
+
+class APITestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        self.other_user = User.objects.create_user(username='other', email='other@example.com', password='other1234')
+        self.poll = Poll.objects.create(text='Test Poll', owner=self.user)
+        self.choice1 = Choice.objects.create(poll=self.poll, choice_text='Choice 1')
+        self.choice2 = Choice.objects.create(poll=self.poll, choice_text='Choice 2')
+
+    def assertRevalidates(self, url, queries=1):
+        """
+        A second request with the ETag of the first gets a 304 and returns the ETag
+        """
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('must-revalidate', response['Cache-Control'])
+        with self.assertNumQueries(queries):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        return response['ETag']
+
+    def assertChanged(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class PollDetailAPITest(APITestCase):
+
+    def test_detail(self):
+        response = self.client.get(reverse('polls:api_detail', args=[self.poll.id]))
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = response.json()
+        self.assertEqual(data['text'], 'Test Poll')
+        # Public like the poll page, which doesn't show the owner either
+        self.assertNotIn('owner', data)
+        self.assertEqual(data['choices'], [{'id': self.choice1.id, 'text': 'Choice 1'},
+                                           {'id': self.choice2.id, 'text': 'Choice 2'}])
+        self.assertEqual(data['results_url'], reverse('polls:api_results', args=[self.poll.id]))
+
+    def test_not_found(self):
+        response = self.client.get(reverse('polls:api_detail', args=[self.poll.id + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_not_modified_without_touching_votes(self):
+        self.assertRevalidates(reverse('polls:api_detail', args=[self.poll.id]))
+
+    def test_if_modified_since(self):
+        url = reverse('polls:api_detail', args=[self.poll.id])
+        response = self.client.get(url)
+        not_modified = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_poll_edit_changes_etag(self):
+        url = reverse('polls:api_detail', args=[self.poll.id])
+        etag = self.assertRevalidates(url)
+        self.poll.text = 'Edited'
+        self.poll.save()
+        self.assertChanged(url, etag)
+
+    def test_choice_changes_change_etag(self):
+        url = reverse('polls:api_detail', args=[self.poll.id])
+        etag = self.assertRevalidates(url)
+        Choice.objects.create(poll=self.poll, choice_text='Choice 3')
+        self.assertChanged(url, etag)
+        etag = self.client.get(url)['ETag']
+        self.choice1.delete()
+        self.assertChanged(url, etag)
+
+
+class PollResultsAPITest(APITestCase):
+
+    def test_results(self):
+        self.poll.add_vote(self.user, self.choice1)
+        data = self.client.get(reverse('polls:api_results', args=[self.poll.id])).json()
+        self.assertEqual(data['total'], 1)
+        self.assertEqual([choice['num_votes'] for choice in data['choices']], [1, 0])
+        self.assertEqual([choice['percentage'] for choice in data['choices']], [100, 0])
+
+    def test_votes_change_etag(self):
+        url = reverse('polls:api_results', args=[self.poll.id])
+        etag = self.assertRevalidates(url)
+        self.poll.add_vote(self.user, self.choice1)
+        self.assertChanged(url, etag)
+        etag = self.client.get(url)['ETag']
+        Vote.objects.bulk_record([(self.other_user.id, self.poll.id, self.choice2.id)])
+        self.assertChanged(url, etag)
+
+    def test_detail_and_results_etags_differ(self):
+        detail = self.client.get(reverse('polls:api_detail', args=[self.poll.id]))
+        results = self.client.get(reverse('polls:api_results', args=[self.poll.id]))
+        self.assertNotEqual(detail['ETag'], results['ETag'])
+
+
+class PollListAPITest(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        for number in range(7):
+            Poll.objects.create(text=f'Poll {number}', owner=self.other_user)
+        self.client.force_login(self.user)
+
+    def test_list(self):
+        data = self.client.get(reverse('polls:api_list')).json()
+        self.assertEqual(len(data['results']), 6)
+        self.assertEqual(data['results'][0]['text'], 'Test Poll')
+        self.assertEqual(data['results'][0]['owner'], 'example')
+        self.assertIsNone(data['previous'])
+        second = self.client.get(data['next']).json()
+        self.assertEqual(len(second['results']), 2)
+        self.assertIsNone(second['next'])
+
+    @override_settings(POLLS_PAGINATION='cursor')
+    def test_list_with_cursors(self):
+        data = self.client.get(reverse('polls:api_list')).json()
+        self.assertIn('cursor=', data['next'])
+        second = self.client.get(data['next']).json()
+        self.assertEqual(len(second['results']), 2)
+        self.assertIn('cursor=', second['previous'])
+
+    def test_list_search_and_sort(self):
+        data = self.client.get(reverse('polls:api_list'), {'search': 'Test'}).json()
+        self.assertEqual([poll['text'] for poll in data['results']], ['Test Poll'])
+        data = self.client.get(reverse('polls:api_list'), {'name': True}).json()
+        self.assertEqual(data['results'][0]['text'], 'Poll 0')
+
+    def test_requires_authentication(self):
+        self.client.logout()
+        response = self.client.get(reverse('polls:api_list'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'error': "Authentication required"})
+
+    def test_list_not_modified(self):
+        # Session and user come first
+        self.assertRevalidates(reverse('polls:api_list'), queries=3)
+        response = self.client.get(reverse('polls:api_list'))
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('public', response['Cache-Control'])
+
+    def test_list_changes(self):
+        url = reverse('polls:api_list')
+        etag = self.assertRevalidates(url, queries=3)
+        self.poll.add_vote(self.user, self.choice1)
+        self.assertChanged(url, etag)
+        etag = self.client.get(url)['ETag']
+        Poll.objects.filter(text='Poll 0').delete()
+        self.assertChanged(url, etag)
+
+
+@override_settings(POLLS_SERVICE_TOKENS=['kiosk-token'])
+class BatchVoteAPITest(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.closed_poll = Poll.objects.create(text='Closed Poll', owner=self.user, active=False)
+        self.closed_choice = Choice.objects.create(poll=self.closed_poll, choice_text='Too late')
+        self.url = reverse('polls:api_votes')
+
+    def post(self, votes, client=None, **headers):
+        client = client or self.client
+        return client.post(self.url, json.dumps({'votes': votes}), content_type='application/json', **headers)
+
+    def test_requires_authentication(self):
+        response = self.post([{'poll': self.poll.id, 'choice': self.choice1.id}])
+        self.assertEqual(response.status_code, 401)
+        response = self.post([{'poll': self.poll.id, 'choice': self.choice1.id}],
+                             HTTP_AUTHORIZATION='Bearer wrong-token')
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Vote.objects.exists())
+
+    def test_session_user_needs_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.login(username='example', password='example1234')
+        response = self.post([{'poll': self.poll.id, 'choice': self.choice1.id}], client=client)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Vote.objects.exists())
+
+    def test_session_user_votes(self):
+        self.client.login(username='example', password='example1234')
+        other_poll = Poll.objects.create(text='Other Poll', owner=self.user)
+        other_choice = Choice.objects.create(poll=other_poll, choice_text='Other')
+        response = self.post([
+            {'poll': self.poll.id, 'choice': self.choice1.id},
+            {'poll': other_poll.id, 'choice': other_choice.id},
+            {'poll': self.poll.id, 'choice': self.choice2.id},
+            {'poll': self.poll.id, 'choice': self.choice1.id, 'user': self.other_user.id},
+        ])
+        self.assertEqual(response.json()['results'], ['created', 'created', 'duplicate', 'invalid'])
+        self.assertEqual(response.json()['counts'], {'created': 2, 'duplicate': 1, 'invalid': 1})
+        self.assertEqual(set(Vote.objects.values_list('user', 'choice')),
+                         {(self.user.id, self.choice1.id), (self.user.id, other_choice.id)})
+        self.poll.refresh_from_db()
+        self.assertEqual(self.poll.vote_count, 1)
+
+    def test_service_votes_for_users(self):
+        self.poll.add_vote(self.user, self.choice1)
+        response = self.post([
+            {'user': self.user.id, 'poll': self.poll.id, 'choice': self.choice2.id},
+            {'user': self.other_user.id, 'poll': self.poll.id, 'choice': self.choice2.id},
+            {'user': self.other_user.id, 'poll': self.closed_poll.id, 'choice': self.closed_choice.id},
+            {'user': self.other_user.id, 'poll': self.poll.id, 'choice': self.closed_choice.id},
+            {'user': 9999, 'poll': self.poll.id, 'choice': self.choice1.id},
+            {'poll': self.poll.id, 'choice': self.choice1.id},
+            {'user': self.other_user.id, 'poll': '1', 'choice': self.choice1.id},
+        ], HTTP_AUTHORIZATION='Bearer kiosk-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [
+            'already_voted', 'created', 'closed', 'not_found', 'not_found', 'invalid', 'invalid',
+        ])
+        self.choice2.refresh_from_db()
+        self.assertEqual(self.choice2.vote_count, 1)
+
+    def test_queries_do_not_grow_with_batch_size(self):
+        users = User.objects.bulk_create([User(username=f'voter{number}') for number in range(50)])
+        votes = [{'user': user.id, 'poll': self.poll.id, 'choice': self.choice1.id} for user in users]
+        # choices, users, existing votes, insert, choice and poll counters,
+        # and the savepoint around them
+        with self.assertNumQueries(8):
+            response = self.post(votes, HTTP_AUTHORIZATION='Bearer kiosk-token')
+        self.assertEqual(response.json()['counts'], {'created': 50})
+        self.assertEqual(Vote.objects.count(), 50)
+
+    def test_concurrent_duplicate_falls_back_to_single_inserts(self):
+        self.client.login(username='example', password='example1234')
+        with mock.patch.object(VoteQuerySet, 'bulk_record', side_effect=[IntegrityError, []]):
+            response = self.post([{'poll': self.poll.id, 'choice': self.choice1.id}])
+        self.assertEqual(response.json()['results'], ['already_voted'])
+
+    @override_settings(POLLS_BATCH_VOTE_LIMIT=2)
+    def test_batch_limit(self):
+        votes = [{'poll': self.poll.id, 'choice': self.choice1.id}] * 3
+        response = self.post(votes, HTTP_AUTHORIZATION='Bearer kiosk-token')
+        self.assertEqual(response.status_code, 400)
+
+    def test_malformed_body(self):
+        self.client.login(username='example', password='example1234')
+        response = self.client.post(self.url, 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.url, json.dumps({'votes': 'x'}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
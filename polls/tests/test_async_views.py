@@ -0,0 +1,92 @@
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
+from polls import async_views, urls as poll_urls
+from polls.models import Poll, Choice, Vote
+
+# The regular URLconf with the async detail and vote views swapped in, as
+# POLLS_ASYNC_VIEWS does at import time
+async_poll_patterns = [
+    pattern for pattern in poll_urls.urlpatterns if pattern.name not in ('detail', 'vote')
+] + [
+    path('<int:poll_id>/', async_views.PollDetail.as_view(), name='detail'),
+    path('<int:poll_id>/vote/', async_views.PollVote.as_view(), name='vote'),
+]
+
+urlpatterns = [
+    path('', lambda request: None, name='home'),
+    path('accounts/', include('accounts.urls', namespace='accounts')),
+    path('polls/', include((async_poll_patterns, 'polls'))),
+]
+
+
+@override_settings(ROOT_URLCONF='polls.tests.test_async_views')
+class AsyncViewsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.poll = Poll.objects.create(owner=self.user, text='Test Poll')
+        self.choice1 = Choice.objects.create(poll=self.poll, choice_text='Choice 1')
+        self.choice2 = Choice.objects.create(poll=self.poll, choice_text='Choice 2')
+
+    async def test_detail(self):
+        response = await self.async_client.get(reverse('polls:detail', args=[self.poll.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'polls/poll_detail.html')
+        self.assertEqual(response.context['choices'], [self.choice1, self.choice2])
+        self.assertContains(response, 'Choice 2')
+
+    async def test_detail_not_found(self):
+        response = await self.async_client.get(reverse('polls:detail', args=[self.poll.id + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_detail_of_ended_poll_shows_results(self):
+        await Poll.objects.filter(pk=self.poll.pk).aupdate(active=False)
+        response = await self.async_client.get(reverse('polls:detail', args=[self.poll.id]))
+        self.assertTemplateUsed(response, 'polls/poll_result.html')
+        self.assertEqual(response.context['results'].total, 0)
+
+    async def test_vote_requires_login(self):
+        url = reverse('polls:vote', args=[self.poll.id])
+        response = await self.async_client.post(url, {'choice': self.choice1.id})
+        self.assertRedirects(response, f"{reverse('accounts:login')}?next={url}", fetch_redirect_response=False)
+        self.assertFalse(await Vote.objects.aexists())
+
+    async def test_vote(self):
+        await self.async_client.alogin(username='testuser', password='12345')
+        response = await self.async_client.post(reverse('polls:vote', args=[self.poll.id]),
+                                                {'choice': self.choice1.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'polls/poll_result.html')
+        self.assertEqual(response.context['results'].total, 1)
+        await self.choice1.arefresh_from_db()
+        self.assertEqual(self.choice1.vote_count, 1)
+
+    async def test_vote_twice(self):
+        await self.async_client.alogin(username='testuser', password='12345')
+        url = reverse('polls:vote', args=[self.poll.id])
+        await self.async_client.post(url, {'choice': self.choice1.id})
+        response = await self.async_client.post(url, {'choice': self.choice2.id})
+        self.assertRedirects(response, reverse('polls:list'), fetch_redirect_response=False)
+        messages = [str(message) for message in get_messages(response.asgi_request)]
+        self.assertIn("You already voted this poll!", messages)
+        self.assertEqual(await Vote.objects.acount(), 1)
+
+    async def test_vote_without_choice(self):
+        await self.async_client.alogin(username='testuser', password='12345')
+        response = await self.async_client.post(reverse('polls:vote', args=[self.poll.id]))
+        self.assertRedirects(response, reverse('polls:detail', args=[self.poll.id]), fetch_redirect_response=False)
+        messages = [str(message) for message in get_messages(response.asgi_request)]
+        self.assertIn("No choice selected!", messages)
+
+    async def test_vote_for_choice_of_other_poll(self):
+        other = await Poll.objects.acreate(owner=self.user, text='Other Poll')
+        other_choice = await Choice.objects.acreate(poll=other, choice_text='Elsewhere')
+        await self.async_client.alogin(username='testuser', password='12345')
+        response = await self.async_client.post(reverse('polls:vote', args=[self.poll.id]),
+                                                {'choice': other_choice.id})
+        self.assertRedirects(response, reverse('polls:detail', args=[self.poll.id]), fetch_redirect_response=False)
+        self.assertFalse(await Vote.objects.aexists())
@@ -0,0 +1,108 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from polls.models import Poll, Choice, Vote, PollResultSnapshot
+
+
+class ReconcileVoteCountsCommandTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        self.poll = Poll.objects.create(text='Test Poll', owner=self.user)
+        self.choice1 = Choice.objects.create(poll=self.poll, choice_text='Choice 1')
+        self.choice2 = Choice.objects.create(poll=self.poll, choice_text='Choice 2')
+
+    def test_reconcile_fixes_drifted_counters(self):
+        # Votes created directly bypass the counters
+        Vote.objects.create(user=self.user, poll=self.poll, choice=self.choice1)
+        Choice.objects.filter(pk=self.choice2.pk).update(vote_count=5)
+        out = StringIO()
+        call_command('reconcile_vote_counts', stdout=out)
+        self.poll.refresh_from_db()
+        self.choice1.refresh_from_db()
+        self.choice2.refresh_from_db()
+        self.assertEqual(self.poll.vote_count, 1)
+        self.assertEqual(self.choice1.vote_count, 1)
+        self.assertEqual(self.choice2.vote_count, 0)
+        self.assertIn('Fixed 2 choice and 1 poll counters', out.getvalue())
+
+    def test_reconcile_leaves_correct_counters(self):
+        self.poll.add_vote(self.user, self.choice1)
+        out = StringIO()
+        call_command('reconcile_vote_counts', stdout=out)
+        self.assertIn('Fixed 0 choice and 0 poll counters', out.getvalue())
+
+
+class SeedCommandTest(TestCase):
+
+    def seed(self, *args):
+        out = StringIO()
+        call_command('seed', '--seed=1', *args, stdout=out)
+        return out.getvalue()
+
+    def test_seed_creates_dataset(self):
+        output = self.seed('--users=20', '--polls=5', '--choices-min=2', '--choices-max=3', '--chunk-size=7')
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Poll.objects.count(), 5)
+        self.assertEqual(Vote.objects.count(), 100)
+        self.assertIn('rows/s', output)
+        # Every user shares one password hash
+        self.assertEqual(User.objects.values('password').distinct().count(), 1)
+        self.assertTrue(User.objects.first().check_password('password'))
+        for poll in Poll.objects.all():
+            self.assertEqual(poll.vote_count, 20)
+            self.assertEqual(sum(poll.choice_set.values_list('vote_count', flat=True)), 20)
+
+    def test_seed_participation_and_zipf(self):
+        self.seed('--users=50', '--polls=2', '--choices-min=4', '--choices-max=4',
+                  '--participation=0.5', '--distribution=zipf', '--zipf-exponent=3')
+        self.assertEqual(Vote.objects.count(), 50)
+        for poll in Poll.objects.all():
+            counts = sorted(poll.choice_set.values_list('vote_count', flat=True), reverse=True)
+            self.assertGreater(counts[0], counts[1] + counts[2] + counts[3])
+
+    def test_seeded_polls_are_searchable(self):
+        self.seed('--users=2', '--polls=3')
+        from polls.search import get_search_backend
+        poll = Poll.objects.first()
+        word = poll.text.split()[0]
+        self.assertIn(poll, get_search_backend().search(Poll.objects.all(), word))
+
+
+class SnapshotResultsCommandTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        self.other_user = User.objects.create_user(username='other', email='other@example.com', password='other1234')
+        self.ended = Poll.objects.create(text='Ended Poll', owner=self.user, active=False)
+        self.choice1 = Choice.objects.create(poll=self.ended, choice_text='Choice 1')
+        self.choice2 = Choice.objects.create(poll=self.ended, choice_text='Choice 2')
+        Vote.objects.create(user=self.user, poll=self.ended, choice=self.choice2)
+        Vote.objects.create(user=self.other_user, poll=self.ended, choice=self.choice2)
+        self.active = Poll.objects.create(text='Active Poll', owner=self.user)
+
+    def test_backfills_ended_polls(self):
+        out = StringIO()
+        call_command('snapshot_results', stdout=out)
+        self.assertIn('Saved 1 result snapshots', out.getvalue())
+        snapshot = PollResultSnapshot.objects.get()
+        self.assertEqual(snapshot.poll, self.ended)
+        self.assertEqual(snapshot.total, 2)
+        self.assertEqual([(row['text'], row['num_votes']) for row in snapshot.choices],
+                         [('Choice 1', 0), ('Choice 2', 2)])
+
+    def test_keeps_existing_snapshots_unless_refreshed(self):
+        call_command('snapshot_results', stdout=StringIO())
+        Vote.objects.filter(user=self.user).delete()
+        call_command('snapshot_results', stdout=StringIO())
+        self.assertEqual(PollResultSnapshot.objects.get().total, 2)
+        call_command('snapshot_results', '--refresh', stdout=StringIO())
+        self.assertEqual(PollResultSnapshot.objects.get().total, 1)
+
+    def test_batches(self):
+        other = Poll.objects.create(text='Other Ended Poll', owner=self.user, active=False)
+        with self.assertNumQueries(11):
+            # Listing, then per batch a recount and a delete and insert in a savepoint
+            call_command('snapshot_results', '--batch-size=1', stdout=StringIO())
+        self.assertEqual(PollResultSnapshot.objects.filter(poll=other).get().total, 0)
@@ -0,0 +1,83 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from polls.models import Poll, Choice
+
+
+class QueryPlanTestMixin:
+    """
+    Run EXPLAIN QUERY PLAN on SQLite for captured queries
+    """
+
+    def query_plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return ' | '.join(row[-1] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, sql, index_name=None):
+        plan = self.query_plan(sql)
+        self.assertNotIn('USE TEMP B-TREE', plan, plan)
+        if index_name:
+            self.assertIn(index_name, plan)
+        else:
+            self.assertRegex(plan, r'USING (COVERING )?INDEX|USING INTEGER PRIMARY KEY', plan)
+        return plan
+
+    def captured(self, queries, table):
+        """
+        The queries reading from table
+        """
+        return [query['sql'] for query in queries if f'FROM "{table}"' in query['sql']]
+
+
+class ViewQueryIndexTest(QueryPlanTestMixin, TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        self.client.login(username='example', password='example1234')
+        for i in range(10):
+            poll = Poll.objects.create(text=f"Poll {i}", owner=self.user)
+            Choice.objects.create(poll=poll, choice_text='Choice 1')
+        self.poll = poll
+
+    def list_query(self, url_name, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse(url_name), params or {})
+        return [sql for sql in self.captured(queries, 'polls_poll') if 'LIMIT' in sql][0]
+
+    def test_polls_list_sort_orders(self):
+        self.assertUsesIndex(self.list_query('polls:list'))
+        self.assertUsesIndex(self.list_query('polls:list', {'name': True}), 'polls_poll_text_idx')
+        self.assertUsesIndex(self.list_query('polls:list', {'date': True}), 'polls_poll_pub_date_idx')
+        self.assertUsesIndex(self.list_query('polls:list', {'vote': True}), 'polls_poll_vote_count_idx')
+
+    @override_settings(POLLS_PAGINATION='cursor')
+    def test_polls_list_cursor_pages(self):
+        first = self.client.get(reverse('polls:list'), {'date': True}).context['polls']
+        sql = self.list_query('polls:list', {'date': True, 'cursor': first.next_cursor})
+        self.assertUsesIndex(sql, 'polls_poll_pub_date_idx')
+
+    def test_user_polls_list(self):
+        self.assertUsesIndex(self.list_query('polls:list_by_user'), 'polls_poll_owner_idx')
+
+    def test_poll_result_choices(self):
+        Poll.objects.filter(pk=self.poll.pk).update(active=False)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('polls:detail', kwargs={'poll_id': self.poll.id}))
+        for sql in self.captured(queries, 'polls_choice'):
+            self.assertUsesIndex(sql)
+
+    def test_user_can_vote(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.poll.user_can_vote(self.user)
+        # SQLite backs the unique constraint with an automatic index
+        self.assertUsesIndex(queries[0]['sql'], 'autoindex_polls_vote')
+
+    def test_vote_counts_by_choice(self):
+        from polls.results import PollResults
+        with CaptureQueriesContext(connection) as queries:
+            PollResults.recount(self.poll)
+        plan = self.assertUsesIndex(queries[0]['sql'])
+        self.assertIn('COVERING INDEX polls_vote_poll_choice_idx', plan)
@@ -0,0 +1,135 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from polls.ingestion import VoteQueue
+from polls.models import Poll, Choice, Vote
+
+
+class VoteQueueTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        self.other_user = User.objects.create_user(username='other', email='other@example.com', password='other1234')
+        self.poll = Poll.objects.create(text='Test Poll', owner=self.user)
+        self.choice1 = Choice.objects.create(poll=self.poll, choice_text='Choice 1')
+        self.choice2 = Choice.objects.create(poll=self.poll, choice_text='Choice 2')
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.journal_dir = tmp_dir.name
+
+    def segments(self):
+        return sorted(name for name in os.listdir(self.journal_dir) if name.endswith('.log'))
+
+    def test_flush_stores_votes_and_counters(self):
+        vote_queue = VoteQueue(batch_size=10, journal_dir=self.journal_dir)
+        vote_queue.submit(self.user.id, self.poll.id, self.choice1.id)
+        vote_queue.submit(self.other_user.id, self.poll.id, self.choice1.id)
+        self.assertTrue(vote_queue.is_pending(self.user.id, self.poll.id))
+        self.assertEqual(vote_queue.flush(), 2)
+        self.assertFalse(vote_queue.is_pending(self.user.id, self.poll.id))
+        self.assertEqual(Vote.objects.filter(poll=self.poll).count(), 2)
+        self.poll.refresh_from_db()
+        self.choice1.refresh_from_db()
+        self.assertEqual(self.poll.vote_count, 2)
+        self.assertEqual(self.choice1.vote_count, 2)
+        # Drained queue leaves an empty journal
+        self.assertEqual(os.path.getsize(vote_queue.journal_path), 0)
+        vote_queue.stop()
+        self.assertEqual(self.segments(), [])
+
+    def test_flush_respects_batch_size(self):
+        vote_queue = VoteQueue(batch_size=1)
+        vote_queue.submit(self.user.id, self.poll.id, self.choice1.id)
+        vote_queue.submit(self.other_user.id, self.poll.id, self.choice2.id)
+        self.assertEqual(vote_queue.flush(), 1)
+        self.assertEqual(len(vote_queue), 1)
+        self.assertEqual(vote_queue.flush_all(), 1)
+
+    def test_flush_skips_existing_votes(self):
+        self.poll.add_vote(self.user, self.choice1)
+        vote_queue = VoteQueue()
+        vote_queue.submit(self.user.id, self.poll.id, self.choice2.id)
+        self.assertEqual(vote_queue.flush(), 0)
+        self.choice2.refresh_from_db()
+        self.assertEqual(self.choice2.vote_count, 0)
+
+    def crash(self, vote_queue):
+        # The process dies: its journal file and lock go, the segment stays
+        vote_queue._journal.close()
+
+    def test_journal_replay_after_crash(self):
+        crashed_queue = VoteQueue(journal_dir=self.journal_dir)
+        crashed_queue.submit(self.user.id, self.poll.id, self.choice1.id)
+        crashed_queue.submit(self.other_user.id, self.poll.id, self.choice2.id)
+        with open(crashed_queue.journal_path, 'a') as journal:
+            journal.write('[1, 2')  # torn write
+        self.crash(crashed_queue)
+        vote_queue = VoteQueue(journal_dir=self.journal_dir)
+        self.assertEqual(vote_queue.replay(), 2)
+        # Moved to the journal of the new queue
+        self.assertEqual(self.segments(), [os.path.basename(vote_queue.journal_path)])
+        self.assertEqual(vote_queue.flush_all(), 2)
+        self.assertEqual(Vote.objects.filter(poll=self.poll).count(), 2)
+
+    def test_queues_sharing_a_journal_dir(self):
+        first_queue = VoteQueue(journal_dir=self.journal_dir)
+        second_queue = VoteQueue(journal_dir=self.journal_dir)
+        first_queue.submit(self.user.id, self.poll.id, self.choice1.id)
+        second_queue.submit(self.other_user.id, self.poll.id, self.choice2.id)
+        self.assertEqual(len(self.segments()), 2)
+        # Draining one queue leaves the votes the other acknowledged journaled
+        first_queue.flush_all()
+        self.assertEqual(os.path.getsize(first_queue.journal_path), 0)
+        with open(second_queue.journal_path) as journal:
+            self.assertEqual(len(journal.readlines()), 1)
+        # A live queue's journal isn't taken over
+        third_queue = VoteQueue(journal_dir=self.journal_dir)
+        self.assertEqual(third_queue.replay(), 0)
+        self.crash(second_queue)
+        self.assertEqual(third_queue.replay(), 1)
+        self.assertEqual(third_queue.flush_all(), 1)
+        self.assertTrue(Vote.objects.filter(user=self.other_user, poll=self.poll).exists())
+
+    def test_flush_votes_command(self):
+        crashed_queue = VoteQueue(journal_dir=self.journal_dir)
+        crashed_queue.submit(self.user.id, self.poll.id, self.choice1.id)
+        self.crash(crashed_queue)
+        out = StringIO()
+        call_command('flush_votes', journal_dir=self.journal_dir, stdout=out)
+        self.assertIn('Replayed 1 journaled votes, stored 1 new votes', out.getvalue())
+        self.assertEqual(self.segments(), [])
+
+
+@override_settings(POLLS_VOTE_INGESTION='queued')
+class QueuedPollVoteViewTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        self.client.login(username='example', password='example1234')
+        self.poll = Poll.objects.create(text='Test Poll', owner=self.user)
+        self.choice = Choice.objects.create(poll=self.poll, choice_text='Choice 1')
+        self.vote_queue = VoteQueue()
+        patcher = mock.patch('polls.ingestion.get_vote_queue', return_value=self.vote_queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_vote_is_queued(self):
+        response = self.client.post(reverse('polls:vote', kwargs={'poll_id': self.poll.id}), {'choice': self.choice.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'polls/poll_result.html')
+        self.assertFalse(Vote.objects.exists())
+        self.assertTrue(self.vote_queue.is_pending(self.user.id, self.poll.id))
+        self.vote_queue.flush()
+        self.assertTrue(Vote.objects.filter(user=self.user, poll=self.poll, choice=self.choice).exists())
+
+    def test_pending_vote_counts_as_voted(self):
+        url = reverse('polls:vote', kwargs={'poll_id': self.poll.id})
+        self.client.post(url, {'choice': self.choice.id})
+        response = self.client.post(url, {'choice': self.choice.id})
+        self.assertRedirects(response, reverse('polls:list'))
+        self.assertEqual(len(self.vote_queue), 1)
@@ -0,0 +1,103 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from polls.models import Poll
+from polls.pagination import KeysetPaginator
+
+
+class KeysetPaginatorTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        now = timezone.now()
+        # Pairs of equal dates and vote counts exercise the id tie-break
+        self.polls = [
+            Poll.objects.create(text=f"Poll {i:02d}", owner=self.user,
+                                pub_date=now - timedelta(days=i // 2))
+            for i in range(15)
+        ]
+        for i, poll in enumerate(self.polls):
+            Poll.objects.filter(pk=poll.pk).update(vote_count=i % 4)
+
+    def walk(self, sort_field):
+        paginator = KeysetPaginator(Poll.objects.all(), 6, sort_field)
+        page = paginator.get_page()
+        pages = [page]
+        while page.has_next:
+            page = paginator.get_page(page.next_cursor)
+            pages.append(page)
+        return paginator, pages
+
+    def test_walk_forward_covers_every_poll_once(self):
+        for sort_field in ('id', 'text', 'pub_date', 'vote_count'):
+            _, pages = self.walk(sort_field)
+            seen = [poll for page in pages for poll in page]
+            expected = list(Poll.objects.order_by(sort_field, 'pk'))
+            self.assertEqual(seen, expected, sort_field)
+            self.assertEqual([len(page) for page in pages], [6, 6, 3])
+
+    def test_walk_backward(self):
+        paginator, pages = self.walk('pub_date')
+        self.assertFalse(pages[0].has_previous)
+        previous = paginator.get_page(pages[2].previous_cursor)
+        self.assertEqual(list(previous), list(pages[1]))
+        self.assertTrue(previous.has_previous)
+        first = paginator.get_page(previous.previous_cursor)
+        self.assertEqual(list(first), list(pages[0]))
+        self.assertFalse(first.has_previous)
+        self.assertTrue(first.has_next)
+
+    def test_tampered_cursor_starts_at_first_page(self):
+        paginator, pages = self.walk('text')
+        page = paginator.get_page(pages[0].next_cursor + 'x')
+        self.assertEqual(list(page), list(pages[0]))
+
+    def test_cursor_of_another_sort_field_starts_at_first_page(self):
+        _, pub_date_pages = self.walk('pub_date')
+        paginator, pages = self.walk('vote_count')
+        page = paginator.get_page(pub_date_pages[0].next_cursor)
+        self.assertEqual(list(page), list(pages[0]))
+
+    def test_page_does_not_count(self):
+        paginator = KeysetPaginator(Poll.objects.all(), 6, 'vote_count')
+        with CaptureQueriesContext(connection) as queries:
+            paginator.get_page()
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT(', queries[0]['sql'].upper())
+        self.assertNotIn('OFFSET', queries[0]['sql'].upper())
+
+
+@override_settings(POLLS_PAGINATION='cursor')
+class CursorPaginatedPollsListTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        self.client.login(username='example', password='example1234')
+        for i in range(8):
+            Poll.objects.create(text=f"Poll {i}", owner=self.user)
+
+    def test_polls_list_cursor_pages(self):
+        response = self.client.get(reverse('polls:list'), {'name': True})
+        self.assertEqual(response.status_code, 200)
+        polls = response.context['polls']
+        self.assertEqual(len(polls), 6)
+        self.assertContains(response, f'?cursor={polls.next_cursor}&name=True')
+        response = self.client.get(reverse('polls:list'), {'name': True, 'cursor': polls.next_cursor})
+        self.assertEqual([poll.text for poll in response.context['polls']], ['Poll 6', 'Poll 7'])
+        self.assertNotIn('cursor', response.context['params'])
+
+    def test_user_polls_list_cursor_pages(self):
+        response = self.client.get(reverse('polls:list_by_user'))
+        polls = response.context['polls']
+        response = self.client.get(reverse('polls:list_by_user'), {'cursor': polls.next_cursor})
+        self.assertEqual(len(response.context['polls']), 2)
+
+    def test_cursor_of_another_sort_order(self):
+        polls = self.client.get(reverse('polls:list'), {'date': True}).context['polls']
+        response = self.client.get(reverse('polls:list'), {'vote': True, 'cursor': polls.next_cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['polls'].has_previous)
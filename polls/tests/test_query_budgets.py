@@ -0,0 +1,204 @@
+"""
+Query budgets of the polls views.
+
+Every URL name of polls/urls.py has a budget in QUERY_BUDGETS: the most
+queries one request may run. Each request is made twice, against a small
+dataset and against one with full pages, many choices and many votes, and
+must stay within the budget and run the same number of queries both times,
+so a query per row, choice or vote fails the build. The accounts views are
+checked the same way in accounts/tests/test_query_budgets.py.
+"""
+import json
+from collections import namedtuple
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User, Permission
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from polls import urls
+from polls.models import Poll, Choice, Vote
+
+QUERY_BUDGETS = {
+    'polls:list': 4,
+    'polls:list_by_user': 4,
+    'polls:add': 16,
+    'polls:edit': 8,
+    'polls:delete_poll': 13,
+    'polls:end_poll': 12,
+    'polls:add_choice': 8,
+    'polls:choice_edit': 10,
+    'polls:choice_delete': 15,
+    'polls:detail': 4,
+    'polls:vote': 10,
+    'polls:results_stream': 4,
+    'polls:api_list': 5,
+    'polls:api_detail': 2,
+    'polls:api_results': 2,
+    'polls:api_timeseries': 4,
+    'polls:api_votes': 9,
+}
+
+Scale = namedtuple('Scale', 'polls choices voters')
+
+SMALL = Scale(polls=2, choices=2, voters=3)
+LARGE = Scale(polls=30, choices=25, voters=150)
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Runs requests against both datasets and checks their query counts
+    """
+    budgets = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', email='owner@example.com', password='owner1234')
+        cls.owner.user_permissions.add(Permission.objects.get(codename='add_poll'))
+        # Hashing is slow, the voters share one password hash
+        password = make_password('voter1234')
+        User.objects.bulk_create(
+            User(username=f'voter{number}', email=f'voter{number}@example.com', password=password)
+            for number in range(LARGE.voters)
+        )
+        cls.voters = list(User.objects.filter(username__startswith='voter').order_by('id'))
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def make_poll(self, scale, active=True):
+        """
+        A poll of the owner with the choices and votes of scale
+        """
+        poll = Poll.objects.create(text='Which one do you like best?', owner=self.owner)
+        Choice.objects.bulk_create(
+            Choice(poll=poll, choice_text=f'Choice {number}') for number in range(scale.choices)
+        )
+        choices = list(poll.choice_set.order_by('id'))
+        Vote.objects.bulk_record(
+            (voter.pk, poll.pk, choices[number % len(choices)].pk)
+            for number, voter in enumerate(self.voters[:scale.voters])
+        )
+        if not active:
+            poll.refresh_from_db()
+            poll.close()
+        return poll
+
+    def populate(self, scale):
+        """
+        Replace the polls with scale.polls polls of both users
+        """
+        Poll.objects.all().delete()
+        for number in range(scale.polls):
+            self.make_poll(scale, active=number % 3 != 0)
+            Poll.objects.create(text='Poll of someone else', owner=self.voters[0])
+
+    def get(self, name, *args, **params):
+        return lambda: self.client.get(reverse(name, args=args), params)
+
+    def post(self, name, *args, data=None):
+        return lambda: self.client.post(reverse(name, args=args), data)
+
+    def assertQueryBudget(self, name, request):
+        """
+        request(scale) makes one request of the view and returns its response
+        """
+        counts = []
+        for scale in (SMALL, LARGE):
+            self.populate(scale)
+            prepared = request(scale)
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = prepared()
+            self.assertLess(response.status_code, 400, f"{name} answered {response.status_code}")
+            counts.append((len(queries), queries))
+        (small, _), (large, large_queries) = counts
+        sql = '\n'.join(query['sql'] for query in large_queries.captured_queries)
+        self.assertLessEqual(large, self.budgets[name], f"{name} ran {large} queries:\n{sql}")
+        self.assertEqual(small, large, f"The queries of {name} grow with the data:\n{sql}")
+
+
+class PollsQueryBudgetTest(QueryBudgetTestCase):
+    budgets = QUERY_BUDGETS
+
+    def test_every_view_has_a_budget(self):
+        names = {f'{urls.app_name}:{pattern.name}' for pattern in urls.urlpatterns}
+        self.assertEqual(names, set(self.budgets))
+
+    def test_list(self):
+        self.assertQueryBudget('polls:list', lambda scale: self.get('polls:list'))
+        self.assertQueryBudget('polls:list', lambda scale: self.get('polls:list', search='like', vote=True))
+
+    def test_list_by_user(self):
+        self.assertQueryBudget('polls:list_by_user', lambda scale: self.get('polls:list_by_user'))
+
+    def test_add(self):
+        self.assertQueryBudget('polls:add', lambda scale: self.get('polls:add'))
+        self.assertQueryBudget('polls:add', lambda scale: self.post('polls:add', data={
+            'text': 'A new poll', 'choice1': 'Yes', 'choice2': 'No'}))
+
+    def test_edit(self):
+        self.assertQueryBudget('polls:edit', lambda scale: self.get('polls:edit', self.make_poll(scale).pk))
+        self.assertQueryBudget('polls:edit', lambda scale: self.post(
+            'polls:edit', self.make_poll(scale).pk, data={'text': 'Renamed'}))
+
+    def test_delete_poll(self):
+        self.assertQueryBudget('polls:delete_poll', lambda scale: self.get('polls:delete_poll', self.make_poll(scale).pk))
+
+    def test_end_poll(self):
+        self.assertQueryBudget('polls:end_poll', lambda scale: self.get('polls:end_poll', self.make_poll(scale).pk))
+
+    def test_add_choice(self):
+        self.assertQueryBudget('polls:add_choice', lambda scale: self.get('polls:add_choice', self.make_poll(scale).pk))
+        self.assertQueryBudget('polls:add_choice', lambda scale: self.post(
+            'polls:add_choice', self.make_poll(scale).pk, data={'choice_text': 'Another one'}))
+
+    def test_choice_edit(self):
+        def choice(scale):
+            return self.make_poll(scale).choice_set.first().pk
+        self.assertQueryBudget('polls:choice_edit', lambda scale: self.get('polls:choice_edit', choice(scale)))
+        self.assertQueryBudget('polls:choice_edit', lambda scale: self.post(
+            'polls:choice_edit', choice(scale), data={'choice_text': 'Renamed'}))
+
+    def test_choice_delete(self):
+        self.assertQueryBudget('polls:choice_delete', lambda scale: self.get(
+            'polls:choice_delete', self.make_poll(scale).choice_set.first().pk))
+
+    def test_detail(self):
+        self.assertQueryBudget('polls:detail', lambda scale: self.get('polls:detail', self.make_poll(scale).pk))
+        self.assertQueryBudget('polls:detail', lambda scale: self.get(
+            'polls:detail', self.make_poll(scale, active=False).pk))
+
+    def test_vote(self):
+        def vote(scale):
+            poll = self.make_poll(scale)
+            return self.post('polls:vote', poll.pk, data={'choice': poll.choice_set.last().pk})
+        self.assertQueryBudget('polls:vote', vote)
+
+    def test_results_stream(self):
+        self.assertQueryBudget('polls:results_stream', lambda scale: self.get(
+            'polls:results_stream', self.make_poll(scale).pk))
+
+    def test_api_list(self):
+        self.assertQueryBudget('polls:api_list', lambda scale: self.get('polls:api_list'))
+        self.assertQueryBudget('polls:api_list', lambda scale: self.get('polls:api_list', search='like', page=2))
+
+    def test_api_detail(self):
+        self.assertQueryBudget('polls:api_detail', lambda scale: self.get('polls:api_detail', self.make_poll(scale).pk))
+
+    def test_api_results(self):
+        self.assertQueryBudget('polls:api_results', lambda scale: self.get(
+            'polls:api_results', self.make_poll(scale).pk))
+
+    def test_api_timeseries(self):
+        self.assertQueryBudget('polls:api_timeseries', lambda scale: self.get(
+            'polls:api_timeseries', self.make_poll(scale).pk, granularity='hour'))
+
+    def test_api_votes(self):
+        def votes(scale):
+            polls = [self.make_poll(SMALL) for _ in range(scale.polls)]
+            body = {'votes': [{'poll': poll.pk, 'choice': poll.choice_set.first().pk} for poll in polls]}
+            url = reverse('polls:api_votes')
+            return lambda: self.client.post(url, json.dumps(body), content_type='application/json')
+        self.assertQueryBudget('polls:api_votes', votes)
@@ -0,0 +1,120 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import TestCase
+from polls.models import Poll, Choice, Vote
+from polls.results import PollResults, get_cached_results, _version_key
+
+
+class PollResultsTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        self.other_user = User.objects.create_user(username='other', email='other@example.com', password='other1234')
+        self.poll = Poll.objects.create(text='Test Poll', owner=self.user)
+        self.choice1 = Choice.objects.create(poll=self.poll, choice_text='Choice 1')
+        self.choice2 = Choice.objects.create(poll=self.poll, choice_text='Choice 2')
+        self.choice3 = Choice.objects.create(poll=self.poll, choice_text='Choice 3')
+
+    def test_results_without_votes(self):
+        results = PollResults.for_poll(self.poll)
+        self.assertEqual(results.total, 0)
+        self.assertEqual([choice.percentage for choice in results], [0, 0, 0])
+
+    def test_results_counts_and_percentages(self):
+        self.poll.add_vote(self.user, self.choice1)
+        self.poll.add_vote(self.other_user, self.choice2)
+        results = PollResults.for_poll(self.poll)
+        self.assertEqual(results.total, 2)
+        self.assertEqual([choice.text for choice in results], ['Choice 1', 'Choice 2', 'Choice 3'])
+        self.assertEqual([choice.num_votes for choice in results], [1, 1, 0])
+        self.assertEqual([choice.percentage for choice in results], [50, 50, 0])
+
+    def test_results_render_the_same_colors(self):
+        first = PollResults.for_poll(self.poll)
+        second = PollResults.for_poll(self.poll)
+        self.assertEqual([choice.alert_class for choice in first], ['primary', 'secondary', 'success'])
+        self.assertEqual(first, second)
+        self.assertEqual(first.fingerprint, second.fingerprint)
+        self.poll.add_vote(self.user, self.choice1)
+        self.assertNotEqual(PollResults.for_poll(self.poll).fingerprint, first.fingerprint)
+
+    def test_result_fragment_is_cached(self):
+        self.poll.add_vote(self.user, self.choice1)
+        results = PollResults.for_poll(self.poll)
+        context = {'poll': self.poll, 'results': results}
+        html = render_to_string('polls/poll_result.html', context)
+        self.assertEqual(render_to_string('polls/poll_result.html', context), html)
+        # Equal results reuse the fragment without reading the choices
+        with mock.patch.object(PollResults, '__iter__', side_effect=AssertionError):
+            self.assertEqual(render_to_string('polls/poll_result.html', context), html)
+
+    def test_results_single_query(self):
+        with self.assertNumQueries(1):
+            PollResults.for_poll(self.poll)
+        with self.assertNumQueries(1):
+            PollResults.recount(self.poll)
+
+    def test_recount_ignores_stored_counters(self):
+        Vote.objects.create(user=self.user, poll=self.poll, choice=self.choice3)
+        self.assertEqual(PollResults.for_poll(self.poll).total, 0)
+        results = PollResults.recount(self.poll)
+        self.assertEqual(results.total, 1)
+        self.assertEqual(results.choices[2].num_votes, 1)
+        self.assertEqual(results.choices[2].percentage, 100)
+
+    def test_results_as_dict(self):
+        self.poll.add_vote(self.user, self.choice1)
+        data = PollResults.for_poll(self.poll).as_dict()
+        self.assertEqual(data['poll_id'], self.poll.id)
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['choices'][0]['id'], self.choice1.id)
+        self.assertEqual(data['choices'][0]['num_votes'], 1)
+
+
+class CachedResultsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        self.other_user = User.objects.create_user(username='other', email='other@example.com', password='other1234')
+        self.poll = Poll.objects.create(text='Test Poll', owner=self.user)
+        self.choice1 = Choice.objects.create(poll=self.poll, choice_text='Choice 1')
+        self.choice2 = Choice.objects.create(poll=self.poll, choice_text='Choice 2')
+
+    def test_results_are_cached(self):
+        get_cached_results(self.poll)
+        with self.assertNumQueries(0):
+            results = get_cached_results(self.poll)
+        self.assertEqual(results.total, 0)
+
+    def test_vote_invalidates_results(self):
+        get_cached_results(self.poll)
+        self.poll.add_vote(self.user, self.choice1)
+        self.assertEqual(get_cached_results(self.poll).total, 1)
+        Vote.objects.bulk_record([(self.other_user.id, self.poll.id, self.choice2.id)])
+        self.assertEqual(get_cached_results(self.poll).total, 2)
+
+    def test_choice_edit_and_delete_invalidate_results(self):
+        get_cached_results(self.poll)
+        self.choice1.choice_text = 'Renamed'
+        self.choice1.save()
+        self.assertEqual(get_cached_results(self.poll).choices[0].text, 'Renamed')
+        self.choice2.delete()
+        self.assertEqual(len(get_cached_results(self.poll)), 1)
+
+    def test_active_poll_ttl_and_ended_poll_kept(self):
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            get_cached_results(self.poll)
+            self.assertEqual(cache_set.call_args.args[2], 5)
+            self.poll.active = False
+            self.poll.save()
+            get_cached_results(self.poll)
+            self.assertIsNone(cache_set.call_args.args[2])
+
+    def test_evicted_version_does_not_revive_old_entry(self):
+        get_cached_results(self.poll)
+        cache.delete(_version_key(self.poll.id))
+        Choice.objects.filter(pk=self.choice1.pk).update(vote_count=3)
+        self.assertEqual(get_cached_results(self.poll).total, 3)
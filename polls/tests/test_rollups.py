@@ -0,0 +1,180 @@
+import datetime
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from polls.models import Poll, Choice, Vote, VoteRollup, RollupWatermark
+from polls.rollups import RollupConflict, WATERMARK, prune_minutes, rollup_votes
+
+UTC = datetime.timezone.utc
+
+
+class RollupTestCase(TestCase):
+
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f'user{number}') for number in range(5)]
+        self.poll = Poll.objects.create(text='Test Poll', owner=self.users[0])
+        self.choice1 = Choice.objects.create(poll=self.poll, choice_text='Choice 1')
+        self.choice2 = Choice.objects.create(poll=self.poll, choice_text='Choice 2')
+        self.user_index = 0
+
+    def vote(self, choice, created_at):
+        vote = Vote.objects.create(user=self.users[self.user_index], poll=choice.poll, choice=choice)
+        self.user_index += 1
+        Vote.objects.filter(pk=vote.pk).update(created_at=created_at)
+        return vote
+
+    def rollups(self, granularity):
+        return list(VoteRollup.objects.filter(granularity=granularity)
+                    .order_by('bucket', 'choice').values_list('bucket', 'choice', 'votes'))
+
+
+class RollupVotesTest(RollupTestCase):
+
+    def test_buckets(self):
+        self.vote(self.choice1, datetime.datetime(2024, 5, 1, 10, 15, 30, tzinfo=UTC))
+        self.vote(self.choice1, datetime.datetime(2024, 5, 1, 10, 15, 50, tzinfo=UTC))
+        self.vote(self.choice2, datetime.datetime(2024, 5, 1, 10, 45, tzinfo=UTC))
+        self.vote(self.choice1, datetime.datetime(2024, 5, 2, 9, 0, tzinfo=UTC))
+        self.assertEqual(rollup_votes(), 4)
+
+        self.assertEqual(self.rollups(VoteRollup.MINUTE), [
+            (datetime.datetime(2024, 5, 1, 10, 15, tzinfo=UTC), self.choice1.id, 2),
+            (datetime.datetime(2024, 5, 1, 10, 45, tzinfo=UTC), self.choice2.id, 1),
+            (datetime.datetime(2024, 5, 2, 9, 0, tzinfo=UTC), self.choice1.id, 1),
+        ])
+        self.assertEqual(self.rollups(VoteRollup.HOUR), [
+            (datetime.datetime(2024, 5, 1, 10, tzinfo=UTC), self.choice1.id, 2),
+            (datetime.datetime(2024, 5, 1, 10, tzinfo=UTC), self.choice2.id, 1),
+            (datetime.datetime(2024, 5, 2, 9, tzinfo=UTC), self.choice1.id, 1),
+        ])
+        self.assertEqual(self.rollups(VoteRollup.DAY), [
+            (datetime.datetime(2024, 5, 1, tzinfo=UTC), self.choice1.id, 2),
+            (datetime.datetime(2024, 5, 1, tzinfo=UTC), self.choice2.id, 1),
+            (datetime.datetime(2024, 5, 2, tzinfo=UTC), self.choice1.id, 1),
+        ])
+
+    def test_only_new_votes_are_counted(self):
+        moment = datetime.datetime(2024, 5, 1, 10, 15, tzinfo=UTC)
+        self.vote(self.choice1, moment)
+        rollup_votes()
+        last = self.vote(self.choice1, moment)
+        self.assertEqual(rollup_votes(), 1)
+        self.assertEqual(rollup_votes(), 0)
+        self.assertEqual(self.rollups(VoteRollup.DAY), [(datetime.datetime(2024, 5, 1, tzinfo=UTC), self.choice1.id, 2)])
+        self.assertEqual(RollupWatermark.objects.get(name=WATERMARK).last_vote_id, last.id)
+
+    def test_batches(self):
+        for _ in range(5):
+            self.vote(self.choice2, datetime.datetime(2024, 5, 1, 10, 15, tzinfo=UTC))
+        self.assertEqual(rollup_votes(batch_size=2), 5)
+        self.assertEqual(self.rollups(VoteRollup.HOUR), [(datetime.datetime(2024, 5, 1, 10, tzinfo=UTC), self.choice2.id, 5)])
+
+    def test_recent_votes_wait_for_the_lag(self):
+        self.vote(self.choice1, timezone.now() - datetime.timedelta(minutes=5))
+        recent = self.vote(self.choice1, timezone.now())
+        self.assertEqual(rollup_votes(lag=60), 1)
+        self.assertLess(RollupWatermark.objects.get(name=WATERMARK).last_vote_id, recent.id)
+        self.assertEqual(rollup_votes(lag=0), 1)
+
+    def test_concurrent_run_is_rejected(self):
+        self.vote(self.choice1, datetime.datetime(2024, 5, 1, 10, 15, tzinfo=UTC))
+        RollupWatermark.objects.create(name=WATERMARK)
+        real_filter = RollupWatermark.objects.filter
+
+        def moved_meanwhile(*args, **kwargs):
+            RollupWatermark.objects.update(last_vote_id=0)
+            return real_filter(*args, **kwargs).none()
+
+        with mock.patch.object(RollupWatermark.objects, 'filter', side_effect=moved_meanwhile):
+            with self.assertRaises(RollupConflict):
+                rollup_votes()
+        self.assertFalse(VoteRollup.objects.exists())
+
+    def test_prune_minutes(self):
+        self.vote(self.choice1, timezone.now() - datetime.timedelta(days=10))
+        self.vote(self.choice1, timezone.now() - datetime.timedelta(days=1))
+        rollup_votes()
+        self.assertEqual(prune_minutes(7), 1)
+        self.assertEqual(len(self.rollups(VoteRollup.MINUTE)), 1)
+        self.assertEqual(len(self.rollups(VoteRollup.DAY)), 2)
+
+    def test_command(self):
+        self.vote(self.choice1, timezone.now() - datetime.timedelta(days=10))
+        out = StringIO()
+        call_command('rollup_votes', stdout=out)
+        self.assertIn('Counted 1 votes into the rollups, pruned 1 minute buckets', out.getvalue())
+
+
+class PollTimeSeriesAPITest(RollupTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.vote(self.choice1, datetime.datetime(2024, 5, 1, 10, 15, tzinfo=UTC))
+        self.vote(self.choice2, datetime.datetime(2024, 5, 1, 10, 20, tzinfo=UTC))
+        self.vote(self.choice2, datetime.datetime(2024, 5, 1, 12, 0, tzinfo=UTC))
+        rollup_votes()
+        self.url = reverse('polls:api_timeseries', args=[self.poll.id])
+        self.params = {'since': '2024-05-01T00:00:00Z', 'until': '2024-05-02T00:00:00Z'}
+
+    def test_hourly_series(self):
+        with self.assertNumQueries(4):
+            data = self.client.get(self.url, self.params).json()
+        self.assertEqual(data['granularity'], 'hour')
+        self.assertEqual([choice['text'] for choice in data['choices']], ['Choice 1', 'Choice 2'])
+        self.assertEqual(data['buckets'], [
+            {'bucket': '2024-05-01T10:00:00Z', 'total': 2,
+             'counts': {str(self.choice1.id): 1, str(self.choice2.id): 1}},
+            {'bucket': '2024-05-01T12:00:00Z', 'total': 1, 'counts': {str(self.choice2.id): 1}},
+        ])
+
+    def test_daily_series(self):
+        data = self.client.get(self.url, {**self.params, 'granularity': 'day'}).json()
+        self.assertEqual([bucket['total'] for bucket in data['buckets']], [3])
+
+    def test_range(self):
+        data = self.client.get(self.url, {'since': '2024-05-01T11:00:00', 'until': '2024-05-01T13:00:00'}).json()
+        self.assertEqual([bucket['bucket'] for bucket in data['buckets']], ['2024-05-01T12:00:00Z'])
+
+    def test_invalid_parameters(self):
+        for params in ({'granularity': 'week'}, {'since': 'yesterday'},
+                       {'since': '2024-05-02T00:00:00Z', 'until': '2024-05-01T00:00:00Z'},
+                       {'granularity': 'minute', 'since': '2020-01-01T00:00:00Z'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+    def test_not_modified_until_next_rollup(self):
+        etag = self.client.get(self.url, self.params)['ETag']
+        self.vote(self.choice1, datetime.datetime(2024, 5, 1, 12, 30, tzinfo=UTC))
+        response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        rollup_votes()
+        response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['buckets'][-1]['total'], 2)
+
+    def test_default_window_moves_by_whole_buckets(self):
+        now = datetime.datetime(2024, 5, 8, 10, 40, tzinfo=UTC)
+        Poll.objects.update(updated_at=now - datetime.timedelta(days=1))
+        RollupWatermark.objects.update(updated_at=now - datetime.timedelta(days=1))
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            response = self.client.get(self.url)
+        data = response.json()
+        self.assertEqual((data['since'], data['until']), ('2024-05-01T11:00:00Z', '2024-05-08T11:00:00Z'))
+        self.assertEqual([bucket['bucket'] for bucket in data['buckets']], ['2024-05-01T12:00:00Z'])
+        # Same bucket, same window
+        with mock.patch('django.utils.timezone.now', return_value=now + datetime.timedelta(minutes=10)):
+            revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'],
+                                          HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(revalidated.status_code, 304)
+        # The next hour drops the 12:00 bucket of a week ago
+        with mock.patch('django.utils.timezone.now', return_value=now + datetime.timedelta(hours=2)):
+            for headers in ({'HTTP_IF_NONE_MATCH': response['ETag']},
+                            {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']}):
+                moved = self.client.get(self.url, **headers)
+                self.assertEqual(moved.status_code, 200, headers)
+                self.assertEqual(moved.json()['buckets'], [])
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from polls.models import Poll, Choice, Vote
+from polls.routing import PINNED_SESSION_KEY, replica_reads
+
+
+class ReplicaRoutingTest(TestCase):
+    """
+    A second SQLite file stands in for a replica that lags behind: it has the
+    same rows as the default database, with other poll texts.
+    """
+    # The replica alias only exists while the class runs
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp(prefix='pollme-replica-')
+        connections.settings['replica'] = connections.configure_settings({
+            'default': connections.settings['default'],
+            'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(cls.directory, 'replica.sqlite3')},
+        })['replica']
+        call_command('migrate', database='replica', verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='example', password='example1234')
+        User.objects.using('replica').create(pk=self.user.pk, username='example')
+        self.poll = Poll.objects.create(text='Poll on primary', owner=self.user)
+        self.choice = Choice.objects.create(poll=self.poll, choice_text='Choice on primary')
+        Poll.objects.using('replica').create(pk=self.poll.pk, text='Poll on replica', owner_id=self.user.pk)
+        Choice.objects.using('replica').create(pk=self.choice.pk, poll_id=self.poll.pk, choice_text='Choice on replica')
+        self.client.force_login(self.user)
+
+    def test_router(self):
+        self.assertEqual(Poll.objects.get().text, 'Poll on primary')
+        with replica_reads():
+            self.assertEqual(Poll.objects.get().text, 'Poll on replica')
+            self.assertEqual(User.objects.db_manager().db, 'default')
+            poll = Poll.objects.create(text='New poll', owner=self.user)
+        self.assertEqual(poll._state.db, 'default')
+
+    def test_list_reads_replica(self):
+        response = self.client.get(reverse('polls:list'))
+        self.assertContains(response, 'Poll on replica')
+        self.assertContains(self.client.get(reverse('polls:list_by_user')), 'Poll on replica')
+
+    def test_detail_reads_replica(self):
+        self.assertContains(self.client.get(reverse('polls:detail', args=[self.poll.pk])), 'Choice on replica')
+        self.assertContains(self.client.get(reverse('polls:api_detail', args=[self.poll.pk])), 'Poll on replica')
+
+    def test_vote_pins_session_to_primary(self):
+        response = self.client.post(reverse('polls:vote', args=[self.poll.pk]), {'choice': self.choice.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Vote.objects.using('default').count(), 1)
+        self.assertEqual(Vote.objects.using('replica').count(), 0)
+        self.assertContains(self.client.get(reverse('polls:list')), 'Poll on primary')
+
+        # Back to the replica once the pin expires
+        session = self.client.session
+        session[PINNED_SESSION_KEY] = 0
+        session.save()
+        self.assertContains(self.client.get(reverse('polls:list')), 'Poll on replica')
+
+    def test_reads_dont_pin(self):
+        self.client.get(reverse('polls:list'))
+        self.assertNotIn(PINNED_SESSION_KEY, self.client.session)
+
+    @override_settings(POLLS_REPLICA_DATABASE='missing')
+    def test_without_replica(self):
+        self.assertContains(self.client.get(reverse('polls:list')), 'Poll on primary')
+        self.client.post(reverse('polls:vote', args=[self.poll.pk]), {'choice': self.choice.pk})
+        self.assertNotIn(PINNED_SESSION_KEY, self.client.session)
+
+    @override_settings(ROOT_URLCONF='polls.tests.test_async_views')
+    async def test_async_detail_reads_replica(self):
+        response = await self.async_client.get(reverse('polls:detail', args=[self.poll.pk]))
+        self.assertContains(response, 'Choice on replica')
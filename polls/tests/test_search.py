@@ -0,0 +1,68 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from polls.models import Poll, Choice
+from polls.search import get_search_backend, SQLiteSearchBackend, SimpleSearchBackend
+
+
+class SQLiteSearchBackendTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        self.backend = get_search_backend()
+        self.pizza = Poll.objects.create(text='Best pizza topping?', owner=self.user)
+        self.lunch = Poll.objects.create(text='Where do we eat lunch?', owner=self.user)
+        Choice.objects.create(poll=self.lunch, choice_text='Pizza place')
+        Choice.objects.create(poll=self.lunch, choice_text='Burger bar')
+
+    def search(self, text):
+        return list(self.backend.search(Poll.objects.all(), text).order_by('search_rank', 'id'))
+
+    def test_backend_matches_database(self):
+        self.assertIsInstance(self.backend, SQLiteSearchBackend)
+
+    def test_poll_text_ranks_above_choice_text(self):
+        self.assertEqual(self.search('pizza'), [self.pizza, self.lunch])
+
+    def test_prefix_and_all_terms_match(self):
+        self.assertEqual(self.search('burg'), [self.lunch])
+        self.assertEqual(self.search('pizza lunch'), [self.lunch])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.pizza.text = 'Best pasta shape?'
+        self.pizza.save()
+        self.assertEqual(self.search('pizza'), [self.lunch])
+        Choice.objects.filter(poll=self.lunch, choice_text='Pizza place').get().delete()
+        self.assertEqual(self.search('pizza'), [])
+        self.lunch.delete()
+        self.assertEqual(self.search('lunch'), [])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.search('"pizza* -'), [self.pizza, self.lunch])
+        self.assertEqual(len(self.search('')), 2)
+
+
+class PollsListSearchTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        self.client.login(username='example', password='example1234')
+        self.lunch = Poll.objects.create(text='Where do we eat lunch?', owner=self.user)
+        Choice.objects.create(poll=self.lunch, choice_text='Pizza place')
+        self.pizza = Poll.objects.create(text='Best pizza topping?', owner=self.user)
+
+    def test_results_ranked_by_relevance(self):
+        response = self.client.get(reverse('polls:list'), {'search': 'pizza'})
+        self.assertEqual(list(response.context['polls']), [self.pizza, self.lunch])
+
+    def test_explicit_sort_overrides_rank(self):
+        response = self.client.get(reverse('polls:list'), {'search': 'pizza', 'name': True})
+        self.assertEqual(list(response.context['polls']), [self.pizza, self.lunch])
+        response = self.client.get(reverse('polls:list'), {'search': 'pizza', 'date': True})
+        self.assertEqual(list(response.context['polls']), [self.lunch, self.pizza])
+
+    @override_settings(POLLS_SEARCH_BACKEND='polls.search.SimpleSearchBackend')
+    def test_simple_backend(self):
+        self.assertIsInstance(get_search_backend(), SimpleSearchBackend)
+        response = self.client.get(reverse('polls:list'), {'search': 'pizza'})
+        self.assertEqual(list(response.context['polls']), [self.pizza])
@@ -0,0 +1,157 @@
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from polls.models import Poll, Choice
+from polls.results import PollResults, invalidate_results
+from polls.streaming import ResultsBroadcaster, Watcher, get_broadcaster, stream_results
+
+
+def parse_events(text):
+    events = []
+    for block in text.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'event' in lines:
+            events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def results(*counts):
+    return PollResults.from_rows(1, [(choice_id, f'Choice {choice_id}', count)
+                                     for choice_id, count in enumerate(counts, start=1)])
+
+
+class BroadcasterTest(SimpleTestCase):
+
+    def setUp(self):
+        self.broadcaster = ResultsBroadcaster(1, tick=1)
+        self.watcher = Watcher()
+        self.broadcaster.watchers.add(self.watcher)
+
+    def test_first_results_are_a_snapshot(self):
+        self.broadcaster.publish(results(1, 2))
+        [(event, data)] = parse_events(self.watcher.drain())
+        self.assertEqual(event, 'snapshot')
+        self.assertEqual(data['total'], 3)
+
+    def test_only_changed_counts_are_sent(self):
+        self.broadcaster.publish(results(1, 2, 0))
+        self.watcher.drain()
+        self.broadcaster.publish(results(1, 3, 0))
+        self.assertEqual(parse_events(self.watcher.drain()), [('counts', {'total': 4, 'counts': {'2': 3}})])
+
+    def test_pending_counts_are_merged(self):
+        self.broadcaster.publish(results(0, 0))
+        self.watcher.drain()
+        self.broadcaster.publish(results(1, 0))
+        self.broadcaster.publish(results(1, 1))
+        self.broadcaster.publish(results(2, 1))
+        self.assertEqual(parse_events(self.watcher.drain()),
+                         [('counts', {'total': 3, 'counts': {'1': 2, '2': 1}})])
+        self.assertEqual(self.watcher.drain(), '')
+
+    def test_unchanged_results_send_nothing(self):
+        self.broadcaster.publish(results(1, 1))
+        self.watcher.drain()
+        self.broadcaster.publish(results(1, 1))
+        self.assertFalse(self.watcher.ready.is_set())
+
+    def test_changed_choices_send_a_snapshot(self):
+        self.broadcaster.publish(results(1, 1))
+        self.watcher.drain()
+        self.broadcaster.publish(results(1, 1, 0))
+        [(event, data)] = parse_events(self.watcher.drain())
+        self.assertEqual(event, 'snapshot')
+        self.assertEqual(len(data['choices']), 3)
+
+
+@override_settings(POLLS_STREAM_TICK=0.01)
+class StreamResultsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.poll = Poll.objects.create(owner=self.user, text='Test Poll')
+        self.choice1 = Choice.objects.create(poll=self.poll, choice_text='Choice 1')
+        self.choice2 = Choice.objects.create(poll=self.poll, choice_text='Choice 2')
+
+    async def next_events(self, stream):
+        return parse_events(await asyncio.wait_for(anext(stream), 5))
+
+    async def test_stream(self):
+        stream = stream_results(self.poll.pk)
+        try:
+            [(event, data)] = await self.next_events(stream)
+            self.assertEqual(event, 'snapshot')
+            self.assertEqual(data['total'], 0)
+
+            await sync_to_async(self.poll.add_vote)(self.user, self.choice2)
+            self.assertEqual(await self.next_events(stream),
+                             [('counts', {'total': 1, 'counts': {str(self.choice2.pk): 1}})])
+
+            await Poll.objects.filter(pk=self.poll.pk).aupdate(active=False)
+            invalidate_results(self.poll.pk)
+            self.assertEqual(await self.next_events(stream), [('ended', {})])
+            with self.assertRaises(StopAsyncIteration):
+                await anext(stream)
+        finally:
+            await stream.aclose()
+
+    async def test_keepalive_without_updates(self):
+        stream = stream_results(self.poll.pk, keepalive=0.05)
+        try:
+            await self.next_events(stream)
+            self.assertEqual(await asyncio.wait_for(anext(stream), 5), ': keepalive\n\n')
+            await sync_to_async(self.poll.add_vote)(self.user, self.choice1)
+            while (chunk := await asyncio.wait_for(anext(stream), 5)) == ': keepalive\n\n':
+                pass
+            self.assertEqual(parse_events(chunk), [('counts', {'total': 1, 'counts': {str(self.choice1.pk): 1}})])
+        finally:
+            await stream.aclose()
+
+    async def test_watchers_share_a_broadcaster(self):
+        first, second = stream_results(self.poll.pk), stream_results(self.poll.pk)
+        try:
+            await self.next_events(first)
+            await self.next_events(second)
+            self.assertEqual(len(get_broadcaster(self.poll.pk).watchers), 2)
+        finally:
+            await first.aclose()
+            await second.aclose()
+        self.assertEqual(len(get_broadcaster(self.poll.pk).watchers), 0)
+
+    async def test_deleted_poll_ends_stream(self):
+        stream = stream_results(self.poll.pk)
+        await self.next_events(stream)
+        await Poll.objects.filter(pk=self.poll.pk).adelete()
+        invalidate_results(self.poll.pk)
+        self.assertEqual(await self.next_events(stream), [('ended', {})])
+        with self.assertRaises(StopAsyncIteration):
+            await anext(stream)
+
+    async def test_view_streams_under_asgi(self):
+        response = await self.async_client.get(reverse('polls:results_stream', args=[self.poll.pk]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        try:
+            chunk = await asyncio.wait_for(anext(stream), 5)
+            [(event, data)] = parse_events(chunk.decode())
+            self.assertEqual(event, 'snapshot')
+        finally:
+            await stream.aclose()
+
+    def test_view_falls_back_to_reconnects_under_wsgi(self):
+        response = self.client.get(reverse('polls:results_stream', args=[self.poll.pk]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = response.content.decode()
+        self.assertTrue(content.startswith('retry: '))
+        [(event, data)] = parse_events(content)
+        self.assertEqual(event, 'snapshot')
+        self.assertEqual([choice['text'] for choice in data['choices']], ['Choice 1', 'Choice 2'])
+
+    def test_view_not_found(self):
+        response = self.client.get(reverse('polls:results_stream', args=[self.poll.pk + 100]))
+        self.assertEqual(response.status_code, 404)
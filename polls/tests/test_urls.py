@@ -1,6 +1,6 @@
 from django.test import TestCase
 from django.urls import reverse, resolve
-from polls import views
+from polls import views, async_views, api
 from polls.models import Poll
 from django.contrib.auth.models import User
 
@@ -54,3 +54,27 @@ class PollsTestUrl(TestCase):
     def test_poll_vote(self):
         url = reverse('polls:vote', kwargs={'poll_id': self.poll.id})
         self.assertEqual(resolve(url).func.view_class, views.PollVote)
+
+    def test_results_stream(self):
+        url = reverse('polls:results_stream', kwargs={'poll_id': self.poll.id})
+        self.assertEqual(resolve(url).func.view_class, async_views.ResultsStream)
+
+    def test_api_list(self):
+        url = reverse('polls:api_list')
+        self.assertEqual(resolve(url).func.view_class, api.PollListAPI)
+
+    def test_api_detail(self):
+        url = reverse('polls:api_detail', kwargs={'poll_id': self.poll.id})
+        self.assertEqual(resolve(url).func.view_class, api.PollDetailAPI)
+
+    def test_api_results(self):
+        url = reverse('polls:api_results', kwargs={'poll_id': self.poll.id})
+        self.assertEqual(resolve(url).func.view_class, api.PollResultsAPI)
+
+    def test_api_timeseries(self):
+        url = reverse('polls:api_timeseries', kwargs={'poll_id': self.poll.id})
+        self.assertEqual(resolve(url).func.view_class, api.PollTimeSeriesAPI)
+
+    def test_api_votes(self):
+        url = reverse('polls:api_votes')
+        self.assertEqual(resolve(url).func.view_class, api.BatchVoteAPI)
@@ -1,7 +1,10 @@
 from django.contrib.auth.models import User, Permission
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import IntegrityError, connection
 from django.test import TestCase
-from polls.models import Poll, Vote, Choice
+from django.test.utils import CaptureQueriesContext
+from polls.models import Poll, Vote, Choice, PollResultSnapshot
 from django.urls import reverse
 from django.contrib.messages import get_messages
 from polls.forms import PollAddForm, EditPollForm, ChoiceAddForm
@@ -25,6 +28,19 @@ class PollsListViewTest(TestCase):
         self.assertContains(response, self.poll2.text)
         self.assertContains(response, self.poll3.text)
 
+    def test_polls_list_rows_follow_poll_changes(self):
+        self.client.get(reverse('polls:list'))
+        self.poll1.text = "Renamed Poll"
+        self.poll1.save()
+        response = self.client.get(reverse('polls:list'))
+        self.assertContains(response, "Renamed Poll")
+        self.assertNotContains(response, "First Poll")
+
+        # Owner controls are not shared with other users
+        other_user = User.objects.create_user(username='other', email='other@example.com', password='other1234')
+        self.client.force_login(other_user)
+        self.assertNotContains(self.client.get(reverse('polls:list')), 'title="Edit Poll"')
+
     def text_polls_list_unAuthenticated(self):
         self.client.logout()
         response = self.client.get(reverse('polls:list'))
@@ -63,6 +79,19 @@ class PollsListViewTest(TestCase):
         self.assertTemplateUsed(response, 'polls/polls_list.html')
         self.assertEqual(len(response.context['polls']), 4)  # Second page should have remaining polls
 
+    def test_polls_list_query_count_does_not_grow_with_page_size(self):
+        other_user = User.objects.create_user(username='other', email='other@example.com', password='other1234')
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get(reverse('polls:list'))
+        for i in range(3):
+            Poll.objects.create(text=f"Other Poll {i}", owner=other_user)
+        with CaptureQueriesContext(connection) as full_page:
+            response = self.client.get(reverse('polls:list'))
+        self.assertEqual(len(response.context['polls']), 6)
+        self.assertEqual(len(full_page), len(small_page))
+        # session, user, paginator count and the page itself
+        self.assertEqual(len(full_page), 4)
+
     def test_polls_list_params(self):
         response = self.client.get(reverse('polls:list'), {'search': 'First', 'page': 2})
         self.assertEqual(response.status_code, 200)
@@ -101,6 +130,11 @@ class UserPollViewTest(TestCase):
         # The second page should have the remaining polls
         self.assertEqual(len(response.context['polls']), 4)
 
+    def test_user_polls_list_query_count(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('polls:list_by_user'))
+        self.assertContains(response, 'title="Edit Poll"', count=6)
+
     def test_user_polls_only(self):
         response = self.client.get(reverse('polls:list_by_user'))
         self.assertEqual(response.status_code, 200)
@@ -183,9 +217,17 @@ class PollAddViewTest(TestCase):
         self.assertIsInstance(response.context['form'], PollAddForm)
         self.assertFalse(response.context['form'].is_valid())
 
+    def test_POST_poll_add_view_text_too_long(self):
+        data = {'text': 'x' * 501, 'choice1': 'Choice 1', 'choice2': 'Choice 2'}
+        response = self.client.post(reverse('polls:add'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'polls/add_poll.html')
+        self.assertFalse(Poll.objects.exists())
+
 
 class BaseSetUpTestCase(TestCase):
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
         self.other_user = User.objects.create_user(username='other', email='other@example.com', password='other1234')
         self.client.login(username='example', password='example1234')
@@ -233,6 +275,13 @@ class PollsEditViewTest(BaseSetUpTestCase):
         self.poll.refresh_from_db()
         self.assertEqual(self.poll.text, 'Test Poll')
 
+    def test_POST_poll_edit_view_text_too_long(self):
+        response = self.client.post(reverse('polls:edit', kwargs={'poll_id': self.poll.id}), {'text': 'x' * 501})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('text', response.context['form'].errors)
+        self.poll.refresh_from_db()
+        self.assertEqual(self.poll.text, 'Test Poll')
+
 
 class DeletePollViewTest(BaseSetUpTestCase):
 
@@ -392,6 +441,30 @@ class ChoiceDeleteViewTest(BaseSetUpTestCase):
         self.assertEqual(str(messages[0]), "Choice Deleted successfully.")
         self.assertIn('alert alert-success alert-dismissible fade show', messages[0].tags)
 
+    def test_GET_choice_delete_view_updates_poll_vote_counter(self):
+        self.poll.add_vote(self.other_user, self.choice)
+        self.client.get(reverse('polls:choice_delete', kwargs={'choice_id': self.choice.id}))
+        self.poll.refresh_from_db()
+        self.assertEqual(self.poll.vote_count, 0)
+
+    def test_queryset_delete_updates_poll_vote_counter(self):
+        other_choice = Choice.objects.create(poll=self.poll, choice_text='Other Choice')
+        self.poll.add_vote(self.other_user, self.choice)
+        self.poll.add_vote(self.user, other_choice)
+        Choice.objects.filter(pk=self.choice.pk).delete()
+        self.poll.refresh_from_db()
+        self.assertEqual(self.poll.vote_count, 1)
+
+    def test_admin_bulk_delete_updates_poll_vote_counter(self):
+        self.poll.add_vote(self.other_user, self.choice)
+        self.user.is_staff = self.user.is_superuser = True
+        self.user.save()
+        self.client.post(reverse('admin:polls_choice_changelist'), {
+            'action': 'delete_selected', '_selected_action': [self.choice.pk], 'post': 'yes'})
+        self.assertFalse(Choice.objects.filter(pk=self.choice.pk).exists())
+        self.poll.refresh_from_db()
+        self.assertEqual(self.poll.vote_count, 0)
+
     def test_GET_choice_delete_view_without_permission(self):
         self.client.login(username='other', password='other1234')
         response = self.client.get(reverse('polls:choice_delete', kwargs={'choice_id': self.choice.id}))
@@ -443,6 +516,16 @@ class PollVoteViewTest(BaseSetUpTestCase):
         self.assertEqual(response.context['poll'], self.poll)
         # Check that the vote was recorded
         self.assertTrue(Vote.objects.filter(user=self.user, poll=self.poll, choice=self.choice1).exists())
+        self.assertEqual(response.context['results'].total, 1)
+
+    def test_POST_poll_vote_view_updates_vote_counters(self):
+        self.client.post(reverse('polls:vote', kwargs={'poll_id': self.poll.id}), {'choice': self.choice1.id})
+        self.poll.refresh_from_db()
+        self.choice1.refresh_from_db()
+        self.choice2.refresh_from_db()
+        self.assertEqual(self.poll.vote_count, 1)
+        self.assertEqual(self.choice1.vote_count, 1)
+        self.assertEqual(self.choice2.vote_count, 0)
 
     def test_POST_poll_vote_view_with_no_choice_selected(self):
         response = self.client.post(reverse('polls:vote', kwargs={'poll_id': self.poll.id}), {})
@@ -465,6 +548,13 @@ class PollVoteViewTest(BaseSetUpTestCase):
         # Ensure no additional votes were recorded
         self.assertEqual(Vote.objects.filter(user=self.user, poll=self.poll).count(), 1)
 
+    def test_POST_poll_vote_view_with_choice_of_other_poll(self):
+        other_poll = Poll.objects.create(text='Other Poll', owner=self.other_user)
+        other_choice = Choice.objects.create(poll=other_poll, choice_text='Other Choice')
+        response = self.client.post(reverse('polls:vote', kwargs={'poll_id': self.poll.id}), {'choice': other_choice.id})
+        self.assertRedirects(response, reverse('polls:detail', kwargs={'poll_id': self.poll.id}))
+        self.assertFalse(Vote.objects.filter(user=self.user).exists())
+
     def test_POST_poll_vote_view_with_nonexistent_choice(self):
         response = self.client.post(reverse('polls:vote', kwargs={'poll_id': self.poll.id}), {'choice': 9999})
         self.assertEqual(response.status_code, 302)
@@ -501,6 +591,53 @@ class EndPollTestCase(BaseSetUpTestCase):
         response = self.client.get(reverse('polls:end_poll', kwargs={'poll_id': 9999}))
         self.assertEqual(response.status_code, 404)
 
+    def test_end_poll_freezes_results(self):
+        choice = Choice.objects.create(poll=self.poll, choice_text='Choice 1')
+        Choice.objects.create(poll=self.poll, choice_text='Choice 2')
+        self.poll.add_vote(self.other_user, choice)
+        self.client.get(reverse('polls:end_poll', kwargs={'poll_id': self.poll.id}))
+        snapshot = PollResultSnapshot.objects.get(poll=self.poll)
+        self.assertEqual(snapshot.total, 1)
+        self.assertEqual([row['num_votes'] for row in snapshot.choices], [1, 0])
+        self.assertEqual([row['percentage'] for row in snapshot.choices], [100, 0])
+
+        # Later changes to the votes don't show on the ended poll
+        Vote.objects.all().delete()
+        cache.clear()
+        self.client.logout()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('polls:detail', kwargs={'poll_id': self.poll.id}))
+        self.assertEqual(response.context['results'].total, 1)
+        self.assertEqual([choice.num_votes for choice in response.context['results']], [1, 0])
+
+    def test_ended_poll_page_is_cached(self):
+        self.client.logout()
+        url = reverse('polls:detail', kwargs={'poll_id': self.poll_inactive.id})
+        response = self.client.get(url)
+        self.assertTemplateUsed(response, 'polls/poll_result.html')
+        cached = self.client.get(url)
+        self.assertTemplateNotUsed(cached, 'polls/poll_result.html')
+        self.assertEqual(cached.content, response.content)
+
+        # Editing the poll gives it a new page
+        self.poll_inactive.text = 'Renamed Poll'
+        self.poll_inactive.save()
+        self.assertContains(self.client.get(url), 'Renamed Poll')
+
+    def test_ended_poll_conditional_get(self):
+        url = reverse('polls:detail', kwargs={'poll_id': self.poll_inactive.id})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url)['ETag'], etag)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_ended_poll_without_snapshot_shows_live_results(self):
+        choice = Choice.objects.create(poll=self.poll_inactive, choice_text='Choice 1')
+        Vote.objects.create(user=self.other_user, poll=self.poll_inactive, choice=choice)
+        Choice.objects.filter(pk=choice.pk).update(vote_count=1)
+        response = self.client.get(reverse('polls:detail', kwargs={'poll_id': self.poll_inactive.id}))
+        self.assertEqual(response.context['results'].total, 1)
+
 
 class PollModelTest(TestCase):
     def test_user_can_vote(self):
@@ -511,3 +648,63 @@ class PollModelTest(TestCase):
         Vote.objects.create(user=user, poll=poll, choice=choice)
         self.assertFalse(poll.user_can_vote(user))
 
+    def test_add_vote_twice_raises_integrity_error(self):
+        user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        poll = Poll.objects.create(text='Test Poll', owner=user)
+        choice = poll.choice_set.create(choice_text='choice test')
+        poll.add_vote(user, choice)
+        with self.assertRaises(IntegrityError):
+            poll.add_vote(user, choice)
+        poll.refresh_from_db()
+        choice.refresh_from_db()
+        self.assertEqual(poll.vote_count, 1)
+        self.assertEqual(choice.vote_count, 1)
+
+
+    def test_text_over_500_characters_is_refused(self):
+        user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        Poll.objects.create(text='x' * 500, owner=user)
+        with self.assertRaises(IntegrityError):
+            Poll.objects.create(text='x' * 501, owner=user)
+
+    def test_saving_stale_instances_keeps_vote_counts(self):
+        user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        poll = Poll.objects.create(text='Test Poll', owner=user)
+        choice = poll.choice_set.create(choice_text='choice test')
+        stale_poll, stale_choice = Poll.objects.get(pk=poll.pk), Choice.objects.get(pk=choice.pk)
+        poll.add_vote(user, choice)
+        stale_choice.choice_text = 'Renamed'
+        stale_choice.save()
+        stale_poll.text = 'Renamed Poll'
+        stale_poll.save()
+        poll.refresh_from_db()
+        choice.refresh_from_db()
+        self.assertEqual((poll.text, poll.vote_count), ('Renamed Poll', 1))
+        self.assertEqual((choice.choice_text, choice.vote_count), ('Renamed', 1))
+
+    def test_close_keeps_votes_cast_after_loading(self):
+        user = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        poll = Poll.objects.create(text='Test Poll', owner=user)
+        choice = poll.choice_set.create(choice_text='choice test')
+        stale_poll = Poll.objects.get(pk=poll.pk)
+        poll.add_vote(user, choice)
+        stale_poll.close()
+        poll.refresh_from_db()
+        self.assertFalse(poll.active)
+        self.assertEqual((poll.vote_count, poll.snapshot.total), (1, 1))
+
+    def test_deleting_a_voter_updates_vote_counts(self):
+        owner = User.objects.create_user(username='example', email='example@example.com', password='example1234')
+        voter = User.objects.create_user(username='other', email='other@example.com', password='other1234')
+        poll = Poll.objects.create(text='Test Poll', owner=owner)
+        own_poll = Poll.objects.create(text='Own Poll', owner=voter)
+        choice = poll.choice_set.create(choice_text='choice test')
+        poll.add_vote(owner, choice)
+        poll.add_vote(voter, choice)
+        own_poll.add_vote(voter, own_poll.choice_set.create(choice_text='own choice'))
+        self.assertEqual(poll.get_results().total, 2)
+        voter.delete()
+        poll.refresh_from_db()
+        choice.refresh_from_db()
+        self.assertEqual((poll.vote_count, choice.vote_count), (1, 1))
+        self.assertEqual(poll.get_results().total, 1)
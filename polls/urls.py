@@ -1,8 +1,12 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, async_views, api
 
 app_name = "polls"
 
+# Poll detail and voting are the hot paths; ASGI deployments can serve them async
+hot_views = async_views if settings.POLLS_ASYNC_VIEWS else views
+
 urlpatterns = [
     path('list/', views.PollsList.as_view(), name='list'),
     path('list/user/', views.UserPoll.as_view(), name='list_by_user'),
@@ -13,6 +17,12 @@ urlpatterns = [
     path('edit/<int:poll_id>/choice/add/', views.AddChoice.as_view(), name='add_choice'),
     path('edit/choice/<int:choice_id>/', views.ChoiceEdit.as_view(), name='choice_edit'),
     path('delete/choice/<int:choice_id>/', views.ChoiceDelete.as_view(), name='choice_delete'),
-    path('<int:poll_id>/', views.PollDetail.as_view(), name='detail'),
-    path('<int:poll_id>/vote/', views.PollVote.as_view(), name='vote'),
+    path('<int:poll_id>/', hot_views.PollDetail.as_view(), name='detail'),
+    path('<int:poll_id>/vote/', hot_views.PollVote.as_view(), name='vote'),
+    path('<int:poll_id>/results/stream/', async_views.ResultsStream.as_view(), name='results_stream'),
+    path('api/', api.PollListAPI.as_view(), name='api_list'),
+    path('api/<int:poll_id>/', api.PollDetailAPI.as_view(), name='api_detail'),
+    path('api/<int:poll_id>/results/', api.PollResultsAPI.as_view(), name='api_results'),
+    path('api/<int:poll_id>/timeseries/', api.PollTimeSeriesAPI.as_view(), name='api_timeseries'),
+    path('api/votes/', api.BatchVoteAPI.as_view(), name='api_votes'),
 ]
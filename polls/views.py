@@ -1,11 +1,19 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import View
 from django.core.paginator import Paginator
-from django.db.models import Count
+from django.db import IntegrityError
 from django.contrib import messages
-from .models import Poll, Choice, Vote
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.http import HttpResponse
+from .models import Poll, Choice
 from .forms import PollAddForm, EditPollForm, ChoiceAddForm
+from .pagination import KeysetPaginator
+from .routing import ReplicaReadMixin
+from .search import get_search_backend
+from . import ingestion
 
 
 def get_poll(request, poll_id) -> Poll | None:
@@ -15,41 +23,87 @@ def get_poll(request, poll_id) -> Poll | None:
     return poll
 
 
-class PollsList(LoginRequiredMixin, View):
+def render_result(request, poll):
+    context = {'poll': poll, 'results': poll.get_results()}
+    return render(request, 'polls/poll_result.html', context)
+
+
+def ended_page_key(request, poll):
+    # The navbar differs for anonymous users
+    return f'polls:ended-page:{poll.pk}:{poll.updated_at.timestamp()}:{int(request.user.is_authenticated)}'
+
+
+def render_ended_poll(request, poll):
+    """
+    The result page of an ended poll only changes when the poll is edited,
+    so the whole page is cached. Pages showing messages are not.
+    """
+    if get_messages(request):
+        return render_result(request, poll)
+    cache = caches[settings.POLLS_RESULTS_CACHE]
+    key = ended_page_key(request, poll)
+    content = cache.get(key)
+    if content is None:
+        content = render_result(request, poll).content
+        cache.set(key, content, None)
+    return HttpResponse(content)
+
+
+def paginate_polls(request, polls, sort_field='id'):
+    """
+    Page number pagination by default, keyset pagination on (sort_field, id)
+    when POLLS_PAGINATION is 'cursor'
+    """
+    if getattr(settings, 'POLLS_PAGINATION', 'page') == 'cursor':
+        paginator = KeysetPaginator(polls, 6, sort_field)
+        return paginator.get_page(request.GET.get('cursor'))
+    paginator = Paginator(polls.order_by(sort_field, 'id'), 6)
+    return paginator.get_page(request.GET.get('page'))
+
+
+def filter_polls(request, polls):
+    """
+    Apply the search and sort parameters of the poll list.
+    Returns the polls, the field to sort them by and the search term.
+    """
+    search_term = ''
+    sort_field = None
+
+    if 'name' in request.GET:
+        sort_field = 'text'
+    if 'date' in request.GET:
+        sort_field = 'pub_date'
+    if 'vote' in request.GET:
+        sort_field = 'vote_count'
+    if 'search' in request.GET:
+        search_term = request.GET.get('search')
+        polls = get_search_backend().search(polls, search_term)
+        # Best matches first unless another order was asked for
+        sort_field = sort_field or 'search_rank'
+    return polls, sort_field or 'id', search_term
+
+
+class PollsList(LoginRequiredMixin, ReplicaReadMixin, View):
     login_url = 'accounts:login'
 
     def get(self, request):
-        all_polls = Poll.objects.all()
-        search_term = ''
-
-        if 'name' in request.GET:
-            all_polls = all_polls.order_by('text')
-        if 'date' in request.GET:
-            all_polls = all_polls.order_by('pub_date')
-        if 'vote' in request.GET:
-            all_polls = all_polls.annotate(Count('vote')).order_by('vote__count')
-        if 'search' in request.GET:
-            search_term = request.GET.get('search')
-            all_polls = all_polls.filter(text__icontains=search_term)
-
-        paginator = Paginator(all_polls, 6)
-        page = request.GET.get('page')
-        polls = paginator.get_page(page)
+        all_polls, sort_field, search_term = filter_polls(request, Poll.objects.for_listing(request.user))
+        polls = paginate_polls(request, all_polls, sort_field)
 
         get_dict_copy = request.GET.copy()
-        params = get_dict_copy.pop('page', True) and get_dict_copy.urlencode()
+        get_dict_copy.pop('page', None)
+        get_dict_copy.pop('cursor', None)
+        params = get_dict_copy.urlencode()
         context = {'polls': polls, 'params': params, 'search_term': search_term}
         return render(request, 'polls/polls_list.html', context)
 
 
-class UserPoll(LoginRequiredMixin, View):
+class UserPoll(LoginRequiredMixin, ReplicaReadMixin, View):
     login_url = 'accounts:login'
 
     def get(self, request):
-        all_polls = Poll.objects.filter(owner=request.user)
-        paginator = Paginator(all_polls, 6)
-        page = request.GET.get('page')
-        polls = paginator.get_page(page)
+        all_polls = Poll.objects.filter(owner=request.user).for_listing(request.user)
+        polls = paginate_polls(request, all_polls)
         return render(request, 'polls/polls_list.html', {'polls': polls})
 
 
@@ -206,15 +260,16 @@ class ChoiceDelete(LoginRequiredMixin, View):
         return redirect('polls:edit', poll.id)
 
 
-class PollDetail(View):
+class PollDetail(ReplicaReadMixin, View):
     def get(self, request, poll_id):
-        poll = get_object_or_404(Poll, pk=poll_id)
+        poll = get_object_or_404(Poll.objects.select_related('snapshot'), pk=poll_id)
         if not poll.active:
-            return render(request, 'polls/poll_result.html', {'poll': poll})
-        loop_count = poll.choice_set.count()
+            return render_ended_poll(request, poll)
+        choices = list(poll.choice_set.order_by('id'))
         context = {
             'poll': poll,
-            'loop_time': range(0, loop_count),
+            'choices': choices,
+            'loop_time': range(0, len(choices)),
         }
         return render(request, 'polls/poll_detail.html', context)
 
@@ -225,26 +280,39 @@ class PollVote(LoginRequiredMixin, View):
     def post(self, request, poll_id):
         poll = get_object_or_404(Poll, pk=poll_id)
         choice_id = request.POST.get('choice')
-        if not poll.user_can_vote(request.user):
-            messages.error(
-                request, "You already voted this poll!", extra_tags='alert alert-warning alert-dismissible fade show')
-            return redirect("polls:list")
-
         if choice_id:
             try:
-                choice = Choice.objects.get(id=choice_id)
-                vote = Vote(user=request.user, poll=poll, choice=choice)
-                vote.save()
-                return render(request, 'polls/poll_result.html', {'poll': poll})
+                choice = poll.choice_set.get(id=choice_id)
+                if ingestion.is_enabled():
+                    return self.queue_vote(request, poll, choice)
+                poll.add_vote(request.user, choice)
+                return render_result(request, poll)
             except Choice.DoesNotExist:
                 messages.error(
                     request, "Chioce does not exist", extra_tags='alert alert-warning alert-dismissible fade show')
                 return redirect("polls:detail", poll_id)
+            except IntegrityError:
+                return self.already_voted(request)
         else:
             messages.error(
                 request, "No choice selected!", extra_tags='alert alert-warning alert-dismissible fade show')
             return redirect("polls:detail", poll_id)
 
+    def queue_vote(self, request, poll, choice):
+        """
+        Acknowledge the vote now and leave the insert to the background flusher
+        """
+        vote_queue = ingestion.get_vote_queue()
+        if vote_queue.is_pending(request.user.id, poll.id) or not poll.user_can_vote(request.user):
+            return self.already_voted(request)
+        vote_queue.submit(request.user.id, poll.id, choice.id)
+        return render_result(request, poll)
+
+    def already_voted(self, request):
+        messages.error(
+            request, "You already voted this poll!", extra_tags='alert alert-warning alert-dismissible fade show')
+        return redirect("polls:list")
+
 
 class EndPoll(LoginRequiredMixin, View):
     login_url = 'accounts:login'
@@ -254,7 +322,6 @@ class EndPoll(LoginRequiredMixin, View):
         if not poll:
             return redirect('polls:list')
         elif poll.active is True:
-            poll.active = False
-            poll.save()
-            return render(request, 'polls/poll_result.html', {'poll': poll})
-        return render(request, 'polls/poll_result.html', {'poll': poll})
+            poll.close()
+            return render_result(request, poll)
+        return render_result(request, poll)